@@ -1,6 +1,27 @@
 from django.contrib import admin
 
-from lessons.models import Lesson, StudySubject
+from lessons import summary
+from lessons.models import Attendance, Lesson, StudySubject
+from school import cache
+
+
+class AttendanceInline(admin.TabularInline):
+    model = Attendance
+    extra = 0
+    raw_id_fields = ('student',)
+
+
+@admin.register(Lesson)
+class LessonAdmin(admin.ModelAdmin):
+    # Связь с промежуточной моделью не выводится в форме занятия, отсутствующие редактируются построчно
+    inlines = (AttendanceInline,)
+
+    def save_related(self, request, form, formsets, change):
+        """Строки inline сохраняются без сигнала m2m_changed, поэтому сводка и кэш обновляются здесь"""
+        with summary.tracked([form.instance]):
+            super().save_related(request, form, formsets, change)
+        if any(formset.has_changed() for formset in formsets):
+            cache.invalidate(Lesson)
+
 
 admin.site.register(StudySubject)
-admin.site.register(Lesson)
@@ -0,0 +1,101 @@
+"""
+Аналитика посещаемости завершенных занятий.
+
+Показатели считаются агрегирующими запросами в СУБД по периодам (неделя или месяц):
+- `absences` — число пропусков по связи `Lesson.missing_students`;
+- `expected` — ожидаемое число посещений: занятия группы, умноженные на ее состав по связи `StudentGroup.students`
+  (для студента — число занятий его групп);
+- `absence_rate` — доля пропусков от ожидаемых посещений.
+
+Пропуски и ожидаемые посещения выбираются двумя отдельными запросами, чтобы соединение с составом группы
+не размножало строки пропусков. Показатели по студентам и предметам без фильтров, кроме предмета, читаются
+из сводки AttendanceSummary (см. lessons.summary).
+"""
+from collections import namedtuple
+
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from lessons import models
+from people import models as people_models
+
+PERIODS = {
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+Dimension = namedtuple('Dimension', ['absence_key', 'expected_key', 'summary_key', 'model', 'label'])
+
+DIMENSIONS = {
+    'students': Dimension('missing_students', 'student_group__students', 'student', people_models.Student,
+                          'full_name'),
+    'groups': Dimension('student_group', 'student_group', None, people_models.StudentGroup, 'title'),
+    'subjects': Dimension('study_subject', 'study_subject', 'study_subject', models.StudySubject, 'title'),
+    'teachers': Dimension('teacher', 'teacher', None, people_models.Teacher, 'full_name'),
+}
+
+
+def attendance(lessons, dimension: str, period: str) -> list:
+    """
+    Возвращает показатели посещаемости по объектам измерения `dimension` и периодам `period`.
+
+    `lessons` — отфильтрованная выборка занятий; учитываются только завершенные занятия с указанной группой.
+    """
+    dimension = DIMENSIONS[dimension]
+    lessons = lessons.filter(status=True, student_group__isnull=False).order_by()
+    bucket = PERIODS[period]('date')
+
+    absences = lessons.values(key=F(dimension.absence_key), period=bucket).annotate(
+        count=Count('missing_students')
+    )
+    expected = lessons.values(key=F(dimension.expected_key), period=bucket).annotate(
+        count=Count('student_group__students')
+    )
+
+    rows = {}
+    for name, queryset in (('expected', expected), ('absences', absences)):
+        for item in queryset:
+            if item['key'] is None or not item['count']:
+                continue
+            row = rows.setdefault((item['period'].date(), item['key']), {'expected': 0, 'absences': 0})
+            row[name] = item['count']
+    return get_results(dimension, rows)
+
+
+def can_use_summary(dimension: str, filters: set) -> bool:
+    """Сводка хранит показатели по студентам и предметам, поэтому из фильтров занятий допускает только предмет"""
+    return DIMENSIONS[dimension].summary_key is not None and filters <= {'study_subject'}
+
+
+def attendance_from_summary(dimension: str, period: str, study_subject=None) -> list:
+    """Возвращает те же показатели, что и attendance(), одним запросом к сводке посещаемости"""
+    dimension = DIMENSIONS[dimension]
+    queryset = models.AttendanceSummary.objects.filter(period=period)
+    if study_subject is not None:
+        queryset = queryset.filter(study_subject=study_subject)
+
+    rows = {
+        (item['period_start'], item['key']): {'expected': item['expected'], 'absences': item['absences']}
+        for item in queryset.values('period_start', key=F(dimension.summary_key)).annotate(
+            expected=Sum('expected'), absences=Sum('absences')
+        ).order_by()
+    }
+    return get_results(dimension, rows)
+
+
+def get_results(dimension: Dimension, rows: dict) -> list:
+    labels = dict(dimension.model.objects.filter(
+        pk__in={key for _, key in rows}
+    ).values_list('pk', dimension.label))
+
+    return [
+        {
+            'period': period_start,
+            'id': key,
+            'name': labels.get(key),
+            'expected': row['expected'],
+            'absences': row['absences'],
+            'absence_rate': round(row['absences'] / row['expected'], 4) if row['expected'] else None,
+        }
+        for (period_start, key), row in sorted(rows.items())
+    ]
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ClassConfig(AppConfig):
     name = 'lessons'
+
+    def ready(self):
+        from lessons import signals  # noqa: F401
@@ -0,0 +1,88 @@
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+
+from lessons import models
+
+DATE_FORMAT = '%d/%m/%Y %H:%M:%S'
+CSV_HEADER = (
+    'id', 'date', 'study_subject', 'teacher', 'student_group', 'status',
+    'missing_student_ids', 'missing_student_names',
+)
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает записанную строку вместо ее сохранения"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_lessons(queryset, chunk_size: int = 2000):
+    """
+    Перебирает занятия вместе с отсутствующими студентами, не загружая всю выборку в память.
+
+    Занятия читаются курсором по `chunk_size` строк, отсутствующие студенты каждой порции загружаются
+    одним запросом к промежуточной таблице.
+    """
+    rows = queryset.values_list(
+        'id', 'date', 'study_subject__title', 'teacher__full_name', 'student_group__title', 'status',
+    ).iterator(chunk_size=chunk_size)
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield from _with_missing_students(chunk)
+            chunk = []
+    if chunk:
+        yield from _with_missing_students(chunk)
+
+
+def _with_missing_students(chunk: list):
+    missing = {}
+    for lesson_id, student_id, full_name in models.Lesson.missing_students.through.objects.filter(
+            lesson_id__in=[row[0] for row in chunk]
+    ).order_by('student_id').values_list('lesson_id', 'student_id', 'student__full_name'):
+        missing.setdefault(lesson_id, []).append((student_id, full_name))
+
+    for row in chunk:
+        yield row, missing.get(row[0], [])
+
+
+def iter_csv(queryset):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for (lesson_id, date, subject, teacher, group, status), students in iter_lessons(queryset):
+        yield writer.writerow((
+            lesson_id, date.strftime(DATE_FORMAT), subject, teacher or '', group or '', str(status).lower(),
+            ';'.join(str(student_id) for student_id, _ in students),
+            ';'.join(full_name for _, full_name in students),
+        ))
+
+
+def iter_ndjson(queryset):
+    for (lesson_id, date, subject, teacher, group, status), students in iter_lessons(queryset):
+        yield json.dumps({
+            'id': lesson_id,
+            'date': date.strftime(DATE_FORMAT),
+            'teacher': teacher,
+            'study_subject': subject,
+            'student_group': group,
+            'missing_students': [{'id': student_id, 'full_name': full_name} for student_id, full_name in students],
+            'status': status,
+        }, ensure_ascii=False) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson; charset=utf-8'),
+}
+
+
+def streaming_export(queryset, export_format: str) -> StreamingHttpResponse:
+    generator, content_type = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(generator(queryset), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="lessons.{export_format}"'
+    return response
@@ -1,9 +1,49 @@
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
 
-from lessons.models import Lesson
+from lessons.models import Attendance, Lesson
+from people.models import StudentGroup
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    """Список идентификаторов через запятую: `?teacher__in=1,2,3`"""
 
 
 class LessonFilter(filters.FilterSet):
+    """
+    Фильтры списка занятий.
+
+    Каждый фильтр добавляет к запросу одно условие: диапазон дат, `IN` по идентификаторам, `EXISTS`
+    по отсутствующим студентам и подзапрос по составу групп для студента.
+    """
+    date_after = filters.DateTimeFilter(field_name='date', lookup_expr='gte')
+    date_before = filters.DateTimeFilter(field_name='date', lookup_expr='lte')
+    study_subject__in = NumberInFilter(field_name='study_subject', lookup_expr='in')
+    teacher__in = NumberInFilter(field_name='teacher', lookup_expr='in')
+    student_group__in = NumberInFilter(field_name='student_group', lookup_expr='in')
+    has_missing_students = filters.BooleanFilter(method='filter_has_missing_students')
+    student = filters.NumberFilter(method='filter_student')
+
     class Meta:
         model = Lesson
         fields = ('study_subject', 'teacher', 'student_group', 'status')
+
+    def filter_has_missing_students(self, queryset, name: str, value: bool):
+        missing = Lesson.missing_students.through.objects.filter(lesson_id=OuterRef('pk'))
+        return queryset.annotate(has_missing_students=Exists(missing)).filter(has_missing_students=value)
+
+    def filter_student(self, queryset, name: str, value):
+        """Занятия групп, в которых обучается студент"""
+        groups = StudentGroup.students.through.objects.filter(student_id=value).values('studentgroup_id')
+        return queryset.filter(student_group__in=groups)
+
+
+class AbsenceFilter(filters.FilterSet):
+    """Фильтры истории пропусков студента по дате и предмету занятия"""
+    date_after = filters.DateTimeFilter(field_name='lesson__date', lookup_expr='gte')
+    date_before = filters.DateTimeFilter(field_name='lesson__date', lookup_expr='lte')
+    study_subject = filters.NumberFilter(field_name='lesson__study_subject')
+
+    class Meta:
+        model = Attendance
+        fields = ()
@@ -0,0 +1,160 @@
+"""
+Генерация синтетических данных для нагрузочных замеров.
+
+Студенты распределяются по группам поровну, занятия — по группам, преподавателям и предметам случайно в пределах
+`days` дней до сегодняшнего дня и после него; прошедшие занятия завершены, и у них отмечается примерно
+`absence_rate` отсутствующих из состава группы. Записи вставляются пачками с заранее выделенными
+идентификаторами (на PostgreSQL — командой COPY, на остальных СУБД — через bulk_create), а отсутствующие —
+сразу после каждой пачки занятий, поэтому память не растет с объемом данных.
+Результат детерминирован при одинаковом `seed`.
+"""
+import csv
+import io
+import random
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+
+from lessons import models
+from people import models as people_models
+
+FIRST_NAMES = (
+    'Александр', 'Мария', 'Дмитрий', 'Анна', 'Иван', 'Екатерина', 'Сергей', 'Ольга', 'Андрей', 'Татьяна',
+    'Алексей', 'Наталья', 'Михаил', 'Елена', 'Николай', 'Ирина', 'Павел', 'Светлана', 'Владимир', 'Юлия',
+)
+LAST_NAMES = (
+    'Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов', 'Михайлов', 'Новиков', 'Федоров',
+    'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Семенов', 'Егоров', 'Павлов', 'Козлов', 'Степанов', 'Николаев',
+)
+SUBJECTS = (
+    'Математика', 'Физика', 'Химия', 'Биология', 'История', 'География', 'Литература', 'Английский язык',
+    'Информатика', 'Экономика', 'Философия', 'Право',
+)
+DEGREES = ('Бакалавр', 'Магистр', 'Кандидат наук', 'Доктор наук')
+FIRST_HOUR = 8
+LAST_HOUR = 18
+
+
+def reserve_ids(model, count: int) -> list:
+    """
+    Возвращает идентификаторы для `count` новых записей.
+
+    Записи вставляются с явными идентификаторами, чтобы связи можно было заполнить без чтения вставленных строк.
+    На PostgreSQL идентификаторы берутся из последовательности таблицы, на остальных СУБД — после наибольшего.
+    """
+    if not count:
+        return []
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+                [model._meta.db_table, model._meta.pk.column, count],
+            )
+            return [row[0] for row in cursor.fetchall()]
+    last_pk = model.objects.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+    return list(range(last_pk + 1, last_pk + count + 1))
+
+
+def insert(model, columns: tuple, rows, batch_size: int) -> int:
+    """
+    Вставляет строки (кортежи значений столбцов `columns`) пачками и возвращает их число.
+
+    На PostgreSQL пачка загружается командой COPY, на остальных СУБД — через bulk_create.
+    """
+    rows = iter(rows)
+    inserted = 0
+    # В формате csv пустое поле читается как NULL; для столбцов NOT NULL оно должно читаться пустой строкой
+    not_null = [column for column in columns if not model._meta.get_field(column).null]
+    options = f'FORMAT csv, FORCE_NOT_NULL ({", ".join(not_null)})' if not_null else 'FORMAT csv'
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return inserted
+        inserted += len(batch)
+        if connection.vendor == 'postgresql':
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(batch)
+            buffer.seek(0)
+            with connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f'COPY {model._meta.db_table} ({", ".join(columns)}) FROM STDIN WITH ({options})', buffer
+                )
+        else:
+            # Размер запроса bulk_create подбирает сам с учетом ограничений СУБД
+            model.objects.bulk_create([model(**dict(zip(columns, row))) for row in batch])
+
+
+def get_name(rng, index: int) -> str:
+    return f'{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)} {index + 1}'
+
+
+def generate(students: int = 1000, groups: int = 50, teachers: int = 20, subjects: int = 10, lessons: int = 10000,
+             absence_rate: float = 0.05, days: int = 180, seed: int = 0, batch_size: int = 5000) -> dict:
+    """Создает указанное число записей каждой модели; возвращает число созданных записей по моделям"""
+    rng = random.Random(seed)
+
+    now = timezone.now()
+
+    teacher_ids = reserve_ids(people_models.Teacher, teachers)
+    insert(people_models.Teacher, ('id', 'full_name', 'degree'), (
+        (pk, get_name(rng, index), rng.choice(DEGREES)) for index, pk in enumerate(teacher_ids)
+    ), batch_size)
+    subject_ids = reserve_ids(models.StudySubject, subjects)
+    insert(models.StudySubject, ('id', 'title'), (
+        (pk, f'{SUBJECTS[index % len(SUBJECTS)]} {index // len(SUBJECTS) + 1}')
+        for index, pk in enumerate(subject_ids)
+    ), batch_size)
+    student_ids = reserve_ids(people_models.Student, students)
+    insert(people_models.Student, ('id', 'full_name'), (
+        (pk, get_name(rng, index)) for index, pk in enumerate(student_ids)
+    ), batch_size)
+    group_ids = reserve_ids(people_models.StudentGroup, groups)
+    insert(people_models.StudentGroup, ('id', 'title'), (
+        (pk, f'Группа {index + 1:05d}') for index, pk in enumerate(group_ids)
+    ), batch_size)
+
+    members = {group_id: [] for group_id in group_ids}
+    for index, student_id in enumerate(student_ids):
+        if group_ids:
+            members[group_ids[index % len(group_ids)]].append(student_id)
+    memberships = insert(people_models.StudentGroup.students.through, ('studentgroup_id', 'student_id'), (
+        (group_id, student_id) for group_id, group_students in members.items() for student_id in group_students
+    ), batch_size)
+
+    today = datetime.combine(now.date(), time.min)
+    created = {'lessons': 0, 'absences': 0}
+    remaining = lessons if subject_ids else 0
+    while remaining > 0:
+        count = min(batch_size, remaining)
+        remaining -= count
+        batch, absences = [], []
+        for lesson_id in reserve_ids(models.Lesson, count):
+            date = today + timedelta(days=rng.randint(-days, days), hours=rng.randint(FIRST_HOUR, LAST_HOUR))
+            group_id = rng.choice(group_ids) if group_ids else None
+            status = date < today
+            batch.append((
+                lesson_id, date, rng.choice(subject_ids), rng.choice(teacher_ids) if teacher_ids else None,
+                group_id, status,
+            ))
+            group_students = members.get(group_id) if status else None
+            if group_students:
+                # Случайное округление дает в среднем absence_rate отсутствующих
+                size = min(len(group_students), int(len(group_students) * absence_rate + rng.random()))
+                absences.extend((lesson_id, student_id, '', date) for student_id in rng.sample(group_students, size))
+        created['lessons'] += insert(models.Lesson, (
+            'id', 'date', 'study_subject_id', 'teacher_id', 'student_group_id', 'status',
+        ), batch, batch_size)
+        created['absences'] += insert(models.Attendance, ('lesson_id', 'student_id', 'reason', 'marked_at'), absences,
+                                      batch_size)
+
+    return {
+        'teachers': len(teacher_ids),
+        'subjects': len(subject_ids),
+        'students': len(student_ids),
+        'groups': len(group_ids),
+        'memberships': memberships,
+        **created,
+    }
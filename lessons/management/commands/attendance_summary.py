@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from lessons import summary
+
+
+class Command(BaseCommand):
+    help = (
+        'Обслуживает сводку посещаемости: rebuild — пересчитывает ее по занятиям целиком, '
+        'check — сверяет с занятиями и завершается с ошибкой при расхождениях.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=('rebuild', 'check'))
+        parser.add_argument('--batch-size', type=int, default=5000, help='Размер пачки для bulk_create')
+        parser.add_argument('--show', type=int, default=20, help='Сколько расхождений вывести при проверке')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['action'] == 'rebuild':
+            with transaction.atomic():
+                rows = summary.rebuild(options['batch_size'])
+            self.stdout.write(f'Сводка пересчитана: {rows} строк за {time.monotonic() - started:.1f} с')
+            return
+
+        mismatches = summary.check()
+        if not mismatches:
+            self.stdout.write(f'Сводка совпадает с занятиями (проверка заняла {time.monotonic() - started:.1f} с)')
+            return
+
+        for (student_id, subject_id, period, period_start), stored, actual in mismatches[:options['show']]:
+            self.stdout.write(
+                f'студент {student_id}, предмет {subject_id}, {period} {period_start}: '
+                f'в сводке {stored}, по занятиям {actual}'
+            )
+        raise CommandError(
+            f'Найдено расхождений: {len(mismatches)}. Выполните `manage.py attendance_summary rebuild`.'
+        )
@@ -0,0 +1,167 @@
+import json
+import platform
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from lessons.models import Attendance
+from lessons.urls import router as lessons_router
+from people.models import StudentGroup
+from people.urls import router as people_router
+from school.metrics import QueryRecorder
+
+ROUTERS = (people_router, lessons_router)
+PERCENTILES = (50, 90, 95, 99)
+
+# Параметры маршрутов, которые без них отвечают ошибкой
+ROUTE_PARAMS = {
+    'timetable-list': lambda: {'group': StudentGroup.objects.order_by('pk').values_list('pk', flat=True).first()},
+}
+# Аргументы адресов вложенных маршрутов
+ROUTE_ARGS = {
+    'student-absences-list': lambda: Attendance.objects.order_by('student_id').values_list('student_id', flat=True)[:1],
+}
+
+
+def get_routes() -> list:
+    """Возвращает GET-маршруты роутеров people и lessons: (имя маршрута, модель для записи или None)"""
+    routes = []
+    for router in ROUTERS:
+        for _, viewset, basename in router.registry:
+            for route in router.get_routes(viewset):
+                if 'get' not in router.get_method_map(viewset, route.mapping):
+                    continue
+                model = viewset.queryset.model if route.detail else None
+                routes.append((route.name.format(basename=basename), model))
+    return routes
+
+
+def percentile(values: list, percent: int) -> float:
+    """Процентиль по ближайшему рангу"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, -(-len(ordered) * percent // 100) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку (процентили) и число запросов в секунду для GET-маршрутов people и lessons. '
+        'Запросы выполняются в процессе через тестовый клиент Django; результаты пишутся в JSON для сравнения прогонов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Число замеряемых запросов к каждому маршруту')
+        parser.add_argument('--warmup', type=int, default=3, help='Число запросов для прогрева перед замером')
+        parser.add_argument('--route', action='append', default=[], help='Замерить только указанные маршруты')
+        parser.add_argument('--no-cache', action='store_true', help='Отключить кэш ответов API')
+        parser.add_argument('--output', metavar='PATH', help='Записать результаты в JSON-файл')
+        parser.add_argument('--compare', metavar='PATH', help='Сравнить с результатами предыдущего прогона')
+
+    def handle(self, *args, **options):
+        if options['requests'] <= 0:
+            raise CommandError('Число запросов должно быть положительным.')
+        routes = get_routes()
+        unknown = set(options['route']) - {name for name, _ in routes}
+        if unknown:
+            raise CommandError(f'Неизвестные маршруты: {", ".join(sorted(unknown))}.')
+        if options['route']:
+            routes = [(name, model) for name, model in routes if name in options['route']]
+
+        previous = self.load(options['compare']) if options['compare'] else {}
+        client = Client(HTTP_HOST='localhost')
+        results = []
+        with ExitStack() as stack:
+            if options['no_cache']:
+                stack.enter_context(override_settings(API_CACHE_TIMEOUT=0))
+            for name, model in routes:
+                result = self.measure(client, name, model, options['requests'], options['warmup'])
+                results.append(result)
+                self.report(result, previous.get(name))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump({
+                    'created': timezone.now().isoformat(),
+                    'database': connection.vendor,
+                    'python': platform.python_version(),
+                    'cache': not options['no_cache'] and settings.API_CACHE_TIMEOUT > 0,
+                    'requests': options['requests'],
+                    'routes': results,
+                }, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результаты записаны в {options["output"]}')
+
+    @staticmethod
+    def get_path(name: str, model):
+        if name in ROUTE_ARGS:
+            args = list(ROUTE_ARGS[name]())
+            return reverse(name, args=args) if args else None
+        if model is None:
+            return reverse(name)
+        pk = model.objects.order_by('pk').values_list('pk', flat=True).first()
+        return reverse(name, args=[pk]) if pk is not None else None
+
+    def measure(self, client, name: str, model, requests: int, warmup: int) -> dict:
+        path = self.get_path(name, model)
+        if path is None:
+            return {'route': name, 'path': None, 'skipped': 'нет записей'}
+        params = ROUTE_PARAMS[name]() if name in ROUTE_PARAMS else {}
+
+        for _ in range(warmup):
+            self.request(client, path, params)
+
+        durations, queries = [], []
+        started = time.perf_counter()
+        for _ in range(requests):
+            recorder = QueryRecorder()
+            request_started = time.perf_counter()
+            with ExitStack() as stack:
+                for alias_connection in connections.all():
+                    stack.enter_context(alias_connection.execute_wrapper(recorder))
+                status_code, size = self.request(client, path, params)
+            durations.append(time.perf_counter() - request_started)
+            queries.append(recorder.count)
+        elapsed = time.perf_counter() - started
+
+        return {
+            'route': name,
+            'path': path,
+            'params': params,
+            'status': status_code,
+            'bytes': size,
+            'queries': max(queries),
+            'rps': round(requests / elapsed, 2),
+            'mean_ms': round(sum(durations) / len(durations) * 1000, 3),
+            **{f'p{percent}_ms': round(percentile(durations, percent) * 1000, 3) for percent in PERCENTILES},
+        }
+
+    @staticmethod
+    def request(client, path: str, params: dict) -> tuple:
+        response = client.get(path, params)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, len(content)
+
+    def report(self, result: dict, previous: dict = None) -> None:
+        if 'skipped' in result:
+            self.stdout.write(f'{result["route"]:<24} пропущен: {result["skipped"]}')
+            return
+        line = (
+            f'{result["route"]:<24} {result["status"]}  p50 {result["p50_ms"]:>9.2f} мс  '
+            f'p99 {result["p99_ms"]:>9.2f} мс  {result["rps"]:>9.1f} запр/с  SQL {result["queries"]}'
+        )
+        if previous and previous.get('rps'):
+            line += f'  ({(result["rps"] / previous["rps"] - 1) * 100:+.1f}% запр/с)'
+        self.stdout.write(line)
+
+    @staticmethod
+    def load(path: str) -> dict:
+        try:
+            with open(path, encoding='utf-8') as file:
+                return {result['route']: result for result in json.load(file)['routes']}
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Не удалось прочитать результаты {path}: {error}')
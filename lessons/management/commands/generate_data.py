@@ -0,0 +1,85 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from lessons import generator, models, summary, timetable
+from people import models as people_models
+from school import cache
+
+MODELS = (models.Lesson, models.StudySubject, people_models.Student, people_models.Teacher,
+          people_models.StudentGroup)
+# Порядок удаления: сначала таблицы, ссылающиеся на остальные
+CLEAR_ORDER = (models.AttendanceSummary, models.Lesson.missing_students.through, models.Lesson, models.StudySubject,
+               people_models.StudentGroup.students.through, people_models.StudentGroup, people_models.Student,
+               people_models.Teacher)
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает синтетические данные для нагрузочных замеров: преподавателей, предметы, студентов, группы и занятия '
+        'с отсутствующими. Записи вставляются пачками: на PostgreSQL командой COPY, на других СУБД через bulk_create. '
+        'Сводка посещаемости пересчитывается в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000, help='Число студентов')
+        parser.add_argument('--groups', type=int, default=50, help='Число групп')
+        parser.add_argument('--teachers', type=int, default=20, help='Число преподавателей')
+        parser.add_argument('--subjects', type=int, default=10, help='Число предметов')
+        parser.add_argument('--lessons', type=int, default=10000, help='Число занятий')
+        parser.add_argument('--absence-rate', type=float, default=0.05, help='Доля отсутствующих на занятии')
+        parser.add_argument('--days', type=int, default=180, help='Занятия распределяются на столько дней до и после '
+                                                                  'текущей даты')
+        parser.add_argument('--seed', type=int, default=0, help='Начальное значение генератора случайных чисел')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Число записей в пачке (COPY на PostgreSQL, bulk_create на других СУБД)')
+        parser.add_argument('--clear', action='store_true', help='Удалить существующие данные перед генерацией')
+        parser.add_argument('--no-summary', action='store_true',
+                            help='Не пересчитывать сводку посещаемости (выполните attendance_summary rebuild позже)')
+
+    def handle(self, *args, **options):
+        counts = {name: options[name] for name in ('students', 'groups', 'teachers', 'subjects', 'lessons')}
+        if any(value < 0 for value in counts.values()) or options['batch_size'] <= 0:
+            raise CommandError('Число записей не может быть отрицательным, а размер пачки должен быть положительным.')
+        if not 0 <= options['absence_rate'] <= 1:
+            raise CommandError('Доля отсутствующих должна быть от 0 до 1.')
+
+        started = time.monotonic()
+        with transaction.atomic():
+            if options['clear']:
+                self.clear()
+            created = generator.generate(
+                **counts, absence_rate=options['absence_rate'], days=options['days'], seed=options['seed'],
+                batch_size=options['batch_size'],
+            )
+            generated = time.monotonic()
+            # Данные вставлены в обход сигналов, которые поддерживают сводку и кэш
+            summary_rows = None if options['no_summary'] else summary.rebuild(options['batch_size'])
+            cache.invalidate(*MODELS)
+            timetable.invalidate_all()
+
+        finished = time.monotonic()
+        self.stdout.write(', '.join(f'{name}: {value}' for name, value in created.items()))
+        self.stdout.write(f'Данные созданы за {generated - started:.1f} с')
+        if summary_rows is not None:
+            self.stdout.write(f'Сводка посещаемости пересчитана за {finished - generated:.1f} с: {summary_rows} строк')
+
+    @staticmethod
+    def clear() -> None:
+        """
+        Удаляет существующие данные.
+
+        На PostgreSQL таблицы очищаются одним TRUNCATE ... CASCADE; промежуточная таблица отсутствующих указана явно,
+        так как у секционированной таблицы занятий нет внешнего ключа из нее (см. lessons.partitions).
+        На остальных СУБД записи удаляются обычным delete() с каскадом и сигналами.
+        """
+        if connection.vendor == 'postgresql':
+            tables = ', '.join(connection.ops.quote_name(model._meta.db_table) for model in CLEAR_ORDER)
+            with connection.cursor() as cursor:
+                cursor.execute(f'TRUNCATE {tables} CASCADE')
+            return
+        # Сводка удаляется целиком, поэтому вклад удаляемых занятий не вычитается
+        with summary.suspended():
+            for model in CLEAR_ORDER:
+                model.objects.all().delete()
@@ -0,0 +1,106 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from lessons import partitions, timetable
+from lessons.models import Lesson, LessonArchive
+from school import cache
+
+
+class Command(BaseCommand):
+    help = (
+        'Обслуживает секции занятий по месяцам (PostgreSQL, LESSON_PARTITIONING=True): status — список секций, '
+        'enable — секционирует таблицу занятий, create — создает секции на ближайшие месяцы, '
+        'archive — выгружает в архив или отключает секции старше срока хранения, restore — подключает '
+        'отключенные секции и восстанавливает секции из архивов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=('status', 'enable', 'create', 'archive', 'restore'))
+        parser.add_argument('targets', nargs='*', help='Для restore: имена секций или пути к архивам')
+        parser.add_argument('--months-ahead', type=int, default=3,
+                            help='Сколько месяцев после текущего покрыть секциями (enable, create)')
+        parser.add_argument('--retention-months', type=int, default=settings.LESSON_RETENTION_MONTHS,
+                            help='Сколько месяцев до текущего оставить в таблице (archive)')
+        parser.add_argument('--output-dir', default=settings.LESSON_ARCHIVE_DIR, help='Каталог архивов (archive)')
+        parser.add_argument('--detach-only', action='store_true',
+                            help='Отключить секции от таблицы, оставив их в базе, без выгрузки в архив (archive)')
+
+    def handle(self, *args, **options):
+        connection = connections[router.db_for_write(Lesson)]
+        if connection.vendor != 'postgresql':
+            raise CommandError('Секционирование занятий поддерживается только на PostgreSQL.')
+        if not settings.LESSON_PARTITIONING:
+            raise CommandError('Секционирование занятий выключено: задайте LESSON_PARTITIONING=True.')
+
+        action = options['action']
+        partitioned = partitions.is_partitioned(connection)
+        if action == 'enable':
+            if partitioned:
+                raise CommandError('Таблица занятий уже секционирована.')
+            with transaction.atomic(using=connection.alias):
+                partitions.partition(connection, options['months_ahead'])
+            self.stdout.write(f'Таблица занятий секционирована: {len(partitions.get_partitions(connection))} секций')
+            return
+        if not partitioned:
+            raise CommandError('Таблица занятий не секционирована: выполните `manage.py lesson_partitions enable`.')
+
+        try:
+            getattr(self, action)(connection, **options)
+        except partitions.PartitionError as error:
+            raise CommandError(error)
+
+    def status(self, connection, **options):
+        for partition in partitions.get_partitions(connection):
+            bounds = f'{partition.start} – {partition.end}' if partition.start else 'по умолчанию'
+            self.stdout.write(f'{partition.name}: {bounds}, ~{partition.rows} строк')
+        for archive in LessonArchive.objects.order_by('month'):
+            name = partitions.get_partition_name(archive.month)
+            self.stdout.write(f'{name}: ' + (f'в архиве {archive.path}' if archive.path else 'отключена'))
+
+    def create(self, connection, **options):
+        current = partitions.month_start(timezone.now())
+        with transaction.atomic(using=connection.alias):
+            created = [
+                partitions.get_partition_name(start)
+                for start in (partitions.add_months(current, months) for months in range(options['months_ahead'] + 1))
+                if partitions.create_partition(connection, start)
+            ]
+        self.stdout.write(f'Создано секций: {len(created)}' + (f' ({", ".join(created)})' if created else ''))
+
+    def archive(self, connection, **options):
+        cutoff = partitions.add_months(partitions.month_start(timezone.now()), -options['retention_months'])
+        for partition in partitions.get_partitions(connection):
+            if partition.end is None or partition.end > cutoff:
+                continue
+            # Каждая секция выгружается в своей транзакции, чтобы уже выгруженные не возвращались при ошибке
+            with transaction.atomic(using=connection.alias):
+                if options['detach_only']:
+                    partitions.detach(connection, partition)
+                    result = 'отключена'
+                else:
+                    result = f'выгружена в {partitions.archive(connection, partition, options["output_dir"])}'
+                cache.invalidate(Lesson)
+                timetable.invalidate_all()
+            self.stdout.write(f'{partition.name}: {result}')
+
+    def restore(self, connection, targets, **options):
+        if not targets:
+            raise CommandError('Укажите имена секций или пути к архивам.')
+        for target in targets:
+            with transaction.atomic(using=connection.alias):
+                if os.path.isfile(target):
+                    name = partitions.restore(connection, target)
+                else:
+                    name = target
+                    archive = LessonArchive.objects.filter(month=partitions.parse_partition_name(name)).first()
+                    if archive is not None and archive.path:
+                        partitions.restore(connection, archive.path)
+                    else:
+                        partitions.attach(connection, name)
+                cache.invalidate(Lesson)
+                timetable.invalidate_all()
+            self.stdout.write(f'{name}: подключена')
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from lessons.models import StudySubject
+from people.models import Teacher, StudentGroup
+from school import cache
+
+CACHED_ROUTES = (
+    ('subject', StudySubject),
+    ('teacher', Teacher),
+    ('group', StudentGroup),
+)
+
+
+class Command(BaseCommand):
+    help = 'Заполняет кэш ответов API для списков предметов, преподавателей и групп и, по желанию, их записей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='localhost:8000', help='Значение заголовка Host, входящее в ключ кэша')
+        parser.add_argument('--details', action='store_true', help='Заполнить кэш записи каждого объекта')
+
+    def handle(self, *args, **options):
+        factory = RequestFactory(HTTP_HOST=options['host'])
+        warmed = requested = 0
+        for basename, model in CACHED_ROUTES:
+            paths = [reverse(f'{basename}-list')]
+            if options['details']:
+                paths = [*paths, *(reverse(f'{basename}-detail', args=[pk])
+                                   for pk in model.objects.values_list('pk', flat=True).iterator())]
+            for path in paths:
+                requested += 1
+                warmed += self.warm(factory, path)
+
+        stats = cache.get_stats()
+        self.stdout.write(
+            f'Запрошено {requested} адресов, добавлено в кэш {warmed}. '
+            f'Попаданий в кэш: {stats["hits"]}, промахов: {stats["misses"]}.'
+        )
+
+    @staticmethod
+    def warm(factory, path: str) -> bool:
+        match = resolve(path)
+        response = match.func(factory.get(path), *match.args, **match.kwargs)
+        return response.get('X-Cache') == 'MISS' and response.status_code == 200
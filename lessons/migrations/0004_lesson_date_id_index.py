@@ -0,0 +1,17 @@
+# Generated by Django 2.2 on 2026-10-18 08:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0003_auto_20230422_1824'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['date', 'id'], name='lesson_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.2 on 2026-10-18 08:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0004_lesson_date_id_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studysubject',
+            name='title',
+            field=models.CharField(db_index=True, max_length=255, verbose_name='Наименование'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['student_group', 'date'], name='lesson_group_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['teacher', 'date'], name='lesson_teacher_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(condition=models.Q(status=False), fields=['date'], name='lesson_not_completed_idx'),
+        ),
+    ]
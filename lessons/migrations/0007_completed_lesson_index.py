@@ -0,0 +1,17 @@
+# Generated by Django 2.2 on 2026-10-18 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0006_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(condition=models.Q(status=True), fields=['date', 'student_group'], name='lesson_completed_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 2.2 on 2026-10-18 08:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('people', '0003_updated_at'),
+        ('lessons', '0007_completed_lesson_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('week', 'Неделя'), ('month', 'Месяц')], max_length=5, verbose_name='Период')),
+                ('period_start', models.DateField(verbose_name='Начало периода')),
+                ('expected', models.PositiveIntegerField(default=0, verbose_name='Ожидаемые посещения')),
+                ('absences', models.PositiveIntegerField(default=0, verbose_name='Пропуски')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='people.Student', verbose_name='Студент')),
+                ('study_subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='lessons.StudySubject', verbose_name='Предмет обучения')),
+            ],
+            options={
+                'verbose_name': 'Сводка посещаемости',
+                'verbose_name_plural': 'Сводки посещаемости',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='attendancesummary',
+            constraint=models.UniqueConstraint(fields=('period', 'period_start', 'study_subject', 'student'), name='attendance_summary_key'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2 on 2026-10-18 10:12
+
+from django.contrib.postgres.indexes import GinIndex
+from django.db import migrations
+
+
+def can_use_trigram(schema_editor) -> bool:
+    """Расширение pg_trgm входит в пакет contrib PostgreSQL и может быть не установлено на сервере"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm')")
+        return cursor.fetchone()[0]
+
+
+class AddIndex(migrations.AddIndex):
+    """Индекс gin_trgm_ops создается только при доступном pg_trgm, иначе меняется только состояние моделей"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if can_use_trigram(schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if can_use_trigram(schema_editor):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0008_attendance_summary'),
+        # Расширение pg_trgm создается миграцией people
+        ('people', '0004_full_name_trigram_index'),
+    ]
+
+    operations = [
+        AddIndex(
+            model_name='studysubject',
+            index=GinIndex(fields=['title'], name='subject_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
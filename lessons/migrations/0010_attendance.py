@@ -0,0 +1,66 @@
+# Generated by Django 2.2 on 2026-10-18 11:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('people', '0004_full_name_trigram_index'),
+        ('lessons', '0009_title_trigram_index'),
+    ]
+
+    operations = [
+        # Таблица и ограничения автоматической промежуточной модели совпадают с новой моделью,
+        # поэтому меняется только состояние миграций
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Attendance',
+                    fields=[
+                        ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('lesson', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lessons.Lesson', verbose_name='Занятие')),
+                        ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='people.Student', verbose_name='Студент')),
+                    ],
+                    options={
+                        'verbose_name': 'Отметка об отсутствии',
+                        'verbose_name_plural': 'Отметки об отсутствии',
+                        'db_table': 'lessons_lesson_missing_students',
+                        'unique_together': {('lesson', 'student')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='lesson',
+                    name='missing_students',
+                    field=models.ManyToManyField(blank=True, through='lessons.Attendance', to='people.Student', verbose_name='Отсутствующие студенты'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='reason',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Причина'),
+        ),
+        # Существующие отметки остаются без даты: столбец добавляется без значения по умолчанию
+        migrations.AddField(
+            model_name='attendance',
+            name='marked_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата отметки'),
+        ),
+        migrations.AlterField(
+            model_name='attendance',
+            name='marked_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True, verbose_name='Дата отметки'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student', 'lesson'], name='attendance_student_lesson_idx'),
+        ),
+        migrations.AlterField(
+            model_name='attendance',
+            name='student',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='people.Student', verbose_name='Студент'),
+        ),
+    ]
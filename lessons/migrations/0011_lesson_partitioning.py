@@ -0,0 +1,27 @@
+# Generated by Django 2.2 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0010_attendance'),
+    ]
+
+    # Таблицу занятий секционирует команда `lesson_partitions enable`, миграции ее не меняют
+    operations = [
+        migrations.CreateModel(
+            name='LessonArchive',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True, verbose_name='Месяц')),
+                ('path', models.CharField(blank=True, default='', max_length=1024, verbose_name='Файл архива')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата архивации')),
+            ],
+            options={
+                'verbose_name': 'Архив занятий',
+                'verbose_name_plural': 'Архивы занятий',
+            },
+        ),
+    ]
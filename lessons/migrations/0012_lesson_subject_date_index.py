@@ -0,0 +1,17 @@
+# Generated by Django 2.2 on 2026-10-18 10:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0011_lesson_partitioning'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['study_subject', 'date', 'id'], name='lesson_subject_date_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 2.2 on 2026-10-18 11:37
+
+from django.db import migrations
+
+
+class RemoveField(migrations.RemoveField):
+    """
+    SQLite удаляет столбец пересозданием таблицы по состоянию модели. Django 2.2 переносит в новую таблицу условие
+    частичного индекса с именем временной таблицы, и индекс не создается, а индексы gin_trgm_ops миграции
+    с индексами pg_trgm на SQLite не создают. Такие индексы исключаются из пересоздания, частичные создаются после него
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        self.remake(super().database_forwards, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        self.remake(super().database_backwards, app_label, schema_editor, from_state, to_state)
+
+    def remake(self, operation, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'sqlite':
+            return operation(app_label, schema_editor, from_state, to_state)
+        partial = [
+            index for index in to_state.models[app_label, self.model_name_lower].options.get('indexes', [])
+            if index.condition is not None
+        ]
+        from_state, to_state = from_state.clone(), to_state.clone()
+        for state in from_state, to_state:
+            options = state.models[app_label, self.model_name_lower].options
+            options['indexes'] = [
+                index for index in options.get('indexes', []) if index.condition is None and not index.opclasses
+            ]
+            state.reload_model(app_label, self.model_name_lower, delay=True)
+        operation(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        for index in partial:
+            schema_editor.add_index(model, index)
+
+
+def drop_detached_updated_at(apps, schema_editor):
+    """
+    Отключенные секции занятий (`lesson_partitions archive --detach-only`) не входят в таблицу, и RemoveField
+    их не меняет; без столбца updated_at их можно снова подключить
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relname FROM pg_class WHERE relkind = 'r' AND NOT relispartition "
+            "AND relnamespace = current_schema()::regnamespace AND relname ~ '^lessons_lesson_p[0-9]{4}_[0-9]{2}$'"
+        )
+        for name, in cursor.fetchall():
+            cursor.execute(f'ALTER TABLE {name} DROP COLUMN IF EXISTS updated_at')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0012_lesson_subject_date_index'),
+    ]
+
+    operations = [
+        RemoveField(
+            model_name='lesson',
+            name='updated_at',
+        ),
+        RemoveField(
+            model_name='studysubject',
+            name='updated_at',
+        ),
+        migrations.RunPython(drop_detached_updated_at, migrations.RunPython.noop),
+    ]
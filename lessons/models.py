@@ -1,14 +1,20 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
+from django.utils import timezone
 
 from people.models import Teacher, StudentGroup, Student
 
 
 class StudySubject(models.Model):
-    title = models.CharField(max_length=255, verbose_name='Наименование')
+    title = models.CharField(max_length=255, db_index=True, verbose_name='Наименование')
 
     class Meta:
         verbose_name = 'Предмет обучения'
         verbose_name_plural = 'Предметы обучения'
+        # Индекс gin_trgm_ops создается только на PostgreSQL с pg_trgm (см. миграцию 0009)
+        indexes = [
+            GinIndex(fields=['title'], name='subject_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return self.title
@@ -26,11 +32,98 @@ class Lesson(models.Model):
                                       verbose_name='Группы обучаемых')
     date = models.DateTimeField(verbose_name='Дата проведения')
     status = models.BooleanField(default=False, choices=LESSON_STATUS, verbose_name='Состояние занятия')
-    missing_students = models.ManyToManyField(Student, blank=True, verbose_name='Отсутствующие студенты')
+    missing_students = models.ManyToManyField(Student, through='Attendance', blank=True,
+                                              verbose_name='Отсутствующие студенты')
 
     class Meta:
         verbose_name = 'Занятие'
         verbose_name_plural = 'Занятия'
+        indexes = [
+            models.Index(fields=['date', 'id'], name='lesson_date_id_idx'),
+            models.Index(fields=['student_group', 'date'], name='lesson_group_date_idx'),
+            models.Index(fields=['teacher', 'date'], name='lesson_teacher_date_idx'),
+            models.Index(fields=['study_subject', 'date', 'id'], name='lesson_subject_date_idx'),
+            models.Index(fields=['date'], name='lesson_not_completed_idx', condition=models.Q(status=False)),
+            models.Index(fields=['date', 'student_group'], name='lesson_completed_idx',
+                         condition=models.Q(status=True)),
+        ]
 
     def __str__(self):
         return self.study_subject.title
+
+
+class Attendance(models.Model):
+    """
+    Отметка об отсутствии студента на занятии: промежуточная модель связи Lesson.missing_students.
+
+    Хранится в таблице, созданной для автоматической промежуточной модели. Индекс (student, lesson) позволяет
+    выбирать историю пропусков студента диапазоном по индексу; отметки, сделанные до появления модели,
+    не имеют даты `marked_at`.
+    """
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, verbose_name='Занятие')
+    # Отдельный индекс не нужен: поиск по студенту использует составной индекс (student, lesson)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, db_index=False, verbose_name='Студент')
+    reason = models.CharField(max_length=255, blank=True, default='', verbose_name='Причина')
+    marked_at = models.DateTimeField(null=True, blank=True, default=timezone.now, verbose_name='Дата отметки')
+
+    class Meta:
+        db_table = 'lessons_lesson_missing_students'
+        verbose_name = 'Отметка об отсутствии'
+        verbose_name_plural = 'Отметки об отсутствии'
+        unique_together = (('lesson', 'student'),)
+        indexes = [
+            models.Index(fields=['student', 'lesson'], name='attendance_student_lesson_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.student_id}: {self.lesson_id}'
+
+
+class AttendanceSummary(models.Model):
+    """
+    Сводка посещаемости студента по предмету за неделю или месяц.
+
+    Поддерживается сигналами при изменении занятий, отсутствующих и состава групп (см. lessons.summary);
+    пересчитывается и сверяется с занятиями командой `attendance_summary`.
+    """
+    PERIODS = (
+        ('week', 'Неделя'),
+        ('month', 'Месяц'),
+    )
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='+', verbose_name='Студент')
+    study_subject = models.ForeignKey(StudySubject, on_delete=models.CASCADE, related_name='+',
+                                      verbose_name='Предмет обучения')
+    period = models.CharField(max_length=5, choices=PERIODS, verbose_name='Период')
+    period_start = models.DateField(verbose_name='Начало периода')
+    expected = models.PositiveIntegerField(default=0, verbose_name='Ожидаемые посещения')
+    absences = models.PositiveIntegerField(default=0, verbose_name='Пропуски')
+
+    class Meta:
+        verbose_name = 'Сводка посещаемости'
+        verbose_name_plural = 'Сводки посещаемости'
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'period_start', 'study_subject', 'student'],
+                                    name='attendance_summary_key'),
+        ]
+
+    def __str__(self):
+        return f'{self.student_id}: {self.study_subject_id} ({self.period} {self.period_start})'
+
+
+class LessonArchive(models.Model):
+    """
+    Месяц занятий, секция которого отключена от таблицы или выгружена в архив командой `lesson_partitions`.
+
+    Строки сводки посещаемости за периоды, начавшиеся до конца последнего такого месяца, не пересчитываются
+    по занятиям (см. lessons.partitions).
+    """
+    month = models.DateField(unique=True, verbose_name='Месяц')
+    path = models.CharField(max_length=1024, blank=True, default='', verbose_name='Файл архива')
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата архивации')
+
+    class Meta:
+        verbose_name = 'Архив занятий'
+        verbose_name_plural = 'Архивы занятий'
+
+    def __str__(self):
+        return f'{self.month:%Y-%m}'
@@ -0,0 +1,133 @@
+from base64 import b64decode, b64encode
+from collections import namedtuple
+from urllib import parse
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+Cursor = namedtuple('Cursor', ['reverse', 'position', 'pk'])
+
+
+class LessonCursorPagination(CursorPagination):
+    """
+    Keyset-пагинация занятий по паре (date, id).
+
+    Курсор хранит значения ключа последней записи страницы, поэтому следующая страница
+    выбирается диапазонным условием по составному индексу, а не через OFFSET.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('date', 'id')
+
+    def get_ordering(self, request, queryset, view) -> tuple:
+        """Дополняет сортировку из OrderingFilter уникальным ключом id с тем же направлением"""
+        key = super().get_ordering(request, queryset, view)[0]
+        if key.lstrip('-') in ('id', 'pk'):
+            return (key,)
+        return key, '-id' if key.startswith('-') else 'id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        reverse = self.cursor is not None and self.cursor.reverse
+        ordering = self._reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(self._get_keyset_filter(ordering, self.cursor))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > self.page_size
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.cursor is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.page:
+            return self.encode_cursor(self._get_cursor_from_instance(self.page[-1], reverse=False))
+        return self.encode_cursor(self.cursor._replace(reverse=False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.page:
+            return self.encode_cursor(self._get_cursor_from_instance(self.page[0], reverse=True))
+        return self.encode_cursor(self.cursor._replace(reverse=True))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+            position = tokens.get('p', [None])[0]
+            pk = int(tokens['i'][0])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(reverse=reverse, position=position, pk=pk)
+
+    def encode_cursor(self, cursor):
+        tokens = {'i': str(cursor.pk)}
+        if cursor.reverse:
+            tokens['r'] = '1'
+        if cursor.position is not None:
+            tokens['p'] = cursor.position
+
+        querystring = parse.urlencode(tokens, doseq=True)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_cursor_from_instance(self, instance, reverse: bool) -> Cursor:
+        position = None
+        if len(self.ordering) > 1:
+            value = self._get_value(instance, self.ordering[0].lstrip('-'))
+            position = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        return Cursor(reverse=reverse, position=position, pk=self._get_value(instance, 'pk'))
+
+    @staticmethod
+    def _get_value(instance, name: str):
+        """Страница состоит из объектов или, при быстрой сериализации списка, из строк values()"""
+        return instance[name] if isinstance(instance, dict) else getattr(instance, name)
+
+    @staticmethod
+    def _reverse_ordering(ordering: tuple) -> tuple:
+        return tuple(key[1:] if key.startswith('-') else f'-{key}' for key in ordering)
+
+    @staticmethod
+    def _get_keyset_filter(ordering: tuple, cursor: Cursor) -> Q:
+        """Строит условие (key, id) > (position, pk) с учетом направления сортировки"""
+        key = ordering[0]
+        lookup = 'lt' if key.startswith('-') else 'gt'
+        if len(ordering) == 1:
+            return Q(**{f'pk__{lookup}': cursor.pk})
+
+        field = key.lstrip('-')
+        return Q(**{f'{field}__{lookup}e': cursor.position}) & (
+            Q(**{f'{field}__{lookup}': cursor.position}) | Q(**{field: cursor.position, f'id__{lookup}': cursor.pk})
+        )
@@ -0,0 +1,326 @@
+"""
+Секционирование таблицы занятий по месяцам (только PostgreSQL).
+
+Разрешается настройкой `LESSON_PARTITIONING` и включается командой `lesson_partitions enable` (миграции таблицу
+не меняют): таблица lessons_lesson пересоздается секционированной по диапазонам `date` — по секции на месяц
+и секция по умолчанию для дат вне созданных месяцев. Условия на дату (фильтры `?date_after=` / `?date_before=`, курсор
+пагинации) отсекают лишние секции еще при планировании запроса, а прошедшие месяцы командой `lesson_partitions`
+отключаются от таблицы или выгружаются в архив целиком, без DELETE и последующей очистки таблицы.
+
+Ограничения PostgreSQL:
+- первичный ключ секционированной таблицы должен включать ключ секционирования, поэтому он становится (id, date);
+  уникальность id по-прежнему обеспечивает последовательность;
+- на таблицу без уникального индекса по id нельзя сослаться внешним ключом, поэтому ограничение
+  lessons_lesson_missing_students.lesson_id снимается; отметки об отсутствии при удалении занятия удаляет ORM,
+  а удаление занятий в обход ORM (SQL DELETE, TRUNCATE, QuerySet._raw_delete) оставляет отметки без занятия —
+  их нужно удалять явно, как это делают `archive` и `generate_data --clear`;
+- запрос занятия по id без условия на дату проверяет индекс каждой секции.
+
+Отключенные и выгруженные месяцы записываются в LessonArchive. Строки сводки посещаемости за периоды, начавшиеся
+до конца последнего из них, остаются как есть и не пересчитываются по оставшимся занятиям (см. `get_retained_since`).
+"""
+import json
+import os
+import re
+import tarfile
+import tempfile
+from collections import namedtuple
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from lessons import models
+
+TABLE = models.Lesson._meta.db_table
+ATTENDANCE_TABLE = models.Attendance._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_NAME_RE = re.compile(rf'^{TABLE}_p(\d{{4}})_(\d{{2}})$')
+BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+ARCHIVE_MEMBERS = ('lessons.csv', 'attendance.csv')
+
+Partition = namedtuple('Partition', ['name', 'start', 'end', 'rows'])
+
+
+class PartitionError(Exception):
+    """Операцию с секцией нельзя выполнить"""
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(start: date, months: int) -> date:
+    index = start.year * 12 + start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def get_partition_name(start: date) -> str:
+    return f'{TABLE}_p{start:%Y_%m}'
+
+
+def parse_partition_name(name: str) -> date:
+    match = PARTITION_NAME_RE.match(name)
+    if match is None:
+        raise PartitionError(f'Таблица {name} не является секцией занятий за месяц.')
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def is_partitioned(connection) -> bool:
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))', [TABLE])
+        return cursor.fetchone()[0]
+
+
+def get_partitions(connection) -> list:
+    """
+    Возвращает секции таблицы занятий по возрастанию месяца; у секции по умолчанию границы — None, она последняя.
+
+    Число строк — оценка планировщика по последнему ANALYZE. Для несекционированной таблицы список пуст.
+    """
+    if connection.vendor != 'postgresql':
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint '
+            'FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%s)', [TABLE]
+        )
+        rows = cursor.fetchall()
+
+    partitions = []
+    for name, bound, estimate in rows:
+        match = BOUND_RE.search(bound)
+        start, end = (datetime.fromisoformat(value).date() for value in match.groups()) if match else (None, None)
+        partitions.append(Partition(name, start, end, max(estimate, 0)))
+    return sorted(partitions, key=lambda partition: (partition.start is None, partition.start))
+
+
+def get_detached(connection) -> list:
+    """Возвращает имена отключенных секций занятий, оставшихся в базе"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relname FROM pg_class WHERE relkind = 'r' AND NOT relispartition "
+            "AND relnamespace = current_schema()::regnamespace AND relname LIKE %s ORDER BY relname",
+            [f'{TABLE}_p%']
+        )
+        return [name for name, in cursor.fetchall() if PARTITION_NAME_RE.match(name)]
+
+
+def get_retained_since():
+    """
+    Возвращает начало месяца, следующего за последним отключенным или выгруженным, или None, если таких нет.
+
+    Занятия более ранних месяцев могут отсутствовать в таблице, поэтому строки сводки посещаемости
+    за периоды, начавшиеся раньше, не пересчитываются по оставшимся занятиям.
+    """
+    if not settings.LESSON_PARTITIONING:
+        return None
+    month = models.LessonArchive.objects.aggregate(month=Max('month'))['month']
+    return add_months(month, 1) if month else None
+
+
+def partition(connection, months_ahead: int = 3) -> None:
+    """
+    Пересоздает таблицу занятий секционированной по месяцам.
+
+    Секции покрывают месяцы от самого раннего занятия до текущего или самого позднего месяца и `months_ahead`
+    месяцев вперед. Выполняется в транзакции вызывающего кода.
+    """
+    _rebuild(connection, months_ahead)
+
+
+def unpartition(connection) -> None:
+    """Возвращает обычную таблицу занятий; отключенные секции и архивы в нее не переносятся"""
+    _rebuild(connection, None)
+
+
+def _rebuild(connection, months_ahead) -> None:
+    """
+    Переносит занятия в новую таблицу: секционированную, если задано `months_ahead`, иначе обычную.
+
+    Индексы и внешние ключи переносятся по определениям из каталога, последовательность id переходит
+    к новой таблице.
+    """
+    quote = connection.ops.quote_name
+    partitioned = months_ahead is not None
+    old = f'{TABLE}_old'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s '
+            'AND indexname <> %s', [TABLE, f'{TABLE}_pkey']
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = to_regclass(%s) "
+            "AND contype = 'f'", [TABLE]
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, conrelid::regclass::text FROM pg_constraint WHERE confrelid = to_regclass(%s) "
+            "AND contype = 'f'", [TABLE]
+        )
+        references = cursor.fetchall()
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [TABLE, 'id'])
+        sequence = cursor.fetchone()[0]
+
+        for name, table in references:
+            cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT {quote(name)}')
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {old}')
+        cursor.execute(f'ALTER TABLE {old} RENAME CONSTRAINT {TABLE}_pkey TO {old}_pkey')
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {quote(name)}')
+
+        cursor.execute(
+            f'CREATE TABLE {TABLE} (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+            + (' PARTITION BY RANGE (date)' if partitioned else '')
+        )
+        if partitioned:
+            cursor.execute(f'SELECT min(date), max(date) FROM {old}')
+            first, last = cursor.fetchone()
+            current = month_start(timezone.now())
+            start = min(month_start(first), current) if first else current
+            end = add_months(max(month_start(last), current) if last else current, months_ahead + 1)
+            while start < end:
+                cursor.execute(
+                    f'CREATE TABLE {get_partition_name(start)} PARTITION OF {TABLE} FOR VALUES FROM (%s) TO (%s)',
+                    [start, add_months(start, 1)]
+                )
+                start = add_months(start, 1)
+            cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT')
+
+        cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {old}')
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id')
+        cursor.execute(f'DROP TABLE {old}')
+
+        cursor.execute(f'ALTER TABLE {TABLE} ADD PRIMARY KEY ({"id, date" if partitioned else "id"})')
+        for _, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {quote(name)} {definition}')
+        if not partitioned:
+            # Отметки на занятия отключенных секций остаются в таблице, поэтому существующие строки не проверяются
+            cursor.execute(
+                f'ALTER TABLE {ATTENDANCE_TABLE} ADD CONSTRAINT {ATTENDANCE_TABLE}_lesson_id_fk '
+                f'FOREIGN KEY (lesson_id) REFERENCES {TABLE} (id) DEFERRABLE INITIALLY DEFERRED NOT VALID'
+            )
+        cursor.execute(f'ANALYZE {TABLE}')
+
+
+def _exists(cursor, name: str) -> bool:
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [name])
+    return cursor.fetchone()[0]
+
+
+def _attach(cursor, name: str, start: date) -> None:
+    """Подключает таблицу секцией месяца, перенося в нее занятия этого месяца из секции по умолчанию"""
+    end = add_months(start, 1)
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE date >= %s AND date < %s RETURNING *) '
+        f'INSERT INTO {name} SELECT * FROM moved', [start, end]
+    )
+    cursor.execute(f'ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)', [start, end])
+
+
+def create_partition(connection, start: date) -> bool:
+    """Создает секцию месяца, если ее еще нет; возвращает, была ли она создана"""
+    name = get_partition_name(start)
+    with connection.cursor() as cursor:
+        if _exists(cursor, name):
+            if name not in get_detached(connection):
+                return False
+            raise PartitionError(f'Секция {name} отключена: подключите ее командой `lesson_partitions restore {name}`.')
+        cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        _attach(cursor, name, start)
+    return True
+
+
+def detach(connection, partition: Partition) -> None:
+    """Отключает секцию от таблицы занятий; таблица секции и отметки об отсутствии на ее занятия остаются в базе"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {partition.name}')
+    models.LessonArchive.objects.update_or_create(month=partition.start, defaults={'path': ''})
+
+
+def attach(connection, name: str) -> None:
+    """Подключает обратно отключенную секцию"""
+    start = parse_partition_name(name)
+    if name not in get_detached(connection):
+        raise PartitionError(f'Отключенная секция {name} не найдена.')
+    with connection.cursor() as cursor:
+        _attach(cursor, name, start)
+    models.LessonArchive.objects.filter(month=start).delete()
+
+
+def archive(connection, partition: Partition, directory: str) -> str:
+    """
+    Выгружает занятия секции и отметки об отсутствии на них в архив `<секция>.tar.gz` и удаляет их из базы.
+
+    Архив с тем же именем перезаписывается: он остается от неудавшейся выгрузки или от уже восстановленной
+    секции. Возвращает путь к архиву.
+    """
+    path = os.path.join(directory, f'{partition.name}.tar.gz')
+    os.makedirs(directory, exist_ok=True)
+    queries = (
+        f'SELECT * FROM {partition.name}',
+        f'SELECT * FROM {ATTENDANCE_TABLE} WHERE lesson_id IN (SELECT id FROM {partition.name})',
+    )
+    manifest = {'table': partition.name, 'start': partition.start.isoformat(), 'end': partition.end.isoformat()}
+    with tempfile.TemporaryDirectory(dir=directory) as workdir, connection.cursor() as cursor:
+        for member, query in zip(ARCHIVE_MEMBERS, queries):
+            with open(os.path.join(workdir, member), 'wb') as file:
+                cursor.copy_expert(f'COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)', file)
+        with open(os.path.join(workdir, 'manifest.json'), 'w') as file:
+            json.dump(manifest, file)
+
+        with tarfile.open(os.path.join(workdir, 'archive.tar.gz'), 'w:gz') as tar:
+            for member in ('manifest.json', *ARCHIVE_MEMBERS):
+                tar.add(os.path.join(workdir, member), arcname=member)
+
+        cursor.execute(f'DELETE FROM {ATTENDANCE_TABLE} WHERE lesson_id IN (SELECT id FROM {partition.name})')
+        cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {partition.name}')
+        cursor.execute(f'DROP TABLE {partition.name}')
+        os.replace(os.path.join(workdir, 'archive.tar.gz'), path)
+    models.LessonArchive.objects.update_or_create(month=partition.start, defaults={'path': os.path.abspath(path)})
+    return path
+
+
+def _copy_from(cursor, table: str, file) -> None:
+    """
+    Загружает CSV с заголовком; столбцы берутся из заголовка, поэтому их порядок в таблице не важен.
+
+    Столбцы архива, удаленные из таблицы после выгрузки (например, updated_at), загружаются во временную таблицу
+    и отбрасываются.
+    """
+    quote = cursor.db.ops.quote_name
+    header = file.readline().decode().strip().split(',')
+    existing = {column.name for column in cursor.db.introspection.get_table_description(cursor, table)}
+    removed = [column for column in header if column not in existing]
+    target = f'{table}_restore' if removed else table
+    if removed:
+        cursor.execute(f'CREATE TEMP TABLE {target} (LIKE {table})')
+        for column in removed:
+            cursor.execute(f'ALTER TABLE {target} ADD COLUMN {quote(column)} text')
+    cursor.copy_expert(f'COPY {target} ({", ".join(map(quote, header))}) FROM STDIN WITH (FORMAT csv)', file)
+    if removed:
+        columns = ', '.join(quote(column) for column in header if column in existing)
+        cursor.execute(f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {target}')
+        cursor.execute(f'DROP TABLE {target}')
+
+
+def restore(connection, path: str) -> str:
+    """Восстанавливает секцию и отметки об отсутствии из архива; возвращает имя секции"""
+    with tarfile.open(path, 'r:gz') as tar, connection.cursor() as cursor:
+        manifest = json.load(tar.extractfile('manifest.json'))
+        name = manifest['table']
+        if _exists(cursor, name):
+            raise PartitionError(f'Таблица {name} уже есть в базе.')
+
+        cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        _copy_from(cursor, name, tar.extractfile(ARCHIVE_MEMBERS[0]))
+        _attach(cursor, name, date.fromisoformat(manifest['start']))
+        _copy_from(cursor, ATTENDANCE_TABLE, tar.extractfile(ARCHIVE_MEMBERS[1]))
+    models.LessonArchive.objects.filter(month=parse_partition_name(name)).delete()
+    return name
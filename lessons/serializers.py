@@ -1,11 +1,18 @@
-from django.db.models import Q
+from datetime import timedelta
+from functools import partial
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connection, transaction
+from django.db.models.signals import m2m_changed
 from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework.relations import MANY_RELATION_KWARGS
 
-from lessons import models
+from lessons import models, summary, timetable
 from people import models as people_models
 from people import serializers as people_serializers
+from school import cache
 
 
 class LessonSerializer(serializers.ModelSerializer):
@@ -47,13 +54,234 @@ class LessonListSerializer(serializers.ModelSerializer):
         exclude = ['id', 'study_subject']
 
 
-class LessonCreateSerializer(serializers.ModelSerializer):
+def to_pk(model, value):
+    """Приводит значение к типу первичного ключа модели или возвращает None"""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return model._meta.pk.to_python(value)
+    except (TypeError, ValueError, DjangoValidationError):
+        return None
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Разрешает список первичных ключей одним запросом вместо отдельного запроса на каждый ключ"""
+
+    def to_internal_value(self, data) -> list:
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        queryset = child.get_queryset()
+        pks = []
+        for item in data:
+            if child.pk_field is not None:
+                item = child.pk_field.to_internal_value(item)
+            try:
+                if isinstance(item, bool):
+                    raise TypeError
+                pks.append(queryset.model._meta.pk.to_python(item))
+            except (TypeError, ValueError, DjangoValidationError):
+                child.fail('incorrect_type', data_type=type(item).__name__)
+
+        preloaded = child.get_preloaded_objects() or {}
+        objects = {pk: preloaded[pk] for pk in pks if pk in preloaded}
+        remaining = [pk for pk in pks if pk not in objects]
+        if remaining:
+            objects.update(queryset.in_bulk(remaining))
+        for pk in pks:
+            if pk not in objects:
+                child.fail('does_not_exist', pk_value=pk)
+        return [objects[pk] for pk in pks]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Первичный ключ, который берет объект из заранее загруженных сериализатором пачки, если он там есть"""
+
+    def to_internal_value(self, data):
+        preloaded = self.get_preloaded_objects()
+        if preloaded:
+            pk = to_pk(self.get_queryset().model, data)
+            if pk in preloaded:
+                return preloaded[pk]
+        return super().to_internal_value(data)
+
+    def get_preloaded_objects(self) -> dict:
+        return self.context.get('preloaded_objects', {}).get(self.get_queryset().model)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+
+class MissingStudentsMixin:
+    """
+    Оставляет в списке отсутствующих только студентов группы занятия.
+
+    Состав группы проверяется одним запросом к промежуточной таблице для всего списка. Студенты не из группы
+    по-прежнему молча отбрасываются; с параметром запроса `?report_rejected=true` их идентификаторы
+    возвращаются в поле `rejected_missing_students` ответа.
+    """
+    report_rejected_param = 'report_rejected'
+    serializer_related_field = BulkPrimaryKeyRelatedField
+
+    def filter_group_members(self, student_group: people_models.StudentGroup, students: list) -> list:
+        student_ids = {student.id for student in students}
+        group_members = self.context.get('group_members')
+        if group_members is not None:
+            members = group_members.get(student_group.id, set()) & student_ids
+        else:
+            members = set(people_models.StudentGroup.students.through.objects.filter(
+                studentgroup_id=student_group.id,
+                student_id__in=student_ids,
+            ).values_list('student_id', flat=True))
+
+        self.rejected_students = sorted(student_ids - members)
+        return [student for student in students if student.id in members]
+
+    def to_representation(self, instance) -> dict:
+        data = super().to_representation(instance)
+        if self.report_rejected:
+            data['rejected_missing_students'] = getattr(self, 'rejected_students', [])
+        return data
+
+    @property
+    def report_rejected(self) -> bool:
+        request = self.context.get('request')
+        if request is None:
+            return False
+        return request.query_params.get(self.report_rejected_param, '').lower() in ('1', 'true', 'yes')
+
+
+class LessonBulkListSerializer(serializers.ListSerializer):
+    """
+    Проверяет и сохраняет пачку занятий.
+
+    Связанные объекты и состав групп для всей пачки загружаются заранее несколькими запросами, занятия
+    записываются через bulk_create или bulk_update, а отсутствующие студенты — одной вставкой в промежуточную
+    таблицу, все в одной транзакции. Ошибки возвращаются списком, по элементу на каждое занятие.
+    """
+    max_batch_size = 1000
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('max_length', self.max_batch_size)
+        super().__init__(*args, **kwargs)
+
+    def to_internal_value(self, data) -> list:
+        if isinstance(data, list) and len(data) <= self.max_length:
+            self.preload(data)
+        return super().to_internal_value(data)
+
+    def preload(self, data: list) -> None:
+        """Загружает объекты, на которые ссылаются элементы пачки, и состав упомянутых групп"""
+        preloaded = {}
+        for name, field in self.child.fields.items():
+            relation = field.child_relation if isinstance(field, BulkManyRelatedField) else field
+            if field.read_only or not isinstance(relation, BulkPrimaryKeyRelatedField):
+                continue
+
+            model = relation.get_queryset().model
+            pks = set()
+            for item in data:
+                value = item.get(name) if isinstance(item, dict) else None
+                for pk in value if isinstance(value, list) else [value]:
+                    pks.add(to_pk(model, pk))
+            pks.discard(None)
+            preloaded.setdefault(model, {}).update(relation.get_queryset().in_bulk(pks))
+
+        group_members = {}
+        groups = preloaded.get(people_models.StudentGroup)
+        students = preloaded.get(people_models.Student)
+        if groups and students:
+            for group_id, student_id in people_models.StudentGroup.students.through.objects.filter(
+                    studentgroup_id__in=groups,
+                    student_id__in=students,
+            ).values_list('studentgroup_id', 'student_id'):
+                group_members.setdefault(group_id, set()).add(student_id)
+
+        self._context['preloaded_objects'] = preloaded
+        self._context['group_members'] = group_members
+
+    def create(self, validated_data: list) -> list:
+        missing_students = [attrs.pop('missing_students', None) for attrs in validated_data]
+        lessons = [models.Lesson(**attrs) for attrs in validated_data]
+
+        with transaction.atomic(), summary.tracked(lessons):
+            if connection.features.can_return_ids_from_bulk_insert:
+                models.Lesson.objects.bulk_create(lessons)
+            elif connection.vendor == 'sqlite':
+                self.bulk_create_sqlite(lessons)
+            else:
+                for lesson in lessons:
+                    lesson.save()
+            self.save_missing_students(lessons, missing_students)
+        cache.invalidate(models.Lesson)
+        timetable.invalidate_slots(timetable.get_slot(lesson) for lesson in lessons)
+        return lessons
+
+    def update(self, instance: list, validated_data: list) -> list:
+        missing_students = [attrs.pop('missing_students', None) for attrs in validated_data]
+        fields = set()
+        slots = [timetable.get_slot(lesson) for lesson in instance]
+        for lesson, attrs in zip(instance, validated_data):
+            for name, value in attrs.items():
+                setattr(lesson, name, value)
+                fields.add(name)
+
+        with transaction.atomic(), summary.tracked(instance):
+            if fields:
+                models.Lesson.objects.bulk_update(instance, fields)
+            self.save_missing_students(instance, missing_students, replace=True)
+        cache.invalidate(models.Lesson)
+        timetable.invalidate_slots(slots + [timetable.get_slot(lesson) for lesson in instance])
+        return instance
+
+    @staticmethod
+    def bulk_create_sqlite(lessons: list) -> None:
+        """
+        SQLite не возвращает идентификаторы вставленных строк. Первичный ключ AutoField на SQLite объявлен
+        с AUTOINCREMENT и только растет, а запись в транзакции блокирует базу для других соединений до ее
+        завершения, поэтому вставленным занятиям принадлежат последние идентификаторы таблицы
+        """
+        models.Lesson.objects.bulk_create(lessons)
+        ids = models.Lesson.objects.order_by('-id').values_list('id', flat=True)[:len(lessons)]
+        for lesson, pk in zip(lessons, reversed(ids)):
+            lesson.id = pk
+            lesson._state.adding, lesson._state.db = False, models.Lesson.objects.db
+
+    @staticmethod
+    def save_missing_students(lessons: list, missing_students: list, replace: bool = False) -> None:
+        through = models.Lesson.missing_students.through
+        changed = [(lesson, students) for lesson, students in zip(lessons, missing_students) if students is not None]
+        if replace and changed:
+            # У промежуточной модели есть получатели m2m_changed, поэтому delete() загрузил бы отметки и удалял
+            # их пачками по 100; сводку здесь изменяет summary.tracked, а не сигналы
+            through.objects.filter(lesson_id__in=[lesson.id for lesson, _ in changed])._raw_delete(through.objects.db)
+        through.objects.bulk_create([
+            through(lesson_id=lesson.id, student_id=student_id)
+            for lesson, students in changed
+            for student_id in dict.fromkeys(student.id for student in students)
+        ])
+
+
+class LessonCreateSerializer(MissingStudentsMixin, serializers.ModelSerializer):
     date = serializers.DateTimeField(
         input_formats=['%d/%m/%Y %H:%M:%S'])
+    # Связь с промежуточной моделью ModelSerializer выводит только для чтения, поэтому поле объявлено явно
+    missing_students = BulkPrimaryKeyRelatedField(
+        many=True, required=False, queryset=people_models.Student.objects.all(), label='Отсутствующие студенты'
+    )
 
     class Meta:
         model = models.Lesson
         fields = '__all__'
+        list_serializer_class = LessonBulkListSerializer
 
     def validate(self, attrs: dict) -> dict:
         """Проверяет входные данные об отсутствующих студентах и статусе занятия"""
@@ -67,11 +295,7 @@ class LessonCreateSerializer(serializers.ModelSerializer):
                     'student_group': 'Введите группу обучаемых, чтобы добавить или изменить отсутствующих.'
                 })
             else:
-                students: list = attrs.pop('missing_students', [])
-                attrs['missing_students'] = []
-                for student in students:
-                    if people_models.StudentGroup.objects.filter(Q(id=attrs['student_group'].id) & Q(students=student)):
-                        attrs['missing_students'].append(student)
+                attrs['missing_students'] = self.filter_group_members(attrs['student_group'], attrs['missing_students'])
         if 'status' in attrs:
             if attrs['status'] and attrs['date'] > timezone.now():
                 raise ValidationError({
@@ -81,9 +305,13 @@ class LessonCreateSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class LessonUpdateSerializer(serializers.ModelSerializer):
+class LessonUpdateSerializer(MissingStudentsMixin, serializers.ModelSerializer):
     date = serializers.DateTimeField(
         input_formats=['%d/%m/%Y %H:%M:%S'])
+    # Связь с промежуточной моделью ModelSerializer выводит только для чтения, поэтому поле объявлено явно
+    missing_students = BulkPrimaryKeyRelatedField(
+        many=True, required=False, queryset=people_models.Student.objects.all(), label='Отсутствующие студенты'
+    )
 
     class Meta:
         model = models.Lesson
@@ -100,25 +328,120 @@ class LessonUpdateSerializer(serializers.ModelSerializer):
                     'status': 'Нельзя добавить отсутствующих студентов до завершения занятия.'
                 })
             else:
-                students: list = validated_data.pop('missing_students', [])
-                validated_data['missing_students'] = []
                 student_group = validated_data.get('student_group') if validated_data.get(
                     'student_group') else instance.student_group
-
-                for student in students:
-                    if people_models.StudentGroup.objects.filter(
-                            Q(id=student_group.id) & Q(students=student)):
-                        validated_data['missing_students'].append(student)
+                validated_data['missing_students'] = self.filter_group_members(
+                    student_group, validated_data['missing_students']
+                )
         if 'status' in validated_data:
             if validated_data['status'] and validated_data['date'] > timezone.now():
                 raise ValidationError({
                     'status': 'Занятия нельзя завершить раньше назначенной даты.'
                 })
 
+        # Занятие только что загружено get_object, поэтому pre_save не перечитывает его значения до изменения
+        instance._saved_state = summary.get_state(instance), timetable.get_slot(instance)
         super().update(instance, validated_data)
         return instance
 
 
+class LessonAttendanceSerializer(serializers.Serializer):
+    """
+    Отмечает студентов отсутствующими на занятии или снимает отметку.
+
+    Изменяются только затронутые строки списка отсутствующих, поэтому повторный запрос ничего не меняет.
+    В ответе выводятся идентификаторы студентов, чья отметка изменилась, и новое число отсутствующих.
+    """
+    student_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+    changed_field = None
+    changed = ()
+
+    def to_representation(self, instance: models.Lesson) -> dict:
+        return {
+            'id': instance.id,
+            self.changed_field: self.changed,
+            # count() связанного менеджера в Django 2.2 загружает все строки связи занятия
+            'missing_student_count': models.Attendance.objects.filter(lesson_id=instance.id).count(),
+        }
+
+
+class LessonMarkAbsentSerializer(LessonAttendanceSerializer):
+    """
+    Добавляет студентов в список отсутствующих.
+
+    Статус занятия проверяется один раз, а состав группы — одним запросом для всего списка. Студенты не из группы
+    занятия пропускаются, их идентификаторы выводятся в поле `rejected_missing_students`.
+    """
+    changed_field = 'added'
+    rejected = ()
+
+    def validate(self, attrs: dict) -> dict:
+        if not self.instance.status:
+            raise ValidationError({
+                'status': 'Нельзя добавить отсутствующих студентов до завершения занятия.'
+            })
+        if not self.instance.student_group_id:
+            raise ValidationError({
+                'student_group': 'Введите группу обучаемых, чтобы добавить или изменить отсутствующих.'
+            })
+
+        student_ids = set(attrs['student_ids'])
+        attrs['student_ids'] = set(people_models.StudentGroup.students.through.objects.filter(
+            studentgroup_id=self.instance.student_group_id,
+            student_id__in=student_ids,
+        ).values_list('student_id', flat=True))
+        self.rejected = sorted(student_ids - attrs['student_ids'])
+        return attrs
+
+    def update(self, instance: models.Lesson, validated_data: dict) -> models.Lesson:
+        student_ids = validated_data['student_ids']
+        with transaction.atomic():
+            current = set(models.Attendance.objects.filter(
+                lesson_id=instance.id, student_id__in=student_ids,
+            ).values_list('student_id', flat=True))
+            self.changed = sorted(student_ids - current)
+            if self.changed:
+                # add() повторно проверил бы существование отметок, поэтому строки вставляются напрямую,
+                # а сводка и кэш обновляются теми же сигналами, которые отправляет add()
+                send = partial(m2m_changed.send, sender=models.Attendance, instance=instance, reverse=False,
+                               model=people_models.Student, pk_set=set(self.changed),
+                               using=models.Attendance.objects.db)
+                send(action='pre_add')
+                models.Attendance.objects.bulk_create([
+                    models.Attendance(lesson_id=instance.id, student_id=student_id) for student_id in self.changed
+                ], ignore_conflicts=True)
+                send(action='post_add')
+        return instance
+
+    def to_representation(self, instance: models.Lesson) -> dict:
+        data = super().to_representation(instance)
+        data['rejected_missing_students'] = self.rejected
+        return data
+
+
+class LessonMarkPresentSerializer(LessonAttendanceSerializer):
+    """Убирает студентов из списка отсутствующих; студенты, которых в нем нет, пропускаются"""
+    changed_field = 'removed'
+
+    def update(self, instance: models.Lesson, validated_data: dict) -> models.Lesson:
+        with transaction.atomic():
+            self.changed = sorted(
+                instance.missing_students.filter(pk__in=validated_data['student_ids']).values_list('pk', flat=True)
+            )
+            instance.missing_students.remove(*self.changed)
+        return instance
+
+
+class AbsenceSerializer(serializers.ModelSerializer):
+    """Пропуск студента: занятие, его дата и предмет, причина и дата отметки"""
+    date = serializers.DateTimeField(source='lesson.date', format='%d/%m/%Y %H:%M:%S')
+    study_subject = serializers.CharField(source='lesson.study_subject.title')
+
+    class Meta:
+        model = models.Attendance
+        fields = ('lesson', 'date', 'study_subject', 'reason', 'marked_at')
+
+
 class StudySubjectSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.StudySubject
@@ -127,7 +450,40 @@ class StudySubjectSerializer(serializers.ModelSerializer):
 
 class StudySubjectDetailSerializer(serializers.ModelSerializer):
     lesson = LessonListSerializer(many=True)
+    lesson_count = serializers.SerializerMethodField()
 
     class Meta:
         model = models.StudySubject
         fields = '__all__'
+
+    def get_lesson_count(self, obj: models.StudySubject) -> int:
+        """Возвращает общее число занятий по предмету, даже если в ответ попала только их часть"""
+        if hasattr(obj, 'lesson_count'):
+            return obj.lesson_count
+        return obj.lesson.count()
+
+
+class TimetableQuerySerializer(serializers.Serializer):
+    """Параметры запроса расписания: группа или преподаватель и диапазон дат (по умолчанию — текущая неделя)"""
+    max_days = 62
+
+    group = serializers.IntegerField(required=False, min_value=1)
+    teacher = serializers.IntegerField(required=False, min_value=1)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, attrs: dict) -> dict:
+        entities = [name for name in ('group', 'teacher') if name in attrs]
+        if len(entities) != 1:
+            raise ValidationError({'non_field_errors': ['Укажите либо группу (group), либо преподавателя (teacher).']})
+        attrs['entity'] = entities[0]
+        attrs['pk'] = attrs.pop(entities[0])
+
+        today = timezone.now().date()
+        attrs.setdefault('date_from', today - timedelta(days=today.weekday()))
+        attrs.setdefault('date_to', attrs['date_from'] + timedelta(days=6))
+        if attrs['date_to'] < attrs['date_from']:
+            raise ValidationError({'date_to': ['Дата окончания не может быть раньше даты начала.']})
+        if (attrs['date_to'] - attrs['date_from']).days >= self.max_days:
+            raise ValidationError({'date_to': [f'Расписание выдается не более чем за {self.max_days} дней.']})
+        return attrs
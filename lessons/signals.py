@@ -0,0 +1,144 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from lessons import models, summary, timetable
+from people import models as people_models
+from school import cache
+
+
+def invalidate_counterpart_timetables(lessons, *entities) -> None:
+    """Сбрасывает расписания сущностей `entities` ('group', 'teacher'), в которых выводятся занятия выборки"""
+    fields = [timetable.ENTITIES[entity].field for entity in entities]
+    pks = {}
+    for values in lessons.order_by().values_list(*(f'{field}_id' for field in fields)).distinct():
+        for entity, pk in zip(entities, values):
+            pks.setdefault(entity, set()).add(pk)
+    for entity, entity_pks in pks.items():
+        timetable.invalidate_entities(entity, entity_pks)
+
+
+@receiver([post_save, post_delete], sender=models.StudySubject)
+def invalidate_subjects(sender, **kwargs):
+    cache.invalidate(models.StudySubject)
+
+
+@receiver(post_save, sender=models.StudySubject)
+def invalidate_subject_timetables(sender, instance, created: bool, **kwargs):
+    """Название предмета выводится в расписаниях групп и преподавателей, у которых есть его занятия"""
+    if not created:
+        invalidate_counterpart_timetables(models.Lesson.objects.filter(study_subject=instance), 'group', 'teacher')
+
+
+@receiver([post_save, post_delete], sender=models.Lesson)
+def invalidate_lessons(sender, instance, **kwargs):
+    cache.invalidate(models.Lesson)
+    slots = {getattr(instance, '_timetable_slot', None), timetable.get_slot(instance)}
+    timetable.invalidate_slots(slot for slot in slots if slot)
+
+
+@receiver(pre_save, sender=models.Lesson)
+def remember_lesson_state(sender, instance, raw: bool = False, **kwargs):
+    """
+    Запоминает значения занятия до сохранения, от которых зависят сводка посещаемости и расписание.
+
+    Если их уже запомнил код, загрузивший занятие (`_saved_state`, см. LessonCreateSerializer), запрос не выполняется
+    """
+    instance._summary_state = instance._timetable_slot = None
+    saved = instance.__dict__.pop('_saved_state', None)
+    if saved and not raw:
+        instance._summary_state, instance._timetable_slot = saved
+    elif not raw and not instance._state.adding:
+        values = models.Lesson.objects.filter(pk=instance.pk).values_list(*summary.State._fields, 'teacher_id').first()
+        if values:
+            instance._summary_state = summary.State(*values[:-1])
+            instance._timetable_slot = (instance._summary_state.student_group_id, values[-1],
+                                        instance._summary_state.date)
+
+
+@receiver(post_save, sender=models.Lesson)
+def update_lesson_summary(sender, instance, created: bool, raw: bool = False, **kwargs):
+    if raw or summary.is_suspended():
+        return
+    old, new = getattr(instance, '_summary_state', None), summary.get_state(instance)
+    # Незавершенные занятия и занятия без группы в сводку не входят
+    slots = [
+        (state.student_group_id, summary.get_keys(state.study_subject_id, state.date))
+        if summary.is_counted(state) else None
+        for state in (old, new)
+    ]
+    if slots[0] != slots[1]:
+        summary.apply(summary.get_lesson_deltas([(old, -1), (new, 1)], absences=not created))
+
+
+@receiver(pre_delete, sender=models.Lesson)
+def remember_deleted_lesson_summary(sender, instance, **kwargs):
+    """Отметки об отсутствии удаляются каскадом раньше занятия, поэтому вычитаемый вклад считается до удаления"""
+    if not summary.is_suspended():
+        instance._summary_deltas = summary.get_lesson_deltas([(summary.get_state(instance), -1)])
+
+
+@receiver(post_delete, sender=models.Lesson)
+def update_deleted_lesson_summary(sender, instance, **kwargs):
+    summary.apply(getattr(instance, '_summary_deltas', {}))
+
+
+@receiver(m2m_changed, sender=models.Lesson.missing_students.through)
+def invalidate_missing_students(sender, instance, action: str, reverse: bool, pk_set, **kwargs):
+    pairs = []
+    if not summary.is_suspended():
+        pairs = summary.get_changed_pairs(sender, instance, action, reverse, pk_set, 'lesson_id', 'student_id')
+    if action.startswith('post_'):
+        states = None if reverse else {instance.pk: summary.get_state(instance)}
+        summary.apply(summary.get_absence_deltas(pairs, 1 if action == 'post_add' else -1, states))
+        cache.invalidate(models.Lesson)
+
+
+@receiver(m2m_changed, sender=people_models.StudentGroup.students.through)
+def update_group_students_summary(sender, instance, action: str, reverse: bool, pk_set, **kwargs):
+    """Состав группы определяет ожидаемые посещения добавленных и удаленных студентов"""
+    if summary.is_suspended():
+        return
+    pairs = summary.get_changed_pairs(sender, instance, action, reverse, pk_set, 'studentgroup_id', 'student_id')
+    if action.startswith('post_'):
+        summary.apply(summary.get_membership_deltas(pairs, 1 if action == 'post_add' else -1))
+
+
+@receiver(post_save, sender=people_models.Teacher)
+def invalidate_teacher_timetables(sender, instance, created: bool, **kwargs):
+    """Имя преподавателя выводится в расписаниях групп"""
+    if not created:
+        invalidate_counterpart_timetables(models.Lesson.objects.filter(teacher=instance), 'group')
+
+
+@receiver(post_save, sender=people_models.StudentGroup)
+def invalidate_group_timetables(sender, instance, created: bool, **kwargs):
+    """Название группы выводится в расписаниях преподавателей"""
+    if not created:
+        invalidate_counterpart_timetables(models.Lesson.objects.filter(student_group=instance), 'teacher')
+
+
+@receiver(pre_delete, sender=people_models.Teacher)
+def invalidate_deleted_teacher_timetables(sender, instance, **kwargs):
+    """
+    Занятия теряют преподавателя через SET_NULL без сигналов занятий, поэтому расписания групп с ними
+    сбрасываются здесь
+    """
+    lessons = models.Lesson.objects.filter(teacher=instance)
+    invalidate_counterpart_timetables(lessons, 'group')
+    timetable.invalidate_entities('teacher', [instance.pk])
+
+
+@receiver(pre_delete, sender=people_models.StudentGroup)
+def remember_deleted_group_lessons(sender, instance, **kwargs):
+    """Занятия теряют группу через SET_NULL без сигналов занятий: сбрасываются расписания и запоминается сводка"""
+    lessons = models.Lesson.objects.filter(student_group=instance)
+    invalidate_counterpart_timetables(lessons, 'teacher')
+    timetable.invalidate_entities('group', [instance.pk])
+    if not summary.is_suspended():
+        instance._summary_deltas = summary.get_group_deltas(instance.pk)
+
+
+@receiver(post_delete, sender=people_models.StudentGroup)
+def update_deleted_group_summary(sender, instance, **kwargs):
+    """Занятия удаленной группы остаются без группы и перестают учитываться в сводке"""
+    summary.apply(getattr(instance, '_summary_deltas', {}))
@@ -0,0 +1,413 @@
+"""
+Сводка посещаемости (модель AttendanceSummary).
+
+Строки сводки не пересчитываются, а изменяются на разницу, которую вносит изменение:
+- сохранение или удаление занятия вычитает вклад его прежнего состояния и прибавляет вклад нового — по ожидаемому
+  посещению каждому студенту группы и по пропуску каждому отсутствующему за неделю и месяц даты занятия;
+- отметка или снятие отсутствия меняет пропуски только затронутых студентов (`pk_set` сигнала m2m_changed);
+- изменение состава группы меняет ожидаемые посещения добавленных или удаленных студентов на число занятий
+  группы по предметам и периодам.
+
+Прибавление записывается одним запросом INSERT ... ON CONFLICT (attendance_summary_key) DO UPDATE
+SET expected = expected + n, вычитание — одним UPDATE, после которого удаляются обнулившиеся строки. Каждое
+изменение прибавляет свою разницу под блокировкой строки, поэтому одновременные изменения одного ключа
+не конфликтуют и не перезаписывают друг друга. Показатели считаются так же, как в lessons.analytics: учитываются
+только завершенные занятия с указанной группой.
+
+Строки за периоды, начавшиеся до конца последнего отключенного или выгруженного в архив месяца занятий,
+не изменяются (см. lessons.partitions).
+"""
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from threading import local
+
+from django.db import connections, router
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+
+from lessons import models, partitions
+
+COUNTERS = (
+    ('expected', 'student_group__students'),
+    ('absences', 'missing_students'),
+)
+COLUMNS = ('student_id', 'study_subject_id', 'period', 'period_start', 'expected', 'absences')
+KEY_COLUMNS = ('period', 'period_start', 'study_subject_id', 'student_id')
+
+# Значения занятия, от которых зависит его вклад в сводку
+State = namedtuple('State', ['id', 'study_subject_id', 'date', 'status', 'student_group_id'])
+
+_local = local()
+
+
+def get_period_start(period: str, day):
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def get_period_end(period: str, start):
+    if period == 'week':
+        return start + timedelta(days=7)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def retained(rows, since):
+    """Оставляет в выборке строки сводки, пересчитываемые по занятиям"""
+    return rows if since is None else rows.filter(period_start__gte=since)
+
+
+def compute(lessons, students=None, since=None) -> dict:
+    """
+    Считает показатели по занятиям выборки: {(студент, предмет, период, начало периода): {показатель: число}}.
+
+    Занятия группируются по дням, а недели и месяцы собираются из дней, поэтому оба периода считаются
+    одной парой запросов. `students` ограничивает расчет указанными студентами, `since` — периодами,
+    начавшимися не раньше этой даты.
+    """
+    lessons = lessons.filter(status=True, student_group__isnull=False).order_by()
+    if since is not None:
+        lessons = lessons.filter(date__gte=datetime.combine(since, time.min))
+    counts = {}
+    for name, relation in COUNTERS:
+        queryset = lessons
+        if students is not None:
+            queryset = queryset.filter(**{f'{relation}__in': students})
+        queryset = queryset.values('study_subject', student=F(relation), day=TruncDate('date')).annotate(
+            count=Count(relation)
+        )
+        for item in queryset.iterator():
+            if item['student'] is None or not item['count']:
+                continue
+            for period, _ in models.AttendanceSummary.PERIODS:
+                key = (item['student'], item['study_subject'], period, get_period_start(period, item['day']))
+                if since is not None and key[3] < since:
+                    continue
+                row = counts.setdefault(key, {'expected': 0, 'absences': 0})
+                row[name] += item['count']
+    return counts
+
+
+def replace(rows, counts: dict, batch_size: int = 5000) -> None:
+    """Заменяет строки сводки `rows` рассчитанными показателями"""
+    rows.delete()
+    objects = [
+        models.AttendanceSummary(student_id=student_id, study_subject_id=subject_id, period=period,
+                                 period_start=period_start, **values)
+        for (student_id, subject_id, period, period_start), values in counts.items()
+    ]
+    # bulk_create не уменьшает явно заданный размер пачки до ограничений СУБД (SQLite)
+    connection = connections[router.db_for_write(models.AttendanceSummary)]
+    limit = connection.ops.bulk_batch_size(models.AttendanceSummary._meta.concrete_fields, objects)
+    models.AttendanceSummary.objects.bulk_create(objects, batch_size=max(1, min(batch_size, limit)))
+
+
+def is_counted(state) -> bool:
+    """Проверяет, входит ли занятие в сводку: завершено и проведено с группой"""
+    return bool(state and state.status and state.student_group_id)
+
+
+def get_state(lesson) -> State:
+    return State(lesson.pk, lesson.study_subject_id, lesson.date, lesson.status, lesson.student_group_id)
+
+
+def get_keys(subject_id, day) -> list:
+    """Возвращает ключи (предмет, период, начало периода) недели и месяца даты занятия"""
+    if isinstance(day, datetime):
+        day = day.date()
+    return [(subject_id, period, get_period_start(period, day)) for period, _ in models.AttendanceSummary.PERIODS]
+
+
+def add(deltas: dict, student_id, keys, index: int, count: int) -> None:
+    """Прибавляет `count` к показателю `index` (0 — ожидаемые посещения, 1 — пропуски) по ключам студента"""
+    for subject_id, period, start in keys:
+        delta = deltas.setdefault((student_id, subject_id, period, start), [0, 0])
+        delta[index] += count
+
+
+def get_lesson_deltas(changes, deltas: dict = None, absences: bool = True) -> dict:
+    """
+    Считает изменения сводки от состояний занятий: {(студент, предмет, период, начало периода): [ожидаемые, пропуски]}.
+
+    `changes` — пары (State, знак): вклад состояния со знаком -1 вычитается, с +1 прибавляется. Ожидаемые посещения
+    считаются по текущему составу групп, пропуски — по отметкам занятий; `absences=False` не читает отметки
+    (у новых занятий их нет).
+    """
+    deltas = {} if deltas is None else deltas
+    changes = [(state, sign) for state, sign in changes if is_counted(state)]
+    if not changes:
+        return deltas
+
+    members = {}
+    for group_id, student_id in models.StudentGroup.students.through.objects.filter(
+            studentgroup_id__in={state.student_group_id for state, _ in changes}
+    ).values_list('studentgroup_id', 'student_id'):
+        members.setdefault(group_id, []).append(student_id)
+    missing = {}
+    lesson_ids = {state.id for state, _ in changes if state.id is not None}
+    if absences and lesson_ids:
+        for lesson_id, student_id in models.Attendance.objects.filter(lesson_id__in=lesson_ids).values_list(
+                'lesson_id', 'student_id'
+        ):
+            missing.setdefault(lesson_id, []).append(student_id)
+
+    for state, sign in changes:
+        keys = get_keys(state.study_subject_id, state.date)
+        for student_id in members.get(state.student_group_id, ()):
+            add(deltas, student_id, keys, 0, sign)
+        for student_id in missing.get(state.id, ()):
+            add(deltas, student_id, keys, 1, sign)
+    return deltas
+
+
+def get_absence_deltas(pairs, sign: int, states: dict = None) -> dict:
+    """
+    Считает изменения пропусков от добавленных (`sign=1`) или снятых (`sign=-1`) отметок об отсутствии.
+
+    `pairs` — пары (занятие, студент); `states` — известные состояния занятий по идентификатору,
+    остальные читаются из базы.
+    """
+    pairs = list(pairs)
+    states = dict(states or {})
+    unknown = {lesson_id for lesson_id, _ in pairs} - states.keys()
+    if unknown:
+        for values in models.Lesson.objects.filter(pk__in=unknown).values_list(*State._fields):
+            states[values[0]] = State(*values)
+
+    deltas = {}
+    for lesson_id, student_id in pairs:
+        state = states.get(lesson_id)
+        if is_counted(state):
+            add(deltas, student_id, get_keys(state.study_subject_id, state.date), 1, sign)
+    return deltas
+
+
+def get_membership_deltas(pairs, sign: int) -> dict:
+    """
+    Считает изменения ожидаемых посещений от добавления (`sign=1`) или удаления (`sign=-1`) студентов из групп.
+
+    `pairs` — пары (группа, студент); завершенные занятия групп считаются одним запросом по предметам и дням.
+    """
+    students = {}
+    for group_id, student_id in pairs:
+        students.setdefault(group_id, []).append(student_id)
+    if not students:
+        return {}
+
+    deltas = {}
+    lessons = models.Lesson.objects.filter(student_group_id__in=students, status=True).order_by()
+    for item in lessons.values('student_group', 'study_subject', day=TruncDate('date')).annotate(count=Count('id')):
+        keys = get_keys(item['study_subject'], item['day'])
+        for student_id in students[item['student_group']]:
+            add(deltas, student_id, keys, 0, sign * item['count'])
+    return deltas
+
+
+def get_group_deltas(group_id) -> dict:
+    """Считает вычитаемый из сводки вклад занятий группы: при ее удалении занятия остаются без группы"""
+    deltas = {}
+    lessons = models.Lesson.objects.filter(student_group_id=group_id, status=True).order_by()
+    members = list(models.StudentGroup.students.through.objects.filter(studentgroup_id=group_id).values_list(
+        'student_id', flat=True
+    ))
+    if members:
+        for item in lessons.values('study_subject', day=TruncDate('date')).annotate(count=Count('id')):
+            keys = get_keys(item['study_subject'], item['day'])
+            for student_id in members:
+                add(deltas, student_id, keys, 0, -item['count'])
+    absences = models.Attendance.objects.filter(lesson__in=lessons).order_by().values(
+        'student', subject=F('lesson__study_subject'), day=TruncDate('lesson__date')
+    ).annotate(count=Count('id'))
+    for item in absences:
+        add(deltas, item['student'], get_keys(item['subject'], item['day']), 1, -item['count'])
+    return deltas
+
+
+def get_changed_pairs(through, instance, action: str, reverse: bool, pk_set, owner: str, target: str) -> list:
+    """
+    Возвращает пары (владелец, связанная запись) связи многие-ко-многим, добавленные или удаленные сигналом m2m_changed.
+
+    Django передает в `pk_set` при удалении и все указанные идентификаторы, а при очистке — ничего, поэтому
+    существующие связи запоминаются на сигналах pre_remove и pre_clear. `owner` и `target` — поля
+    промежуточной модели; пары возвращаются только на сигналах post_*.
+    """
+    attribute = f'_summary_{through._meta.model_name}_pairs'
+    if action == 'post_add':
+        return [(pk, instance.pk) if reverse else (instance.pk, pk) for pk in pk_set or ()]
+    if action in ('pre_remove', 'pre_clear'):
+        links = through.objects.filter(**{target if reverse else owner: instance.pk})
+        if action == 'pre_remove':
+            links = links.filter(**{f'{owner if reverse else target}__in': pk_set or ()})
+        setattr(instance, attribute, list(links.values_list(owner, target)))
+    elif action in ('post_remove', 'post_clear'):
+        return getattr(instance, attribute, [])
+    return []
+
+
+def apply(deltas: dict) -> None:
+    """
+    Изменяет строки сводки на рассчитанные разности.
+
+    Прибавления записываются вставкой с ON CONFLICT (attendance_summary_key) DO UPDATE, вычитания — одним
+    UPDATE по списку ключей, после которого удаляются строки с нулевыми показателями. На SQLite запросы
+    делятся на пачки по ограничению числа параметров. Ключи сортируются, чтобы
+    одновременные изменения блокировали строки в одном порядке. Периоды, не пересчитываемые по занятиям,
+    не изменяются.
+    """
+    if is_suspended():
+        return
+    rows = sorted((key, values) for key, values in deltas.items() if any(values))
+    if rows:
+        since = partitions.get_retained_since()
+        rows = [(key, values) for key, values in rows if since is None or key[3] >= since]
+    if not rows:
+        return
+
+    connection = connections[router.db_for_write(models.AttendanceSummary)]
+    upsert = connection.vendor == 'postgresql' or (
+        connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 33)
+    )
+    if not upsert:
+        _apply_by_key(rows)
+        return
+
+    increments = [(key, [max(value, 0) for value in values]) for key, values in rows]
+    decrements = [(key, [max(-value, 0) for value in values]) for key, values in rows]
+    removed = [(key, []) for key, values in decrements if any(values)]
+    batch_size = max(1, min(1000, connection.ops.bulk_batch_size(COLUMNS, rows)))
+    with connection.cursor() as cursor:
+        for sql, changes in ((_get_increment_sql, increments), (_get_decrement_sql, decrements),
+                             (_get_delete_sql, removed)):
+            changes = [
+                (*key[:3], connection.ops.adapt_datefield_value(key[3]), *values)
+                for key, values in changes if not values or any(values)
+            ]
+            for index in range(0, len(changes), batch_size):
+                batch = changes[index:index + batch_size]
+                cursor.execute(sql(len(batch)), [value for change in batch for value in change])
+
+
+def _get_values(count: int, columns) -> str:
+    return ', '.join(['(' + ', '.join(['%s'] * len(columns)) + ')'] * count)
+
+
+def _get_increment_sql(count: int) -> str:
+    table = models.AttendanceSummary._meta.db_table
+    return (
+        f'INSERT INTO {table} ({", ".join(COLUMNS)}) VALUES {_get_values(count, COLUMNS)} '
+        f'ON CONFLICT ({", ".join(KEY_COLUMNS)}) DO UPDATE SET '
+        f'expected = {table}.expected + excluded.expected, absences = {table}.absences + excluded.absences'
+    )
+
+
+def _get_decrement_sql(count: int) -> str:
+    table = models.AttendanceSummary._meta.db_table
+    condition = ' AND '.join(f'{table}.{column} = d.{column}' for column in KEY_COLUMNS)
+    return (
+        f'WITH d ({", ".join(COLUMNS)}) AS (VALUES {_get_values(count, COLUMNS)}) '
+        f'UPDATE {table} SET expected = {table}.expected - d.expected, absences = {table}.absences - d.absences '
+        f'FROM d WHERE {condition}'
+    )
+
+
+def _get_delete_sql(count: int) -> str:
+    """Удаляет обнулившиеся после вычитания строки: строк с нулевыми показателями в сводке нет"""
+    table = models.AttendanceSummary._meta.db_table
+    columns = COLUMNS[:4]
+    condition = ' AND '.join(f'{table}.{column} = d.{column}' for column in columns)
+    return (
+        f'WITH d ({", ".join(columns)}) AS (VALUES {_get_values(count, columns)}) '
+        f'DELETE FROM {table} WHERE expected = 0 AND absences = 0 AND EXISTS (SELECT 1 FROM d WHERE {condition})'
+    )
+
+
+def _apply_by_key(rows: list) -> None:
+    """Изменяет строки сводки по одному ключу: для СУБД без INSERT ... ON CONFLICT и UPDATE ... FROM"""
+    for (student_id, subject_id, period, start), (expected, absences) in rows:
+        key = {'student_id': student_id, 'study_subject_id': subject_id, 'period': period, 'period_start': start}
+        queryset = models.AttendanceSummary.objects.filter(**key)
+        if not queryset.update(expected=F('expected') + expected, absences=F('absences') + absences):
+            # Как и в основном варианте, вычитания из отсутствующей строки пропускаются
+            if expected > 0 or absences > 0:
+                models.AttendanceSummary.objects.create(expected=max(expected, 0), absences=max(absences, 0), **key)
+        elif expected < 0 or absences < 0:
+            queryset.filter(expected=0, absences=0).delete()
+
+
+def is_suspended() -> bool:
+    return getattr(_local, 'suspended', False)
+
+
+@contextmanager
+def suspended():
+    """
+    Отключает изменение сводки сигналами внутри блока.
+
+    Используется, когда строки сводки удаляются каскадом вместе с предметом, или изменения учитываются
+    вызывающим кодом (см. tracked).
+    """
+    previous = is_suspended()
+    _local.suspended = True
+    try:
+        yield
+    finally:
+        _local.suspended = previous
+
+
+@contextmanager
+def tracked(lessons):
+    """
+    Изменяет сводку на разницу вкладов занятий `lessons` до и после блока одним набором запросов.
+
+    Используется массовыми операциями: сигналы отдельных занятий и их отметок внутри блока сводку не меняют.
+    Состояние сохраненных занятий до блока читается из базы. При исключении сводка не изменяется:
+    изменения откатываются вместе с транзакцией.
+    """
+    lesson_ids = [lesson.pk for lesson in lessons if lesson.pk is not None]
+    before = []
+    if lesson_ids and not is_suspended():
+        before = [(State(*values), -1)
+                  for values in models.Lesson.objects.filter(pk__in=lesson_ids).values_list(*State._fields)]
+    deltas = get_lesson_deltas(before)
+    with suspended():
+        yield
+    if not is_suspended():
+        apply(get_lesson_deltas([(get_state(lesson), 1) for lesson in lessons], deltas))
+
+
+def rebuild(batch_size: int = 5000) -> int:
+    """Пересчитывает сводку целиком, по одному предмету за раз; возвращает число строк"""
+    rows = 0
+    since = partitions.get_retained_since()
+    for subject_id in list(models.StudySubject.objects.order_by('id').values_list('id', flat=True)):
+        counts = compute(models.Lesson.objects.filter(study_subject_id=subject_id), since=since)
+        replace(retained(models.AttendanceSummary.objects.filter(study_subject_id=subject_id), since), counts,
+                batch_size)
+        rows += len(counts)
+    return rows
+
+
+def check() -> list:
+    """
+    Сверяет сводку с занятиями по каждому предмету.
+
+    Возвращает расхождения в виде (ключ, значения в сводке, значения по занятиям); отсутствующее значение — None.
+    """
+    mismatches = []
+    since = partitions.get_retained_since()
+    for subject_id in list(models.StudySubject.objects.order_by('id').values_list('id', flat=True)):
+        expected = compute(models.Lesson.objects.filter(study_subject_id=subject_id), since=since)
+        rows = retained(models.AttendanceSummary.objects.filter(study_subject_id=subject_id), since)
+        stored = {
+            (row['student'], subject_id, row['period'], row['period_start']): {
+                'expected': row['expected'], 'absences': row['absences'],
+            }
+            for row in rows.values(
+                'student', 'period', 'period_start', 'expected', 'absences'
+            ).iterator()
+        }
+        for key in sorted(stored.keys() | expected.keys()):
+            if stored.get(key) != expected.get(key):
+                mismatches.append((key, stored.get(key), expected.get(key)))
+    return mismatches
@@ -0,0 +1,136 @@
+"""
+Расписание занятий группы или преподавателя по дням.
+
+Занятия выбираются диапазонным запросом по индексам (student_group, date) и (teacher, date) и кэшируются
+по неделям. Ключ недели включает номера поколений трех областей кэша: недели сущности, сущности и всего
+расписания. Сигналы занятий сбрасывают недели групп и преподавателей, в которые занятие попадало до и после
+изменения, переименование предмета, преподавателя или группы — расписания сущностей, где выводится название,
+а массовые операции в обход сигналов — все расписание. Запрос за несколько недель читает закэшированные недели
+и одним запросом добирает недостающие; недели, прочитанные с реплики, не сохраняются (см. school.replica).
+"""
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connection
+
+from lessons import models
+from people import models as people_models
+from school import cache, replica
+
+TIME_FORMAT = '%H:%M'
+SCOPE = 'timetable'
+
+Entity = namedtuple('Entity', ['model', 'field', 'counterpart', 'counterpart_label'])
+
+ENTITIES = {
+    'group': Entity(people_models.StudentGroup, 'student_group', 'teacher', 'teacher__full_name'),
+    'teacher': Entity(people_models.Teacher, 'teacher', 'student_group', 'student_group__title'),
+}
+
+
+def get_week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def get_scope(entity: str, pk: int, week=None) -> str:
+    """Возвращает область кэша расписания сущности или одной ее недели"""
+    scope = f'{SCOPE}:{entity}:{pk}'
+    return scope if week is None else f'{scope}:{week.isoformat()}'
+
+
+def get_slot(lesson) -> tuple:
+    """Возвращает значения занятия, определяющие расписания, в которые оно попадает: (группа, преподаватель, дата)"""
+    return lesson.student_group_id, lesson.teacher_id, lesson.date
+
+
+def invalidate_slots(slots) -> None:
+    """Сбрасывает недели групп и преподавателей, в которые попадают занятия со значениями `slots`"""
+    scopes = set()
+    for group_id, teacher_id, date in slots:
+        for entity, pk in (('group', group_id), ('teacher', teacher_id)):
+            if pk is not None:
+                scopes.add(get_scope(entity, pk, get_week_start(date.date())))
+    cache.invalidate_scopes(scopes)
+
+
+def invalidate_entities(entity: str, pks) -> None:
+    """Сбрасывает все недели расписаний сущностей"""
+    cache.invalidate_scopes(get_scope(entity, pk) for pk in pks if pk is not None)
+
+
+def invalidate_all() -> None:
+    """Сбрасывает все расписание: для массовых изменений занятий в обход сигналов"""
+    cache.invalidate_scopes([SCOPE])
+
+
+def exists(entity: str, pk: int) -> bool:
+    return ENTITIES[entity].model.objects.filter(pk=pk).exists()
+
+
+def fetch_weeks(entity: str, pk: int, weeks: list) -> dict:
+    """Выбирает занятия за указанные недели одним запросом: {начало недели: [занятие, ...]}"""
+    entity = ENTITIES[entity]
+    start = datetime.combine(min(weeks), time.min)
+    end = datetime.combine(max(weeks) + timedelta(days=7), time.min)
+    rows = models.Lesson.objects.filter(**{
+        entity.field: pk, 'date__gte': start, 'date__lt': end,
+    }).order_by('date', 'id').values_list('id', 'date', 'study_subject__title', entity.counterpart_label, 'status')
+
+    lessons = {week: [] for week in weeks}
+    for lesson_id, date, subject, counterpart, status in rows:
+        week = get_week_start(date.date())
+        if week in lessons:
+            lessons[week].append({
+                'id': lesson_id,
+                'date': date.date().isoformat(),
+                'time': date.strftime(TIME_FORMAT),
+                'study_subject': subject,
+                entity.counterpart: counterpart,
+                'status': status,
+            })
+    return lessons
+
+
+def get_weeks(entity: str, pk: int, weeks: list) -> dict:
+    """Возвращает занятия по неделям, читая их из кэша, если он доступен"""
+    if settings.API_CACHE_TIMEOUT <= 0 or connection.in_atomic_block:
+        return fetch_weeks(entity, pk, weeks)
+
+    generations = cache.get_scope_generations(
+        [SCOPE, get_scope(entity, pk)] + [get_scope(entity, pk, week) for week in weeks]
+    )
+    prefix = f'{cache.PREFIX}:{get_scope(entity, pk)}'
+    keys = {
+        week: f'{prefix}:{week.isoformat()}:{generations[0]}:{generations[1]}:{generation}'
+        for week, generation in zip(weeks, generations[2:])
+    }
+    cached = cache.get_cache().get_many(keys.values())
+    lessons = {week: cached[key] for week, key in keys.items() if key in cached}
+
+    missing = [week for week in weeks if week not in lessons]
+    cache.record('misses' if missing else 'hits')
+    if missing:
+        fetched = fetch_weeks(entity, pk, missing)
+        if not replica.read_from_replica():
+            cache.get_cache().set_many({keys[week]: fetched[week] for week in missing}, settings.API_CACHE_TIMEOUT)
+        lessons.update(fetched)
+    return lessons
+
+
+def timetable(entity: str, pk: int, date_from, date_to) -> list:
+    """Возвращает расписание с `date_from` по `date_to` включительно: дни с занятиями по порядку"""
+    weeks = []
+    week = get_week_start(date_from)
+    while week <= date_to:
+        weeks.append(week)
+        week += timedelta(days=7)
+
+    lessons = get_weeks(entity, pk, weeks)
+    days = {}
+    for week in weeks:
+        for lesson in lessons[week]:
+            day = lesson['date']
+            if date_from.isoformat() <= day <= date_to.isoformat():
+                days.setdefault(day, []).append({key: value for key, value in lesson.items() if key != 'date'})
+    return [{'date': day, 'lessons': items} for day, items in days.items()]
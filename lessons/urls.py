@@ -8,6 +8,9 @@ router = SimpleRouter()
 
 router.register('subject', views.StudySubjectViewSet, basename='subject')
 router.register('lesson', views.LessonViewSet, basename='lesson')
+router.register('analytics', views.AttendanceAnalyticsViewSet, basename='analytics')
+router.register('timetable', views.TimetableViewSet, basename='timetable')
+router.register(r'student/(?P<student_pk>[^/.]+)/absences', views.StudentAbsenceViewSet, basename='student-absences')
 # router.register('group', views.StudentGroupViewSet, basename='group')
 
 urlpatterns = [
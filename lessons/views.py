@@ -1,34 +1,103 @@
-from rest_framework import viewsets
+from django.db import transaction
+from django.db.models import Count, Prefetch, Subquery
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
 
 from lessons import models
 from lessons import serializers
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 
-from lessons.filters import LessonFilter
+from lessons import analytics, export, summary, timetable
+from lessons.filters import AbsenceFilter, LessonFilter
+from lessons.pagination import LessonCursorPagination
+from people import models as people_models
+from people.pagination import RosterPagination
+from school.cache import CachedResponseMixin
+from school.conditional import ConditionalGetMixin
+from school.fast import FastListMixin
+from school.search import TrigramSearchFilter
+from school.sparse import SparseFieldsetMixin
 
 
-class StudySubjectViewSet(viewsets.ModelViewSet):
-    queryset = models.StudySubject.objects.prefetch_related('lesson')
+class StudySubjectViewSet(FastListMixin, SparseFieldsetMixin, ConditionalGetMixin, CachedResponseMixin,
+                          viewsets.ModelViewSet):
+    queryset = models.StudySubject.objects.all()
     default_serializer_class = serializers.StudySubjectSerializer
-    filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
+    cache_models = {
+        'list': (models.StudySubject,),
+        'retrieve': (models.StudySubject, models.Lesson, people_models.Teacher, people_models.StudentGroup,
+                     people_models.Student),
+    }
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter, TrigramSearchFilter)
+    search_field = 'title'
     ordering_fields = ['title']
     ordering = ['title']
+    lesson_limit = 100
+    max_lesson_limit = 1000
 
     serializers = {
         'retrieve': serializers.StudySubjectDetailSerializer
     }
 
+    def get_queryset(self):
+        if self.action == 'retrieve':
+            return self.get_detail_queryset()
+        return super().get_queryset()
+
+    def get_detail_queryset(self):
+        """
+        Выбирает предмет вместе с окном его занятий за фиксированное число запросов.
+
+        Окно задается параметрами `?lesson_limit=` и `?lesson_offset=`; занятия, их преподаватели,
+        группы и отсутствующие студенты подгружаются вложенным Prefetch независимо от числа занятий.
+        """
+        limit = self._get_query_int('lesson_limit', self.lesson_limit, cutoff=self.max_lesson_limit)
+        offset = self._get_query_int('lesson_offset', 0)
+
+        # В детальном представлении один предмет, поэтому окно выбирается по индексу (study_subject, date)
+        # некоррелированным подзапросом: Prefetch не принимает выборку со срезом
+        window = models.Lesson.objects.filter(
+            study_subject_id=serializers.to_pk(models.StudySubject, self.kwargs.get(self.lookup_field))
+        ).order_by('date', 'id').values('id')[offset:offset + limit]
+        lessons = models.Lesson.objects.filter(
+            id__in=Subquery(window)
+        ).select_related('teacher', 'student_group').prefetch_related('missing_students').order_by('date', 'id')
+
+        return models.StudySubject.objects.annotate(
+            lesson_count=Count('lesson')
+        ).prefetch_related(Prefetch('lesson', queryset=lessons))
+
     def get_serializer_class(self):
         return self.serializers.get(self.action, self.default_serializer_class)
 
+    def perform_destroy(self, instance):
+        # Строки сводки по предмету удаляются каскадом, поэтому вклад каждого удаляемого занятия не вычитается
+        with transaction.atomic(), summary.suspended():
+            instance.delete()
+
+    def _get_query_int(self, name: str, default: int, cutoff: int = None) -> int:
+        try:
+            value = int(self.request.query_params[name])
+        except (KeyError, ValueError):
+            return default
+        if value < 0:
+            return default
+        return min(value, cutoff) if cutoff else value
 
-class LessonViewSet(viewsets.ModelViewSet):
-    queryset = models.Lesson.objects.select_related('study_subject', 'teacher',
-                                                    'student_group').prefetch_related('missing_students')
+
+class LessonViewSet(FastListMixin, SparseFieldsetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = models.Lesson.objects.select_related('study_subject', 'teacher', 'student_group').prefetch_related(
+        Prefetch('missing_students', queryset=people_models.Student.objects.order_by('id'))
+    )
     default_serializer_class = serializers.LessonSerializer
+    version_models = (models.Lesson, models.StudySubject, people_models.Teacher, people_models.StudentGroup,
+                      people_models.Student)
     filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
     filterset_class = LessonFilter
+    pagination_class = LessonCursorPagination
     ordering_fields = ['date']
     ordering = ['date']
 
@@ -36,7 +105,168 @@ class LessonViewSet(viewsets.ModelViewSet):
         'create': serializers.LessonCreateSerializer,
         'update': serializers.LessonUpdateSerializer,
         'partial_update': serializers.LessonUpdateSerializer,
+        'bulk': serializers.LessonCreateSerializer,
+        'mark_absent': serializers.LessonMarkAbsentSerializer,
+        'mark_present': serializers.LessonMarkPresentSerializer,
     }
+    attendance_actions = ('mark_absent', 'mark_present')
+
+    def get_queryset(self):
+        if self.action in self.attendance_actions:
+            # Список отсутствующих изменяется запросами к промежуточной таблице, поэтому связи не подгружаются
+            return models.Lesson.objects.all()
+        return super().get_queryset()
 
     def get_serializer_class(self):
         return self.serializers.get(self.action, self.default_serializer_class)
+
+    @action(detail=True, methods=['post'])
+    def mark_absent(self, request, pk=None):
+        """Отмечает студентов группы отсутствующими на завершенном занятии"""
+        return self.change_attendance(request)
+
+    @action(detail=True, methods=['post'])
+    def mark_present(self, request, pk=None):
+        """Снимает со студентов отметку об отсутствии"""
+        return self.change_attendance(request)
+
+    def change_attendance(self, request) -> Response:
+        serializer = self.get_serializer(self.get_object(), data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['post', 'put'])
+    def bulk(self, request):
+        """
+        Создает (POST) или полностью изменяет (PUT) пачку занятий одним запросом.
+
+        При изменении каждый элемент должен содержать `id` существующего занятия.
+        """
+        instance = self.get_bulk_instances(request.data) if request.method == 'PUT' else None
+        serializer = self.get_serializer(instance, data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        lessons = serializer.save()
+
+        queryset = self.get_queryset().filter(id__in=[lesson.id for lesson in lessons]).order_by('date', 'id')
+        data = serializers.LessonSerializer(queryset, many=True, context=self.get_serializer_context()).data
+        return Response(data, status=status.HTTP_200_OK if instance is not None else status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Потоково выгружает занятия с отсутствующими студентами в CSV или NDJSON (`?export_format=`).
+
+        Принимает фильтры списка занятий.
+        """
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in export.EXPORT_FORMATS:
+            raise ValidationError({'export_format': [f'Доступные форматы: {", ".join(export.EXPORT_FORMATS)}.']})
+
+        filterset = LessonFilter(request.query_params, queryset=models.Lesson.objects.order_by('date', 'id'),
+                                 request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        return export.streaming_export(filterset.qs, export_format)
+
+    @staticmethod
+    def get_bulk_instances(data) -> list:
+        if not isinstance(data, list):
+            return None
+
+        ids = [serializers.to_pk(models.Lesson, item.get('id')) if isinstance(item, dict) else None for item in data]
+        lessons = models.Lesson.objects.in_bulk([pk for pk in ids if pk is not None])
+        errors = [{} if pk in lessons else {'id': ['Укажите идентификатор существующего занятия.']} for pk in ids]
+        if any(errors):
+            raise ValidationError(errors)
+        return [lessons[pk] for pk in ids]
+
+
+class AttendanceAnalyticsViewSet(viewsets.ViewSet):
+    """
+    Показатели посещаемости завершенных занятий по студентам, группам, предметам и преподавателям.
+
+    Период группировки задается параметром `?period=week|month`, выборка занятий — фильтрами списка занятий
+    и диапазоном дат `?date_after=` / `?date_before=`.
+    """
+    default_period = 'month'
+
+    @action(detail=False, methods=['get'])
+    def students(self, request):
+        return self.get_attendance(request, 'students')
+
+    @action(detail=False, methods=['get'])
+    def groups(self, request):
+        return self.get_attendance(request, 'groups')
+
+    @action(detail=False, methods=['get'])
+    def subjects(self, request):
+        return self.get_attendance(request, 'subjects')
+
+    @action(detail=False, methods=['get'])
+    def teachers(self, request):
+        return self.get_attendance(request, 'teachers')
+
+    def get_attendance(self, request, dimension: str) -> Response:
+        period = request.query_params.get('period', self.default_period)
+        if period not in analytics.PERIODS:
+            raise ValidationError({'period': [f'Доступные периоды: {", ".join(analytics.PERIODS)}.']})
+
+        filterset = LessonFilter(request.query_params, queryset=models.Lesson.objects.all(), request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+
+        filters = {name: value for name, value in filterset.form.cleaned_data.items() if value not in (None, '')}
+        if analytics.can_use_summary(dimension, set(filters)):
+            results = analytics.attendance_from_summary(dimension, period, filters.get('study_subject'))
+        else:
+            results = analytics.attendance(filterset.qs, dimension, period)
+        return Response({'period': period, 'results': results})
+
+
+class StudentAbsenceViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    История пропусков студента (`api/student/<pk>/absences`) от новых занятий к старым.
+
+    Отметки выбираются по индексу (student, lesson) промежуточной таблицы, занятия и предметы присоединяются
+    по первичному ключу. Принимает фильтры `?date_after=`, `?date_before=` и `?study_subject=`.
+    """
+    serializer_class = serializers.AbsenceSerializer
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = AbsenceFilter
+    pagination_class = RosterPagination
+
+    def get_queryset(self):
+        return models.Attendance.objects.filter(student_id=self.kwargs['student_pk']).select_related(
+            'lesson__study_subject'
+        ).order_by('-lesson__date', '-lesson_id')
+
+    def list(self, request, *args, **kwargs):
+        student_pk = serializers.to_pk(people_models.Student, kwargs['student_pk'])
+        if student_pk is None or not people_models.Student.objects.filter(pk=student_pk).exists():
+            raise NotFound()
+        return super().list(request, *args, **kwargs)
+
+
+class TimetableViewSet(viewsets.ViewSet):
+    """
+    Расписание группы (`?group=`) или преподавателя (`?teacher=`) по дням за период `?date_from=` – `?date_to=`.
+
+    Без дат возвращается расписание на текущую неделю. Для несуществующей группы или преподавателя
+    возвращается 404.
+    """
+
+    def list(self, request):
+        serializer = serializers.TimetableQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        days = timetable.timetable(params['entity'], params['pk'], params['date_from'], params['date_to'])
+        # Занятия ссылаются только на существующие записи, поэтому проверять нужно лишь пустое расписание
+        if not days and not timetable.exists(params['entity'], params['pk']):
+            raise NotFound()
+        return Response({
+            params['entity']: params['pk'],
+            'date_from': params['date_from'],
+            'date_to': params['date_to'],
+            'days': days,
+        })
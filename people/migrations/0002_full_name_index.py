@@ -0,0 +1,23 @@
+# Generated by Django 2.2 on 2026-10-18 08:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('people', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='student',
+            name='full_name',
+            field=models.CharField(db_index=True, max_length=255, verbose_name='ФИО'),
+        ),
+        migrations.AlterField(
+            model_name='teacher',
+            name='full_name',
+            field=models.CharField(db_index=True, max_length=255, verbose_name='ФИО'),
+        ),
+    ]
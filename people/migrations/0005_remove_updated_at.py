@@ -0,0 +1,58 @@
+# Generated by Django 2.2 on 2026-10-18 11:37
+
+from django.db import migrations
+
+
+class RemoveField(migrations.RemoveField):
+    """
+    SQLite удаляет столбец пересозданием таблицы по состоянию модели. Django 2.2 переносит в новую таблицу условие
+    частичного индекса с именем временной таблицы, и индекс не создается, а индексы gin_trgm_ops миграции
+    с индексами pg_trgm на SQLite не создают. Такие индексы исключаются из пересоздания, частичные создаются после него
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        self.remake(super().database_forwards, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        self.remake(super().database_backwards, app_label, schema_editor, from_state, to_state)
+
+    def remake(self, operation, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'sqlite':
+            return operation(app_label, schema_editor, from_state, to_state)
+        partial = [
+            index for index in to_state.models[app_label, self.model_name_lower].options.get('indexes', [])
+            if index.condition is not None
+        ]
+        from_state, to_state = from_state.clone(), to_state.clone()
+        for state in from_state, to_state:
+            options = state.models[app_label, self.model_name_lower].options
+            options['indexes'] = [
+                index for index in options.get('indexes', []) if index.condition is None and not index.opclasses
+            ]
+            state.reload_model(app_label, self.model_name_lower, delay=True)
+        operation(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        for index in partial:
+            schema_editor.add_index(model, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('people', '0004_full_name_trigram_index'),
+    ]
+
+    operations = [
+        RemoveField(
+            model_name='student',
+            name='updated_at',
+        ),
+        RemoveField(
+            model_name='studentgroup',
+            name='updated_at',
+        ),
+        RemoveField(
+            model_name='teacher',
+            name='updated_at',
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 
 
@@ -5,13 +6,17 @@ class Person(models.Model):
     class Meta:
         abstract = True
 
-    full_name = models.CharField(max_length=255, verbose_name='ФИО')
+    full_name = models.CharField(max_length=255, db_index=True, verbose_name='ФИО')
 
 
 class Student(Person):
     class Meta:
         verbose_name = 'Студент'
         verbose_name_plural = 'Студенты'
+        # Индексы gin_trgm_ops создаются только на PostgreSQL с pg_trgm (см. миграцию 0004)
+        indexes = [
+            GinIndex(fields=['full_name'], name='student_full_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return self.full_name
@@ -23,6 +28,9 @@ class Teacher(Person):
     class Meta:
         verbose_name = 'Преподаватель'
         verbose_name_plural = 'Преподаватели'
+        indexes = [
+            GinIndex(fields=['full_name'], name='teacher_full_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return self.full_name
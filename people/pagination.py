@@ -0,0 +1,100 @@
+from collections import OrderedDict
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class RosterPagination(LimitOffsetPagination):
+    """
+    Пагинация списков студентов, преподавателей и групп.
+
+    Поддерживает два стиля запросов: постраничный (`?page=2&page_size=50`) и через смещение
+    (`?limit=50&offset=50`). Параметр `?count=false` отключает запрос COUNT(*): вместо него
+    выбирается одна лишняя запись, по которой определяется наличие следующей страницы.
+    """
+    default_limit = 50
+    max_limit = 500
+    page_query_param = 'page'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    include_count = True
+    invalid_page_message = 'Неверный номер страницы.'
+    template = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_mode = self.page_query_param in request.query_params
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        self.with_count = self.get_with_count(request)
+
+        if self.with_count:
+            self.count = self.get_count(queryset)
+            self.has_next = self.offset + self.limit < self.count
+            if self.offset >= self.count:
+                return []
+            return list(queryset[self.offset:self.offset + self.limit])
+
+        results = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(results) > self.limit
+        return results[:self.limit]
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.with_count:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_limit(self, request):
+        if not self.page_mode:
+            return super().get_limit(request)
+        try:
+            return self._positive_int(request.query_params[self.page_size_query_param], cutoff=self.max_limit)
+        except (KeyError, ValueError):
+            return self.default_limit
+
+    def get_offset(self, request):
+        if not self.page_mode:
+            return super().get_offset(request)
+        try:
+            page = self._positive_int(request.query_params[self.page_query_param])
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+        return (page - 1) * self.limit
+
+    def get_with_count(self, request) -> bool:
+        value = request.query_params.get(self.count_query_param)
+        if value is None:
+            return self.include_count
+        return value.lower() not in ('0', 'false', 'no')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self._get_link(self.offset + self.limit)
+
+    def get_previous_link(self):
+        if self.offset <= 0:
+            return None
+        return self._get_link(max(self.offset - self.limit, 0))
+
+    @staticmethod
+    def _positive_int(value: str, cutoff: int = None) -> int:
+        """Разбирает строго положительное целое, ограничивая его сверху `cutoff`"""
+        value = int(value)
+        if value <= 0:
+            raise ValueError(value)
+        return min(value, cutoff) if cutoff else value
+
+    def _get_link(self, offset: int) -> str:
+        url = self.request.build_absolute_uri()
+        if self.page_mode:
+            url = replace_query_param(url, self.page_size_query_param, self.limit)
+            return replace_query_param(url, self.page_query_param, offset // self.limit + 1)
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, offset)
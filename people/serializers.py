@@ -1,9 +1,34 @@
 from django.db import transaction
+from django.db.models import Q
 from rest_framework import serializers
 
 from people import models
 
 
+def get_or_create_students(names: list) -> list:
+    """
+    Возвращает студентов с указанными ФИО в порядке списка.
+
+    Существующие студенты находятся одним запросом, недостающие создаются одной пачкой через bulk_create.
+    При нескольких студентах с одинаковым ФИО выбирается созданный раньше остальных.
+    """
+    names = list(dict.fromkeys(names))
+    students = {}
+    for student in models.Student.objects.filter(full_name__in=names).order_by('-id'):
+        students[student.full_name] = student
+
+    missing = [name for name in names if name not in students]
+    if missing:
+        created = models.Student.objects.bulk_create([models.Student(full_name=name) for name in missing])
+        if not all(student.pk for student in created):
+            # Не все СУБД возвращают первичные ключи после массовой вставки
+            created = models.Student.objects.filter(full_name__in=missing)
+        for student in created:
+            students.setdefault(student.full_name, student)
+
+    return [students[name] for name in names]
+
+
 class StudentSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Student
@@ -39,15 +64,9 @@ class StudentGroupCreateSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data: dict) -> models.StudentGroup:
         students: list = validated_data.pop('students', [])
-        group: models.StudentGroup = models.StudentGroup.objects.create(**validated_data)
-
-        for item in students:
-            student, _ = models.Student.objects.get_or_create(
-                full_name=item['full_name'],
-            )
-            group.students.add(student)
-
-        group.save()
+        with transaction.atomic():
+            group: models.StudentGroup = models.StudentGroup.objects.create(**validated_data)
+            group.students.add(*get_or_create_students([item['full_name'] for item in students]))
         return group
 
 
@@ -59,15 +78,75 @@ class StudentGroupUpdateSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
     def update(self, instance: models.StudentGroup, validated_data: dict) -> models.StudentGroup:
-        """"""
+        """Изменяет состав группы, добавляя и удаляя только разницу между текущим и новым списком студентов"""
         with transaction.atomic():
             if 'students' in validated_data:
-                instance.students.clear()
                 students: list = validated_data.pop('students', [])
-                for item in students:
-                    student, _ = models.Student.objects.get_or_create(
-                        full_name=item['full_name'],
-                    )
-                    instance.students.add(student)
+                target = {student.id for student in get_or_create_students([item['full_name'] for item in students])}
+                current = set(instance.students.values_list('id', flat=True))
+                instance.students.remove(*(current - target))
+                instance.students.add(*(target - current))
             super().update(instance, validated_data)
         return instance
+
+
+class StudentGroupMembershipSerializer(serializers.Serializer):
+    """
+    Изменяет состав группы на указанных студентов.
+
+    Студенты задаются идентификаторами (`student_ids`) и/или ФИО (`students` в том же виде, что и при создании
+    группы). Изменяются только затронутые строки состава, поэтому повторный запрос ничего не меняет.
+    В ответе выводятся идентификаторы студентов, чье членство изменилось, и новое число студентов группы.
+    """
+    student_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    students = StudentSerializer(many=True, required=False)
+    changed_field = None
+    changed = ()
+
+    def validate(self, attrs: dict) -> dict:
+        if not attrs.get('student_ids') and not attrs.get('students'):
+            raise serializers.ValidationError('Укажите студентов в полях student_ids и/или students.')
+        return attrs
+
+    def to_representation(self, instance: models.StudentGroup) -> dict:
+        return {
+            'id': instance.id,
+            self.changed_field: self.changed,
+            'student_count': instance.students.count(),
+        }
+
+
+class StudentGroupAddStudentsSerializer(StudentGroupMembershipSerializer):
+    changed_field = 'added'
+
+    def validate_student_ids(self, value: list) -> list:
+        ids = set(value)
+        missing = ids - set(models.Student.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        if missing:
+            raise serializers.ValidationError(f'Студенты не найдены: {", ".join(map(str, sorted(missing)))}.')
+        return value
+
+    def update(self, instance: models.StudentGroup, validated_data: dict) -> models.StudentGroup:
+        """Добавляет студентов, которых еще нет в группе; студенты с новыми ФИО создаются"""
+        ids = set(validated_data.get('student_ids', []))
+        with transaction.atomic():
+            names = [item['full_name'] for item in validated_data.get('students', [])]
+            ids.update(student.id for student in get_or_create_students(names))
+            current = set(instance.students.filter(pk__in=ids).values_list('pk', flat=True))
+            self.changed = sorted(ids - current)
+            instance.students.add(*self.changed)
+        return instance
+
+
+class StudentGroupRemoveStudentsSerializer(StudentGroupMembershipSerializer):
+    changed_field = 'removed'
+
+    def update(self, instance: models.StudentGroup, validated_data: dict) -> models.StudentGroup:
+        """Удаляет из группы указанных студентов; студенты, которых в ней нет, пропускаются"""
+        names = [item['full_name'] for item in validated_data.get('students', [])]
+        with transaction.atomic():
+            self.changed = sorted(instance.students.filter(
+                Q(pk__in=validated_data.get('student_ids', [])) | Q(full_name__in=names)
+            ).values_list('pk', flat=True))
+            instance.students.remove(*self.changed)
+        return instance
@@ -0,0 +1,35 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from people import models
+from school import cache
+
+
+@receiver([post_save, post_delete], sender=models.Student)
+def invalidate_students(sender, **kwargs):
+    cache.invalidate(models.Student)
+
+
+@receiver([post_save, post_delete], sender=models.Teacher)
+def invalidate_teachers(sender, **kwargs):
+    cache.invalidate(models.Teacher)
+
+
+@receiver([post_save, post_delete], sender=models.StudentGroup)
+def invalidate_groups(sender, **kwargs):
+    cache.invalidate(models.StudentGroup)
+
+
+@receiver(m2m_changed, sender=models.StudentGroup.students.through)
+def invalidate_group_students(sender, instance, action: str, reverse: bool, pk_set, **kwargs):
+    if action.startswith('post_'):
+        cache.invalidate(models.StudentGroup)
+
+
+@receiver(pre_delete, sender=models.Student)
+def invalidate_student_groups(sender, instance, **kwargs):
+    """
+    Связи удаляемого студента удаляются каскадом без сигнала m2m_changed, поэтому ответы, зависящие только
+    от групп (список групп), сбрасываются здесь
+    """
+    cache.invalidate(models.StudentGroup)
@@ -1,26 +1,48 @@
+from django.db.models import Prefetch
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.filters import OrderingFilter
+from rest_framework.response import Response
 
 from people import models
 from people import serializers
+from people.pagination import RosterPagination
+from school.cache import CachedResponseMixin
+from school.conditional import ConditionalGetMixin
+from school.fast import FastListMixin
+from school.search import TrigramSearchFilter
+from school.sparse import SparseFieldsetMixin
 
 
-class StudentViewSet(viewsets.ModelViewSet):
-    queryset = models.Student.objects.all()
+class StudentViewSet(FastListMixin, SparseFieldsetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = models.Student.objects.order_by('id')
     serializer_class = serializers.StudentSerializer
+    pagination_class = RosterPagination
+    filter_backends = (TrigramSearchFilter,)
+    search_field = 'full_name'
     ordering = ['full_name']
 
 
-class TeacherViewSet(viewsets.ModelViewSet):
-    queryset = models.Teacher.objects.all()
+class TeacherViewSet(FastListMixin, SparseFieldsetMixin, ConditionalGetMixin, CachedResponseMixin,
+                     viewsets.ModelViewSet):
+    queryset = models.Teacher.objects.order_by('id')
     serializer_class = serializers.TeacherSerializer
-    filter_backends = (OrderingFilter,)
+    cache_models = (models.Teacher,)
+    pagination_class = RosterPagination
+    filter_backends = (OrderingFilter, TrigramSearchFilter)
+    search_field = 'full_name'
     ordering_fields = ['full_name']
 
 
-class StudentGroupViewSet(viewsets.ModelViewSet):
-    queryset = models.StudentGroup.objects.prefetch_related('students')
+class StudentGroupViewSet(FastListMixin, SparseFieldsetMixin, ConditionalGetMixin, CachedResponseMixin,
+                          viewsets.ModelViewSet):
+    queryset = models.StudentGroup.objects.order_by('id').prefetch_related('students')
     default_serializer_class = serializers.StudentGroupSerializer
+    cache_models = {
+        'list': (models.StudentGroup,),
+        'retrieve': (models.StudentGroup, models.Student),
+    }
+    pagination_class = RosterPagination
     filter_backends = (OrderingFilter,)
     ordering_fields = ['id']
 
@@ -29,8 +51,37 @@ class StudentGroupViewSet(viewsets.ModelViewSet):
         'create': serializers.StudentGroupCreateSerializer,
         'update': serializers.StudentGroupUpdateSerializer,
         'partial_update': serializers.StudentGroupUpdateSerializer,
-
+        'add_students': serializers.StudentGroupAddStudentsSerializer,
+        'remove_students': serializers.StudentGroupRemoveStudentsSerializer,
     }
+    membership_actions = ('add_students', 'remove_students')
+
+    def get_queryset(self):
+        if self.action in self.membership_actions:
+            # Состав группы изменяется запросами к промежуточной таблице, поэтому студенты не подгружаются
+            return models.StudentGroup.objects.all()
+        if self.action == 'list':
+            # В списке групп студенты выводятся только идентификаторами
+            return models.StudentGroup.objects.order_by('id').prefetch_related(
+                Prefetch('students', queryset=models.Student.objects.only('id').order_by('id'))
+            )
+        return super().get_queryset()
 
     def get_serializer_class(self):
         return self.serializers.get(self.action, self.default_serializer_class)
+
+    @action(detail=True, methods=['post'])
+    def add_students(self, request, pk=None):
+        """Добавляет в группу студентов по идентификаторам и/или ФИО"""
+        return self.change_students(request)
+
+    @action(detail=True, methods=['post'])
+    def remove_students(self, request, pk=None):
+        """Удаляет из группы студентов по идентификаторам и/или ФИО"""
+        return self.change_students(request)
+
+    def change_students(self, request) -> Response:
+        serializer = self.get_serializer(self.get_object(), data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
@@ -0,0 +1,151 @@
+"""
+Кэш ответов API на чтение.
+
+Ключ ответа включает номера поколений моделей, от которых зависит представление. Сигналы моделей
+увеличивают номер поколения после фиксации транзакции, поэтому устаревшие ответы просто перестают
+находиться по новому ключу и вытесняются по истечении срока хранения.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from school import replica
+
+PREFIX = 'api-cache'
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def _generation_key(scope: str) -> str:
+    return f'{PREFIX}:generation:{scope}'
+
+
+def _modified_key(model) -> str:
+    return f'{PREFIX}:modified:{model._meta.label_lower}'
+
+
+def _increment(key: str, initial=1) -> None:
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, initial, None)
+
+
+def get_generations(models) -> list:
+    """Возвращает номера поколений моделей, заводя недостающие"""
+    return get_scope_generations([model._meta.label_lower for model in models])
+
+
+def get_scope_generations(scopes) -> list:
+    """Возвращает номера поколений областей кэша — строк вида `timetable:group:1`, заводя недостающие"""
+    cache = get_cache()
+    keys = [_generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            # Начальное значение не повторяет прежних номеров, если ключ поколения был вытеснен
+            generations[key] = time.time_ns()
+            cache.add(key, generations[key], None)
+    return [generations[key] for key in keys]
+
+
+def get_last_modified(models) -> float:
+    """Возвращает время последнего изменения моделей (timestamp); неизвестное время считается текущим"""
+    cache = get_cache()
+    keys = [_modified_key(model) for model in models]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            values[key] = time.time()
+            cache.add(key, values[key], None)
+    return max(values.values(), default=None)
+
+
+def invalidate(*models) -> None:
+    """Сбрасывает закэшированные ответы, зависящие от моделей, после фиксации текущей транзакции"""
+    def bump():
+        for model in models:
+            _increment(_generation_key(model._meta.label_lower), initial=time.time_ns())
+        get_cache().set_many({_modified_key(model): time.time() for model in models}, None)
+
+    transaction.on_commit(bump)
+
+
+def invalidate_scopes(scopes) -> None:
+    """Сбрасывает закэшированные данные областей кэша после фиксации текущей транзакции"""
+    scopes = set(scopes)
+
+    def bump():
+        for scope in scopes:
+            _increment(_generation_key(scope), initial=time.time_ns())
+
+    if scopes:
+        transaction.on_commit(bump)
+
+
+def record(event: str) -> None:
+    _increment(f'{PREFIX}:stats:{event}')
+
+
+def get_stats() -> dict:
+    stats = get_cache().get_many([f'{PREFIX}:stats:hits', f'{PREFIX}:stats:misses'])
+    return {
+        'hits': stats.get(f'{PREFIX}:stats:hits', 0),
+        'misses': stats.get(f'{PREFIX}:stats:misses', 0),
+    }
+
+
+class CachedResponseMixin:
+    """
+    Кэширует ответы действий list и retrieve.
+
+    `cache_models` — модели, от которых зависит ответ: кортеж для всех действий или словарь по действиям.
+    Внутри открытой транзакции кэш не используется, так как прочитанные данные еще могут быть откачены.
+    Клиенты, закрепленные за основной базой после записи, читают в обход кэша, а ответы, прочитанные с реплики,
+    не сохраняются: реплика может отставать от номеров поколений, и старые данные попали бы под новый ключ.
+    """
+    cache_models = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_cache_models(self) -> tuple:
+        if isinstance(self.cache_models, dict):
+            return self.cache_models.get(self.action, ())
+        return self.cache_models
+
+    def get_cache_key(self, request) -> str:
+        generations = get_generations(self.get_cache_models())
+        raw = f'{request.get_host()}{request.get_full_path()}:{generations}'
+        return f'{PREFIX}:response:{self.basename}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if settings.API_CACHE_TIMEOUT <= 0 or connection.in_atomic_block or replica.is_pinned(request):
+            return handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            record('hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        record('misses')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK and not replica.read_from_replica():
+            cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,88 @@
+"""
+Условные GET-запросы к API.
+
+Версия ответа строится без запросов к базе: по номерам поколений моделей, от которых зависит представление
+(см. school.cache), и адресу запроса с параметрами фильтров. Сигналы моделей увеличивают номер поколения
+при любом изменении, в том числе удалении, поэтому на `If-None-Match` / `If-Modified-Since` без изменений
+отвечается 304 без выборки и сериализации данных, а стоимость проверки не зависит от объема выборки.
+Версия общая для всех записей модели: изменение любой записи меняет `ETag` всех ответов, зависящих от модели.
+Поколения общие с кэшем ответов, поэтому условные запросы работают, только когда он включен (`API_CACHE_TIMEOUT`
+больше нуля, что требует кэша, общего для всех процессов сервера). Ответ, прочитанный с отстающей реплики, может
+быть старше версии, поэтому он отдается без `ETag` и `Last-Modified`.
+"""
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from school import cache, replica
+
+CONDITIONAL_HEADERS = ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+
+
+class ConditionalGetMixin:
+    """
+    Отвечает на условные запросы к действиям list и retrieve.
+
+    `version_models` — модели, от изменения которых зависит ответ: кортеж для всех действий или словарь
+    по действиям; если не заданы, используются `cache_models` представления или модель выборки.
+    Должен стоять в списке родителей перед CachedResponseMixin, чтобы 304 возвращался без обращения к кэшу ответов.
+    """
+    version_models = None
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def get_version_models(self) -> tuple:
+        models = self.version_models
+        if models is None:
+            models = getattr(self, 'cache_models', None) or (self.get_queryset().model,)
+        if isinstance(models, dict):
+            return models.get(self.action, ())
+        return models
+
+    def get_version(self, request) -> tuple:
+        """Возвращает ETag и время последнего изменения ответа по поколениям его моделей"""
+        models = self.get_version_models()
+        generations = cache.get_generations(models)
+        raw = f'{self.basename}:{self.action}:{request.get_full_path()}:{generations}'
+        return quote_etag(hashlib.md5(raw.encode()).hexdigest()), cache.get_last_modified(models)
+
+    def get_conditional_response(self, handler, request, *args, **kwargs):
+        if settings.API_CACHE_TIMEOUT <= 0:
+            return handler(request, *args, **kwargs)
+
+        etag, last_modified = self.get_version(request)
+        timestamp = int(last_modified) if last_modified else None
+
+        response = None
+        if self.is_conditional(request, *args, **kwargs):
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code == 304 or (200 <= response.status_code < 300 and not replica.read_from_replica()):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
+
+    def is_conditional(self, request, *args, **kwargs) -> bool:
+        """
+        Проверяет, нужно ли сравнивать версию: есть условные заголовки и, для записи, сама запись существует,
+        иначе на `If-None-Match: *` вернулся бы 304 вместо 404
+        """
+        if not any(header in request.META for header in CONDITIONAL_HEADERS):
+            return False
+        if self.action != 'retrieve':
+            return True
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.get_queryset().model._default_manager.filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+        try:
+            return queryset.exists()
+        except (ValueError, TypeError):
+            # Некорректный идентификатор обрабатывает само действие
+            return False
@@ -0,0 +1,212 @@
+"""
+Быстрая сериализация списков.
+
+Действие list строит ответ из строк `values()` вместо объектов моделей и ModelSerializer: записи страницы
+выбираются одним запросом со столбцами связанных моделей, а связи многие-ко-многим — одним запросом
+к промежуточной таблице на поле. Результат совпадает с ответом сериализатора побайтно: поля выводятся в том же
+порядке и преобразуются теми же правилами.
+
+Поддерживаются поля модели, SlugRelatedField и PrimaryKeyRelatedField (в том числе many=True) по прямым связям
+и вложенные many=True сериализаторы по прямой связи многие-ко-многим с простыми полями. Если сериализатор
+содержит что-то другое, действие выполняется обычным путем. Быстрый путь отключается настройкой `API_FAST_LIST`.
+"""
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import ISO_8601, relations, serializers
+from rest_framework.settings import api_settings
+
+from school.sparse import get_ordering_fields
+
+PLAIN_FIELDS = (serializers.IntegerField, serializers.CharField, serializers.ReadOnlyField)
+
+
+class Unsupported(Exception):
+    """Поле сериализатора нельзя вывести из строк values()"""
+
+
+def get_converter(field):
+    """
+    Возвращает функцию, которая преобразует значение столбца так же, как `field.to_representation()`,
+    или None, если значение выводится как есть
+    """
+    if isinstance(field, serializers.DateTimeField):
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        if output_format is not None and output_format.lower() != ISO_8601 and not settings.USE_TZ:
+            return lambda value: value.strftime(output_format) if value else None
+        return lambda value: field.to_representation(value) if value else None
+    if type(field) in PLAIN_FIELDS:
+        # int() и str() не меняют значений, прочитанных из столбцов таких полей
+        return None
+    # Сериализатор не вызывает to_representation() для None
+    return lambda value: None if value is None else field.to_representation(value)
+
+
+def get_model_field(model, name: str):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        raise Unsupported(name)
+
+
+def get_column(model, field) -> tuple:
+    """Возвращает путь для values() и преобразование значения для поля без связи многие-ко-многим"""
+    if '.' in field.source or field.source == '*':
+        raise Unsupported(field.field_name)
+    model_field = get_model_field(model, field.source)
+    if model_field.many_to_many or model_field.one_to_many:
+        raise Unsupported(field.field_name)
+
+    if isinstance(field, relations.SlugRelatedField):
+        return f'{field.source}__{field.slug_field}', None
+    if isinstance(field, relations.PrimaryKeyRelatedField) and field.pk_field is None:
+        return field.source, None
+    if isinstance(field, (relations.RelatedField, serializers.BaseSerializer)) or model_field.is_relation:
+        raise Unsupported(field.field_name)
+    return field.source, get_converter(field)
+
+
+class Relation:
+    """Связь многие-ко-многим, выбираемая одним запросом к промежуточной таблице"""
+
+    def __init__(self, model, field):
+        model_field = get_model_field(model, field.source)
+        if not model_field.many_to_many or model_field.auto_created:
+            raise Unsupported(field.field_name)
+
+        self.through = model_field.remote_field.through
+        self.owner = f'{model_field.m2m_field_name()}_id'
+        self.target = model_field.m2m_reverse_field_name()
+
+        if isinstance(field, relations.ManyRelatedField):
+            child = field.child_relation
+            if not isinstance(child, relations.PrimaryKeyRelatedField) or child.pk_field is not None:
+                raise Unsupported(field.field_name)
+            self.columns = None
+        else:
+            child = field.child
+            if not isinstance(child, serializers.ModelSerializer):
+                raise Unsupported(field.field_name)
+            related = model_field.remote_field.model
+            self.columns = [(name, *get_column(related, nested)) for name, nested in child.fields.items()]
+
+    def fetch(self, owner_ids: list) -> dict:
+        """Возвращает значения связи по владельцам; порядок — по идентификатору связанной записи"""
+        values = {pk: [] for pk in owner_ids}
+        queryset = self.through._default_manager.filter(**{f'{self.owner}__in': owner_ids}).order_by(
+            f'{self.target}_id'
+        )
+        if self.columns is None:
+            for owner_id, target_id in queryset.values_list(self.owner, f'{self.target}_id'):
+                values[owner_id].append(target_id)
+            return values
+
+        # Связанная запись встречается у многих владельцев, поэтому ее вывод собирается один раз
+        items = {}
+        paths = [f'{self.target}__{path}' for _, path, _ in self.columns]
+        for owner_id, target_id, *row in queryset.values_list(self.owner, f'{self.target}_id', *paths):
+            item = items.get(target_id)
+            if item is None:
+                item = items[target_id] = OrderedDict(
+                    (name, value if convert is None else convert(value))
+                    for (name, _, convert), value in zip(self.columns, row)
+                )
+            values[owner_id].append(item)
+        return values
+
+
+class Plan:
+    """Описание того, как собрать вывод сериализатора из строк values()"""
+
+    def __init__(self, serializer, extra_columns=()):
+        child = getattr(serializer, 'child', serializer)
+        if not isinstance(child, serializers.ModelSerializer):
+            raise Unsupported(type(child).__name__)
+
+        model = child.Meta.model
+        self.fields = []
+        self.relations = {}
+        columns = {'pk'}
+        for name, field in child.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, (relations.ManyRelatedField, serializers.ListSerializer)):
+                self.relations[name] = Relation(model, field)
+                self.fields.append((name, None, None))
+                continue
+            column, convert = get_column(model, field)
+            columns.add(column)
+            self.fields.append((name, column, convert))
+        self.columns = sorted(columns | set(extra_columns))
+
+    def get_queryset(self, queryset):
+        """Выборка строк values() вместо объектов; сортировка и фильтры сохраняются"""
+        return queryset.select_related(None).prefetch_related(None).values(*self.columns)
+
+    def to_representation(self, rows) -> list:
+        rows = list(rows)
+        owner_ids = [row['pk'] for row in rows]
+        related = {name: relation.fetch(owner_ids) for name, relation in self.relations.items() if owner_ids}
+
+        data = []
+        for row in rows:
+            item = OrderedDict()
+            for name, column, convert in self.fields:
+                if column is None:
+                    item[name] = related[name][row['pk']]
+                elif convert is None:
+                    item[name] = row[column]
+                else:
+                    item[name] = convert(row[column])
+            data.append(item)
+        return data
+
+
+class FastListSerializer:
+    """Заменяет ListSerializer в действии list: у него используется только `data`"""
+
+    def __init__(self, plan: Plan, rows):
+        self.plan = plan
+        self.rows = rows
+
+    @property
+    def data(self):
+        return serializers.ReturnList(self.plan.to_representation(self.rows), serializer=self)
+
+
+class FastListMixin:
+    """
+    Выполняет действие list через быстрый путь, если его поддерживает сериализатор.
+
+    Должен стоять в списке родителей первым, чтобы получать сериализатор с учетом `?fields=` / `?omit=`.
+    Пагинация получает выборку values(), поэтому значения полей сортировки берутся из словарей строк.
+    """
+    fast_list = True
+
+    def get_fast_plan(self):
+        if hasattr(self, '_fast_plan'):
+            return self._fast_plan
+
+        self._fast_plan = None
+        if self.action == 'list' and self.fast_list and settings.API_FAST_LIST:
+            try:
+                self._fast_plan = Plan(super().get_serializer(many=True), get_ordering_fields(self))
+            except Unsupported:
+                pass
+        return self._fast_plan
+
+    def paginate_queryset(self, queryset):
+        plan = self.get_fast_plan()
+        if plan is not None:
+            queryset = plan.get_queryset(queryset)
+        return super().paginate_queryset(queryset)
+
+    def get_serializer(self, *args, **kwargs):
+        plan = self.get_fast_plan()
+        if plan is not None and args and kwargs.get('many'):
+            rows = args[0]
+            if not isinstance(rows, list):
+                rows = plan.get_queryset(rows)
+            return FastListSerializer(plan, rows)
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,158 @@
+"""
+Метрики запросов к API в формате Prometheus.
+
+Middleware замеряет для каждого запроса время ответа, число SQL-запросов и их суммарное время (через
+`execute_wrapper` всех подключений к базам) и накапливает их по представлениям (имени маршрута) и методам.
+Метрики отдаются по адресу `/metrics`; они хранятся в памяти процесса, поэтому при нескольких процессах сервера
+каждый отдает свои. При `DEBUG` ответ содержит заголовок `X-Query-Count` с числом SQL-запросов.
+"""
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+QUERY_COUNT_HEADER = 'X-Query-Count'
+LABELS = ('view', 'method')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+def format_labels(labels: tuple) -> str:
+    values = [str(value).replace('\\', '\\\\').replace('"', '\\"') for value in labels]
+    return ','.join(f'{name}="{value}"' for name, value in zip(LABELS, values))
+
+
+class Histogram:
+    """Гистограмма: число наблюдений не больше каждой границы, их сумма и количество по значениям меток"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, description: str, buckets: tuple):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        series = self.series.setdefault(labels, [[0] * len(self.buckets), 0, 0])
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def get_count(self, labels: tuple) -> int:
+        return self.series.get(labels, (None, 0, 0))[2]
+
+    def render(self) -> list:
+        lines = []
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            label_text = format_labels(labels)
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {count}')
+        return lines
+
+
+class Counter:
+    """Счетчик по значениям меток"""
+    kind = 'counter'
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self.series = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        self.series[labels] = self.series.get(labels, 0) + value
+
+    def get_count(self, labels: tuple) -> float:
+        return self.series.get(labels, 0)
+
+    def render(self) -> list:
+        return [f'{self.name}{{{format_labels(labels)}}} {value}' for labels, value in sorted(self.series.items())]
+
+
+class Registry:
+    """Метрики процесса; запись и чтение защищены блокировкой, так как сервер может обслуживать запросы потоками"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.request_duration = Histogram(
+            'http_request_duration_seconds', 'Время ответа на запрос.', DURATION_BUCKETS
+        )
+        self.request_queries = Histogram(
+            'http_request_db_queries', 'Число SQL-запросов на один запрос.', QUERY_BUCKETS
+        )
+        self.query_duration = Counter(
+            'http_request_db_duration_seconds_total', 'Суммарное время SQL-запросов.'
+        )
+        self.metrics = (self.request_duration, self.request_queries, self.query_duration)
+
+    def observe(self, labels: tuple, duration: float, queries: int, query_duration: float) -> None:
+        with self.lock:
+            self.request_duration.observe(labels, duration)
+            self.request_queries.observe(labels, queries)
+            self.query_duration.observe(labels, query_duration)
+
+    def render(self) -> str:
+        lines = []
+        with self.lock:
+            for metric in self.metrics:
+                lines.append(f'# HELP {metric.name} {metric.description}')
+                lines.append(f'# TYPE {metric.name} {metric.kind}')
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class QueryRecorder:
+    """Обертка выполнения SQL-запросов: считает их число и время"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """Замеряет запрос целиком, поэтому должен стоять первым в списке MIDDLEWARE"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else 'unresolved'
+        registry.observe((view, request.method), duration, recorder.count, recorder.duration)
+
+        if settings.DEBUG:
+            response[QUERY_COUNT_HEADER] = str(recorder.count)
+        return response
+
+
+def metrics_view(request):
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
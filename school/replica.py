@@ -0,0 +1,81 @@
+"""
+Чтение с реплики базы данных.
+
+Запросы безопасными методами (GET, HEAD, OPTIONS) читают данные с реплики, заданной настройкой
+`DATABASE_REPLICA_ALIAS`, а все записи выполняются на основной базе. После запроса, изменяющего данные,
+клиент получает cookie, и до ее истечения (`DATABASE_REPLICA_PIN_SECONDS`) его запросы читают с основной базы:
+реплика может отставать, а клиент должен видеть свои изменения.
+
+Без реплики, вне HTTP-запроса (команды, сигналы) и внутри транзакции чтение выполняется с основной базы.
+Данные, прочитанные с реплики, могут быть старше номеров поколений кэша, поэтому такие ответы не кэшируются
+и не получают `ETag` (см. read_from_replica).
+"""
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'db_primary_until'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_replica_used = ContextVar('replica_used', default=False)
+
+
+def is_pinned(request) -> bool:
+    """Клиент недавно изменял данные и читает с основной базы"""
+    try:
+        return float(request.COOKIES[PIN_COOKIE]) > time.time()
+    except (KeyError, ValueError):
+        return False
+
+
+def read_from_replica() -> bool:
+    """Текущий запрос читал данные с реплики"""
+    return _replica_used.get()
+
+
+class ReplicaRoutingMiddleware:
+    """Разрешает чтение с реплики на время безопасного запроса и закрепляет за основной базой писавших клиентов"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _replica_reads.set(request.method in SAFE_METHODS and not is_pinned(request))
+        used_token = _replica_used.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica_used.reset(used_token)
+            _replica_reads.reset(token)
+
+        if request.method not in SAFE_METHODS and settings.DATABASE_REPLICA_ALIAS:
+            seconds = settings.DATABASE_REPLICA_PIN_SECONDS
+            response.set_cookie(PIN_COOKIE, str(time.time() + seconds), max_age=seconds, httponly=True)
+        return response
+
+
+class ReplicaRouter:
+    """Направляет чтение безопасных запросов на реплику, а запись — на основную базу"""
+
+    def db_for_read(self, model, **hints):
+        alias = settings.DATABASE_REPLICA_ALIAS
+        if alias and _replica_reads.get() and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            _replica_used.set(True)
+            return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика содержит те же данные, что и основная база
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплики повторяет основную базу и не мигрируется отдельно
+        if db == settings.DATABASE_REPLICA_ALIAS:
+            return False
+        return None
@@ -0,0 +1,101 @@
+"""
+Поиск по названию записи: `?search=`.
+
+На PostgreSQL с расширением pg_trgm записи отбираются по вхождению подстроки (ILIKE) или по триграммному сходству,
+оба условия используют GIN-индекс с классом операторов gin_trgm_ops (создается миграциями), и сортируются по убыванию
+сходства. На остальных СУБД (и на PostgreSQL без pg_trgm) выполняется поиск подстроки без учета регистра, а записи,
+начинающиеся с запроса, выводятся первыми. Запросы короче триграммы (1–2 символа) ищутся по началу значения.
+Выдача ограничивается `API_SEARCH_LIMIT` лучшими записями, поэтому подсчет и пагинация не зависят от размера таблицы.
+"""
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, CharField, IntegerField, Q, Value, When, lookups
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+SEARCH_PARAM = 'search'
+RANK = 'search_rank'
+TRIGRAM_EXTENSION = 'pg_trgm'
+TRIGRAM_LENGTH = 3
+
+
+class ILikeMixin:
+    """
+    Сравнение с шаблоном без учета регистра оператором ILIKE (только PostgreSQL).
+
+    Встроенные icontains и istartswith дают `UPPER("поле"::text) LIKE UPPER(%s)`, такое выражение индекс
+    gin_trgm_ops по самому полю не обслуживает, а ILIKE по полю обслуживает.
+    """
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', lhs_params + rhs_params
+
+
+@CharField.register_lookup
+class ILikeContains(ILikeMixin, lookups.IContains):
+    lookup_name = 'ilike_contains'
+
+
+@CharField.register_lookup
+class ILikeStartsWith(ILikeMixin, lookups.IStartsWith):
+    lookup_name = 'ilike_startswith'
+
+
+def has_trigram(connection) -> bool:
+    """Проверяет, установлено ли в базе расширение pg_trgm; результат запоминается для подключения"""
+    if connection.vendor != 'postgresql':
+        return False
+    if not hasattr(connection, 'has_trigram'):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = %s)', [TRIGRAM_EXTENSION])
+            connection.has_trigram = cursor.fetchone()[0]
+    return connection.has_trigram
+
+
+def rank(queryset, field: str, term: str):
+    """Отбирает записи, подходящие под запрос, и сортирует их по релевантности"""
+    # На PostgreSQL с pg_trgm условия записываются через ILIKE, чтобы использовать индекс gin_trgm_ops
+    prefix = 'ilike_' if has_trigram(connections[queryset.db]) else 'i'
+
+    if len(term) < TRIGRAM_LENGTH:
+        # Сходство и подстрока для таких запросов бессмысленны: отбираются записи, начинающиеся с запроса
+        return queryset.filter(**{f'{field}__{prefix}startswith': term}).annotate(**{
+            RANK: Value(1, output_field=IntegerField())
+        }).order_by(field, 'pk')
+
+    if prefix == 'ilike_':
+        return queryset.filter(
+            Q(**{f'{field}__ilike_contains': term}) | Q(**{f'{field}__trigram_similar': term})
+        ).annotate(**{RANK: TrigramSimilarity(field, term)}).order_by(f'-{RANK}', 'pk')
+
+    return queryset.filter(**{f'{field}__icontains': term}).annotate(**{RANK: Case(
+        When(**{f'{field}__istartswith': term}, then=Value(1)), default=Value(0), output_field=IntegerField()
+    )}).order_by(f'-{RANK}', field, 'pk')
+
+
+class TrigramSearchFilter(BaseFilterBackend):
+    """
+    Фильтр `?search=` по полю `search_field` представления.
+
+    Должен стоять последним в `filter_backends`: он задает сортировку по релевантности вместо сортировки списка.
+    """
+    max_length = 100
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(SEARCH_PARAM, '').strip()
+        if not term or getattr(view, 'action', None) != 'list':
+            return queryset
+        if len(term) > self.max_length:
+            raise ValidationError({SEARCH_PARAM: [
+                f'Длина поискового запроса не должна превышать {self.max_length} символов.'
+            ]})
+
+        # Идентификаторы лучших записей выбираются один раз за запрос: версия для ETag, COUNT и страница
+        # читаются уже по первичному ключу
+        if getattr(view, '_search', (None,))[0] != term:
+            best = rank(queryset, view.search_field, term).values_list('pk', flat=True)[:settings.API_SEARCH_LIMIT]
+            view._search = (term, list(best))
+        return rank(queryset.filter(pk__in=view._search[1]), view.search_field, term)
@@ -1,5 +1,6 @@
 import os
 import environ
+from django.core.exceptions import ImproperlyConfigured
 
 env = environ.Env(
     DEBUG=(bool, False)
@@ -22,6 +23,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'django_filters',
     'lessons',
@@ -29,7 +31,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'school.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'school.replica.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -70,6 +74,53 @@ DATABASES = {
     }
 }
 
+# Реплика для чтения: задается хостом и/или именем базы, остальные параметры берутся из основной
+DATABASE_REPLICA_ALIAS = None
+if env('DB_REPLICA_HOST', default='') or env('DB_REPLICA_NAME', default=''):
+    DATABASE_REPLICA_ALIAS = 'replica'
+    DATABASES[DATABASE_REPLICA_ALIAS] = {
+        **DATABASES['default'],
+        'NAME': env('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'HOST': env('DB_REPLICA_HOST', default=DATABASES['default']['HOST']),
+        'PORT': env('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['school.replica.ReplicaRouter']
+
+DATABASE_REPLICA_PIN_SECONDS = env.int('DB_REPLICA_PIN_SECONDS', default=5)
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+API_CACHE_ALIAS = 'default'
+
+# Номера поколений, из которых строятся ключи кэша ответов и ETag, хранятся в кэше и должны быть общими для всех
+# процессов сервера: иначе сброс в одном процессе не виден остальным. Кэш в памяти процесса годится только для
+# одного процесса, поэтому с ним кэш ответов и условные запросы по умолчанию выключены, а включить их нельзя
+API_CACHE_LOCAL_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+
+API_CACHE_TIMEOUT = env.int(
+    'API_CACHE_TIMEOUT', default=0 if CACHES[API_CACHE_ALIAS]['BACKEND'] in API_CACHE_LOCAL_BACKENDS else 300
+)
+if API_CACHE_TIMEOUT > 0 and CACHES[API_CACHE_ALIAS]['BACKEND'] in API_CACHE_LOCAL_BACKENDS:
+    raise ImproperlyConfigured(
+        'API_CACHE_TIMEOUT > 0 требует кэша, общего для всех процессов сервера: задайте CACHE_URL '
+        '(например, memcache://127.0.0.1:11211 или filecache:///var/tmp/school-api-cache) или API_CACHE_TIMEOUT=0.'
+    )
+
+API_FAST_LIST = env.bool('API_FAST_LIST', default=True)
+
+API_SEARCH_LIMIT = env.int('API_SEARCH_LIMIT', default=100)
+
+# Секционирование занятий по месяцам (PostgreSQL), см. lessons.partitions
+LESSON_PARTITIONING = env.bool('LESSON_PARTITIONING', default=False)
+
+LESSON_RETENTION_MONTHS = env.int('LESSON_RETENTION_MONTHS', default=24)
+
+LESSON_ARCHIVE_DIR = env('LESSON_ARCHIVE_DIR', default=os.path.join(BASE_DIR, 'archive'))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -0,0 +1,126 @@
+"""
+Выборочные поля ответа: `?fields=` и `?omit=`.
+
+Параметры сокращают не только ответ, но и запрос к базе: связи, поля которых не запрошены, не подгружаются
+через select_related / prefetch_related, а из таблицы модели выбираются только нужные столбцы.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def parse_names(value: str) -> list:
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def get_source_root(field):
+    """Возвращает поле модели, из которого берется значение поля сериализатора, или None, если оно вычисляемое"""
+    if field.source == '*':
+        return None
+    return field.source.split('.')[0]
+
+
+def get_ordering_fields(view) -> set:
+    """Поля сортировки читаются пагинацией из записей, поэтому всегда выбираются"""
+    names = list(getattr(view, 'ordering', None) or ())
+    names += [name for name in getattr(view, 'ordering_fields', None) or () if name != '__all__']
+    names += list(getattr(view.paginator, 'ordering', None) or ()) if view.paginator else []
+    return {name.lstrip('-') for name in names if '__' not in name and name.lstrip('-') != 'pk'}
+
+
+class SparseFieldsetMixin:
+    """
+    Поддерживает параметры `?fields=date,study_subject` и `?omit=missing_students` в действиях list и retrieve.
+
+    Поля исключаются из сериализатора, а queryset после filter_queryset() сокращается: убираются select_related
+    и prefetch_related незапрошенных связей и, если все оставшиеся поля берутся из полей модели, применяется only().
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    def get_sparse_fields(self):
+        """Возвращает множество выводимых полей или None, если параметры не переданы"""
+        if hasattr(self, '_sparse_fields'):
+            return self._sparse_fields
+
+        self._sparse_fields = None
+        params = self.request.query_params
+        if self.action not in self.sparse_actions or not (FIELDS_PARAM in params or OMIT_PARAM in params):
+            return None
+
+        available = self.get_sparse_serializer().fields
+        requested = parse_names(params.get(FIELDS_PARAM, '')) or list(available)
+        omitted = parse_names(params.get(OMIT_PARAM, ''))
+        errors = {}
+        for param, names in ((FIELDS_PARAM, requested), (OMIT_PARAM, omitted)):
+            unknown = [name for name in names if name not in available]
+            if unknown:
+                errors[param] = [f'Неизвестные поля: {", ".join(unknown)}. Доступные поля: {", ".join(available)}.']
+        if errors:
+            raise ValidationError(errors)
+
+        self._sparse_fields = set(requested) - set(omitted)
+        return self._sparse_fields
+
+    def get_sparse_serializer(self):
+        if not hasattr(self, '_sparse_serializer'):
+            self._sparse_serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        return self._sparse_serializer
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        names = self.get_sparse_fields()
+        if names is not None:
+            target = getattr(serializer, 'child', serializer)
+            for name in [name for name in target.fields if name not in names]:
+                del target.fields[name]
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        names = self.get_sparse_fields()
+        if names is None:
+            return queryset
+        return self.narrow_queryset(queryset, names)
+
+    def narrow_queryset(self, queryset, names: set):
+        fields = self.get_sparse_serializer().fields
+        kept = {get_source_root(field) for name, field in fields.items() if name in names}
+        dropped = {get_source_root(field) for name, field in fields.items() if name not in names} - kept
+
+        if isinstance(queryset.query.select_related, dict):
+            related = [
+                path for path in self._flatten(queryset.query.select_related) if path.split('__')[0] not in dropped
+            ]
+            queryset = queryset.select_related(None)
+            if related:
+                queryset = queryset.select_related(*related)
+
+        lookups = [
+            lookup for lookup in queryset._prefetch_related_lookups
+            if (lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup).split('__')[0] not in dropped
+        ]
+        queryset = queryset.prefetch_related(None).prefetch_related(*lookups)
+
+        if None in kept:
+            # Вычисляемое поле может обращаться к любому полю модели
+            return queryset
+        columns = {queryset.model._meta.pk.name, *get_ordering_fields(self)}
+        for root in kept:
+            try:
+                field = queryset.model._meta.get_field(root)
+            except FieldDoesNotExist:
+                return queryset
+            if field.concrete and not field.many_to_many:
+                columns.add(field.name)
+        return queryset.only(*columns)
+
+    @classmethod
+    def _flatten(cls, related: dict, prefix: str = '') -> list:
+        paths = []
+        for name, nested in related.items():
+            path = f'{prefix}{name}'
+            paths.extend(cls._flatten(nested, f'{path}__') if nested else [path])
+        return paths
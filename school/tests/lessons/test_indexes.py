@@ -0,0 +1,35 @@
+from django.test import TestCase
+
+from lessons.models import StudySubject, Lesson
+from school.tests.utils import explain
+
+
+class TestLessonIndexes(TestCase):
+    """
+    Планы запросов проверяются на пустых таблицах: тесты не создают записей и не сдвигают последовательности
+    идентификаторов, на которые опираются другие тесты на PostgreSQL
+    """
+
+    def test_group_date_index(self):
+        plan = explain(Lesson.objects.filter(student_group_id=1).order_by('date'))
+        self.assertIn('lesson_group_date_idx', plan)
+
+    def test_teacher_date_index(self):
+        plan = explain(Lesson.objects.filter(teacher_id=1).order_by('date'))
+        self.assertIn('lesson_teacher_date_idx', plan)
+
+    def test_not_completed_index(self):
+        plan = explain(Lesson.objects.filter(status=False).order_by('date'))
+        self.assertIn('lesson_not_completed_idx', plan)
+
+    def test_date_id_index(self):
+        plan = explain(Lesson.objects.order_by('date', 'id'))
+        self.assertIn('lesson_date_id_idx', plan)
+
+    def test_subject_title_index(self):
+        plan = explain(StudySubject.objects.filter(title='Chemistry'))
+        self.assertIn('lessons_studysubject_title', plan)
+
+    def test_subject_date_index(self):
+        plan = explain(Lesson.objects.filter(study_subject_id=1).order_by('date', 'id')[:10])
+        self.assertIn('lesson_subject_date_idx', plan)
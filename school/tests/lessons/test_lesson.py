@@ -1,13 +1,17 @@
+from datetime import timedelta
 from django.utils import timezone
 import json
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 
 from lessons.models import StudySubject, Lesson
 from lessons.serializers import LessonSerializer, LessonUpdateSerializer
 from people.models import Student, Teacher, StudentGroup
+from school.tests.utils import get_writes
 
 
 class TestLesson(TestCase):
@@ -119,6 +123,126 @@ class TestLesson(TestCase):
                          ['Занятия нельзя завершить раньше назначенной даты.']
                          )
 
+    def test_bulk_create(self):
+        url = reverse('lesson-bulk')
+        data = json.dumps([
+            {
+                'date': '01/02/2023 10:00:00',
+                'teacher': 1,
+                'study_subject': 1,
+                'student_group': 1,
+                'status': True,
+                'missing_students': [1, 3]
+            },
+            {
+                'date': '02/02/2023 10:00:00',
+                'study_subject': 2,
+                'status': False,
+            },
+        ])
+
+        response = self.client.post(url, data=data, content_type='application/json')
+
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertEqual(4, Lesson.objects.all().count())
+        self.assertEqual([[1], []], [[item['id'] for item in lesson['missing_students']] for lesson in response.data])
+        self.assertEqual('Chemistry', response.data[0]['study_subject'])
+
+    def test_bulk_create_item_errors(self):
+        url = reverse('lesson-bulk')
+        data = json.dumps([
+            {
+                'date': '01/02/2023 10:00:00',
+                'study_subject': 1,
+                'status': False,
+            },
+            {
+                'date': '01/02/2023 10:00:00',
+                'study_subject': 1,
+                'student_group': 1,
+                'status': False,
+                'missing_students': [1]
+            },
+            {
+                'date': '01/05/2099 10:00:00',
+                'study_subject': 100,
+                'status': False,
+            },
+        ])
+
+        response = self.client.post(url, data=data, content_type='application/json')
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertEqual(2, Lesson.objects.all().count())
+        errors = response.json()
+        self.assertEqual({}, errors[0])
+        self.assertEqual(['Нельзя добавить отсутствующих студентов до завершения занятия.'], errors[1]['status'])
+        self.assertIn('study_subject', errors[2])
+
+    def test_bulk_create_queries_do_not_grow(self):
+        url = reverse('lesson-bulk')
+        lesson = {
+            'date': '01/02/2023 10:00:00',
+            'teacher': 1,
+            'study_subject': 1,
+            'student_group': 1,
+            'status': True,
+            'missing_students': [1, 2]
+        }
+
+        query_counts = []
+        for size in (1, 10):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(url, data=json.dumps([lesson] * size), content_type='application/json')
+            self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+            query_counts.append(len(context.captured_queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_bulk_update(self):
+        url = reverse('lesson-bulk')
+        data = json.dumps([
+            {
+                'id': self.lesson_1.id,
+                'date': '01/02/2023 10:00:00',
+                'study_subject': 2,
+                'student_group': 1,
+                'status': True,
+                'missing_students': [2, 3]
+            },
+            {
+                'id': self.lesson_2.id,
+                'date': '02/02/2023 10:00:00',
+                'study_subject': 1,
+                'status': False,
+            },
+        ])
+
+        response = self.client.put(url, data=data, content_type='application/json')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        lesson_1 = Lesson.objects.get(id=self.lesson_1.id)
+        lesson_2 = Lesson.objects.get(id=self.lesson_2.id)
+        self.assertEqual(self.subject_2, lesson_1.study_subject)
+        self.assertEqual([self.student_2], list(lesson_1.missing_students.all()))
+        self.assertEqual(self.subject_1, lesson_2.study_subject)
+        self.assertEqual([self.student_2], list(lesson_2.missing_students.all()))
+
+    def test_bulk_update_unknown_lesson(self):
+        url = reverse('lesson-bulk')
+        data = json.dumps([
+            {
+                'date': '01/02/2023 10:00:00',
+                'study_subject': 2,
+                'status': False,
+            },
+        ])
+
+        response = self.client.put(url, data=data, content_type='application/json')
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertIn('id', response.json()[0])
+
     def test_get_list(self):
         url = reverse('lesson-list')
         response = self.client.get(url)
@@ -126,7 +250,54 @@ class TestLesson(TestCase):
         serializer_data = LessonSerializer([self.lesson_1, self.lesson_2], many=True).data
 
         self.assertEqual(status.HTTP_200_OK, response.status_code)
-        self.assertEqual(serializer_data, response.data)
+        self.assertEqual(serializer_data, response.data['results'])
+        self.assertIsNone(response.data['next'])
+        self.assertIsNone(response.data['previous'])
+
+    def test_get_list_cursor_pages(self):
+        lessons = [self.lesson_1, self.lesson_2]
+        for day in range(1, 4):
+            lessons.append(Lesson.objects.create(
+                date=self.lesson_1.date - timedelta(days=day),
+                teacher=self.teacher_1,
+                study_subject=self.subject_1,
+            ))
+        expected = [item.id for item in sorted(lessons, key=lambda item: (item.date, item.id))]
+
+        url = reverse('lesson-list')
+        response = self.client.get(url, {'page_size': 2})
+        received = [item['id'] for item in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            received.extend(item['id'] for item in response.data['results'])
+
+        self.assertEqual(expected, received)
+
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(expected[2:4], [item['id'] for item in response.data['results']])
+
+    def test_get_list_cursor_with_filter_and_ordering(self):
+        same_date = Lesson.objects.create(
+            date=self.lesson_2.date,
+            teacher=self.teacher_1,
+            study_subject=self.subject_2,
+        )
+
+        url = reverse('lesson-list')
+        params = {'study_subject': self.subject_2.id, 'ordering': '-date', 'page_size': 1}
+        response = self.client.get(url, params)
+        received = [item['id'] for item in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            received.extend(item['id'] for item in response.data['results'])
+
+        self.assertEqual([same_date.id, self.lesson_2.id], received)
+
+    def test_get_list_invalid_cursor(self):
+        url = reverse('lesson-list')
+        response = self.client.get(url, {'cursor': 'invalid'})
+
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
 
     def test_retrieve(self):
         self.lesson_1.refresh_from_db()
@@ -207,6 +378,60 @@ class TestLesson(TestCase):
         self.assertEqual(status.HTTP_200_OK, response.status_code)
         self.assertEqual([1, 2], ser_data['missing_students'])
 
+    def test_update_missing_students_report_rejected(self):
+        url = reverse('lesson-detail', args=[self.lesson_1.id])
+        data = {
+            'date': '01/01/2023 10:00:00',
+            'teacher': 1,
+            'study_subject': 1,
+            'student_group': 1,
+            'status': True,
+            'missing_students': [1, 2, 3]
+        }
+
+        json_data = json.dumps(data)
+        response = self.client.put(f'{url}?report_rejected=true', data=json_data, content_type='application/json')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([1, 2], response.data['missing_students'])
+        self.assertEqual([3], response.data['rejected_missing_students'])
+
+    def test_update_unknown_missing_student(self):
+        url = reverse('lesson-detail', args=[self.lesson_1.id])
+        data = {
+            'status': True,
+            'missing_students': [1, 100]
+        }
+
+        json_data = json.dumps(data)
+        response = self.client.patch(url, data=json_data, content_type='application/json')
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertIn('100', response.json()['missing_students'][0])
+
+    def test_update_missing_students_queries_do_not_grow(self):
+        url = reverse('lesson-detail', args=[self.lesson_1.id])
+        data = {
+            'date': '01/01/2023 10:00:00',
+            'teacher': 1,
+            'study_subject': 1,
+            'student_group': 1,
+            'status': True,
+        }
+
+        outsiders = [Student.objects.create(full_name=f'Outsider {number}').id for number in range(5)]
+
+        # Первый запрос приводит занятие к общему для замеров состоянию
+        query_counts = []
+        for students in ([1], [1], [1, 3, *outsiders]):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.put(url, data=json.dumps({**data, 'missing_students': students}),
+                                           content_type='application/json')
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            query_counts.append(len(context.captured_queries))
+
+        self.assertEqual(query_counts[1], query_counts[2])
+
     def test_update_missing_students_before_end(self):
         url = reverse('lesson-detail', args=[self.lesson_1.id])
         data = {
@@ -265,6 +490,77 @@ class TestLesson(TestCase):
                          'Занятия нельзя завершить раньше назначенной даты.'
                          )
 
+    def test_mark_absent(self):
+        Lesson.objects.filter(id=self.lesson_2.id).update(status=True)
+        url = reverse('lesson-mark-absent', args=[self.lesson_2.id])
+        data = {'student_ids': [self.student_1.id, self.student_2.id, self.student_3.id]}
+
+        json_data = json.dumps(data)
+        response = self.client.post(url, data=json_data, content_type='application/json')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual({
+            'id': self.lesson_2.id,
+            'added': [self.student_1.id],
+            'missing_student_count': 2,
+            'rejected_missing_students': [self.student_3.id],
+        }, response.data)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(url, data=json_data, content_type='application/json')
+
+        self.assertEqual([], response.data['added'])
+        self.assertEqual([], get_writes(context))
+
+    def test_mark_absent_queries_do_not_grow(self):
+        Lesson.objects.filter(id=self.lesson_2.id).update(status=True)
+        self.lesson_2.missing_students.clear()
+        url = reverse('lesson-mark-absent', args=[self.lesson_2.id])
+
+        members = [Student.objects.create(full_name=f'Member {number}') for number in range(5)]
+        query_counts = []
+        for students in ([self.student_1], [self.student_2, *members]):
+            self.group_1.students.add(*students)
+            data = json.dumps({'student_ids': [student.id for student in students]})
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(url, data=data, content_type='application/json')
+            self.assertEqual(len(students), len(response.data['added']))
+            query_counts.append(len(context.captured_queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_mark_absent_before_end(self):
+        url = reverse('lesson-mark-absent', args=[self.lesson_2.id])
+
+        json_data = json.dumps({'student_ids': [self.student_1.id]})
+        response = self.client.post(url, data=json_data, content_type='application/json')
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertEqual(['Нельзя добавить отсутствующих студентов до завершения занятия.'], response.json()['status'])
+        self.assertEqual([self.student_2], list(self.lesson_2.missing_students.all()))
+
+    def test_mark_absent_without_group(self):
+        Lesson.objects.filter(id=self.lesson_1.id).update(status=True)
+        url = reverse('lesson-mark-absent', args=[self.lesson_1.id])
+
+        for data in ({'student_ids': [self.student_1.id]}, {'student_ids': []}):
+            json_data = json.dumps(data)
+            response = self.client.post(url, data=json_data, content_type='application/json')
+
+            self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_mark_present(self):
+        url = reverse('lesson-mark-present', args=[self.lesson_2.id])
+        data = {'student_ids': [self.student_1.id, self.student_2.id]}
+
+        json_data = json.dumps(data)
+        response = self.client.post(url, data=json_data, content_type='application/json')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(
+            {'id': self.lesson_2.id, 'removed': [self.student_2.id], 'missing_student_count': 0}, response.data
+        )
+
     def test_delete(self):
         url = reverse('lesson-detail', args=[self.lesson_2.id])
 
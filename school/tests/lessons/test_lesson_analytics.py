@@ -0,0 +1,137 @@
+from datetime import date, datetime
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from lessons import analytics
+from lessons.models import StudySubject, Lesson
+from people.models import Student, Teacher, StudentGroup
+
+
+class TestLessonAnalytics(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher_1 = Teacher.objects.create(full_name='Jake Epping', degree='Bachelor')
+        cls.teacher_2 = Teacher.objects.create(full_name='Bill Turcotte', degree='Master')
+
+        cls.student_1 = Student.objects.create(full_name='Joe Doe')
+        cls.student_2 = Student.objects.create(full_name='Sadie Dunhil')
+        cls.student_3 = Student.objects.create(full_name='Harry Dunning')
+
+        cls.group_1 = StudentGroup.objects.create(title='Ivy')
+        cls.group_1.students.set([cls.student_1, cls.student_2])
+        cls.group_2 = StudentGroup.objects.create(title='Oak')
+        cls.group_2.students.set([cls.student_3])
+
+        cls.subject_1 = StudySubject.objects.create(title='Chemistry')
+        cls.subject_2 = StudySubject.objects.create(title='History')
+
+        cls.lesson_1 = Lesson.objects.create(
+            date=datetime(2023, 3, 6, 10),
+            teacher=cls.teacher_1,
+            study_subject=cls.subject_1,
+            student_group=cls.group_1,
+            status=True,
+        )
+        cls.lesson_1.missing_students.set([cls.student_1])
+
+        cls.lesson_2 = Lesson.objects.create(
+            date=datetime(2023, 3, 14, 10),
+            teacher=cls.teacher_1,
+            study_subject=cls.subject_1,
+            student_group=cls.group_1,
+            status=True,
+        )
+        cls.lesson_2.missing_students.set([cls.student_1, cls.student_2])
+
+        cls.lesson_3 = Lesson.objects.create(
+            date=datetime(2023, 3, 15, 10),
+            teacher=cls.teacher_2,
+            study_subject=cls.subject_2,
+            student_group=cls.group_2,
+            status=True,
+        )
+
+        # Незавершенные занятия в показатели не входят
+        Lesson.objects.create(
+            date=datetime(2023, 3, 16, 10),
+            teacher=cls.teacher_1,
+            study_subject=cls.subject_1,
+            student_group=cls.group_1,
+        )
+
+    def test_students_by_month(self):
+        url = reverse('analytics-students')
+
+        # Без фильтров показатели читаются из сводки посещаемости: сводка и названия
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual('month', response.data['period'])
+        self.assertEqual([
+            {'period': date(2023, 3, 1), 'id': self.student_1.id, 'name': 'Joe Doe',
+             'expected': 2, 'absences': 2, 'absence_rate': 1.0},
+            {'period': date(2023, 3, 1), 'id': self.student_2.id, 'name': 'Sadie Dunhil',
+             'expected': 2, 'absences': 1, 'absence_rate': 0.5},
+            {'period': date(2023, 3, 1), 'id': self.student_3.id, 'name': 'Harry Dunning',
+             'expected': 1, 'absences': 0, 'absence_rate': 0.0},
+        ], response.data['results'])
+
+    def test_groups_by_week(self):
+        url = reverse('analytics-groups')
+        response = self.client.get(url, {'period': 'week'})
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([
+            (date(2023, 3, 6), self.group_1.id, 2, 1, 0.5),
+            (date(2023, 3, 13), self.group_1.id, 2, 2, 1.0),
+            (date(2023, 3, 13), self.group_2.id, 1, 0, 0.0),
+        ], [
+            (row['period'], row['id'], row['expected'], row['absences'], row['absence_rate'])
+            for row in response.data['results']
+        ])
+
+    def test_subjects_and_teachers(self):
+        subjects = self.client.get(reverse('analytics-subjects')).data['results']
+        self.assertEqual([
+            ('Chemistry', 4, 3, 0.75),
+            ('History', 1, 0, 0.0),
+        ], [(row['name'], row['expected'], row['absences'], row['absence_rate']) for row in subjects])
+
+        teachers = self.client.get(reverse('analytics-teachers')).data['results']
+        self.assertEqual([
+            ('Jake Epping', 4, 3),
+            ('Bill Turcotte', 1, 0),
+        ], [(row['name'], row['expected'], row['absences']) for row in teachers])
+
+    def test_filters(self):
+        url = reverse('analytics-students')
+        response = self.client.get(url, {'date_after': '2023-03-13', 'student_group': self.group_1.id})
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([
+            (self.student_1.id, 1, 1),
+            (self.student_2.id, 1, 1),
+        ], [(row['id'], row['expected'], row['absences']) for row in response.data['results']])
+
+    def test_summary_matches_lessons(self):
+        for dimension in ('students', 'subjects'):
+            for period in analytics.PERIODS:
+                self.assertEqual(
+                    analytics.attendance(Lesson.objects.all(), dimension, period),
+                    analytics.attendance_from_summary(dimension, period),
+                )
+                self.assertEqual(
+                    analytics.attendance(Lesson.objects.filter(study_subject=self.subject_1), dimension, period),
+                    analytics.attendance_from_summary(dimension, period, self.subject_1),
+                )
+
+    def test_invalid_period(self):
+        response = self.client.get(reverse('analytics-students'), {'period': 'year'})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_invalid_filter(self):
+        response = self.client.get(reverse('analytics-groups'), {'date_after': 'yesterday'})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from lessons.models import StudySubject, Lesson
+from people.models import Student, Teacher, StudentGroup
+
+
+class TestLessonExport(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher_1 = Teacher.objects.create(full_name='Jake Epping', degree='Bachelor')
+
+        cls.student_1 = Student.objects.create(full_name='Joe Doe')
+        cls.student_2 = Student.objects.create(full_name='Sadie Dunhil')
+
+        cls.group_1 = StudentGroup.objects.create(title='Ivy')
+        cls.group_1.students.set([cls.student_1, cls.student_2])
+
+        cls.subject_1 = StudySubject.objects.create(title='Chemistry')
+        cls.subject_2 = StudySubject.objects.create(title='History')
+
+        cls.lesson_1 = Lesson.objects.create(
+            date=datetime(2023, 4, 1, 10),
+            teacher=cls.teacher_1,
+            study_subject=cls.subject_1,
+            student_group=cls.group_1,
+            status=True,
+        )
+        cls.lesson_1.missing_students.set([cls.student_1, cls.student_2])
+
+        cls.lesson_2 = Lesson.objects.create(
+            date=datetime(2023, 5, 1, 10),
+            study_subject=cls.subject_2,
+        )
+
+    @staticmethod
+    def read(response) -> str:
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_csv(self):
+        url = reverse('lesson-export')
+        response = self.client.get(url)
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+
+        self.assertEqual(2, len(rows))
+        self.assertEqual({
+            'id': str(self.lesson_1.id),
+            'date': '01/04/2023 10:00:00',
+            'study_subject': 'Chemistry',
+            'teacher': 'Jake Epping',
+            'student_group': 'Ivy',
+            'status': 'true',
+            'missing_student_ids': f'{self.student_1.id};{self.student_2.id}',
+            'missing_student_names': 'Joe Doe;Sadie Dunhil',
+        }, rows[0])
+        self.assertEqual('', rows[1]['missing_student_ids'])
+
+    def test_export_ndjson_with_filters(self):
+        url = reverse('lesson-export')
+        response = self.client.get(url, {'export_format': 'ndjson', 'teacher': self.teacher_1.id,
+                                         'date_after': '2023-03-01', 'date_before': '2023-04-30'})
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        lines = [json.loads(line) for line in self.read(response).splitlines()]
+
+        self.assertEqual([self.lesson_1.id], [line['id'] for line in lines])
+        self.assertEqual(['Joe Doe', 'Sadie Dunhil'], [item['full_name'] for item in lines[0]['missing_students']])
+
+    def test_export_date_range_excludes(self):
+        url = reverse('lesson-export')
+        response = self.client.get(url, {'export_format': 'ndjson', 'date_after': '2023-06-01'})
+
+        self.assertEqual('', self.read(response))
+
+    def test_export_invalid_format(self):
+        url = reverse('lesson-export')
+        response = self.client.get(url, {'export_format': 'xml'})
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_export_invalid_filter(self):
+        url = reverse('lesson-export')
+        response = self.client.get(url, {'date_after': 'yesterday'})
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
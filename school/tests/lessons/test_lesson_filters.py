@@ -0,0 +1,77 @@
+from datetime import datetime
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from lessons.models import StudySubject, Lesson
+from people.models import Student, Teacher, StudentGroup
+
+
+class TestLessonFilters(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher_1 = Teacher.objects.create(full_name='Jake Epping', degree='Bachelor')
+        cls.teacher_2 = Teacher.objects.create(full_name='Bill Turcotte', degree='Master')
+
+        cls.student_1 = Student.objects.create(full_name='Joe Doe')
+        cls.student_2 = Student.objects.create(full_name='Sadie Dunhil')
+
+        cls.group_1 = StudentGroup.objects.create(title='Ivy')
+        cls.group_1.students.set([cls.student_1])
+        cls.group_2 = StudentGroup.objects.create(title='Oak')
+        cls.group_2.students.set([cls.student_1, cls.student_2])
+        cls.group_3 = StudentGroup.objects.create(title='Elm')
+
+        cls.subject_1 = StudySubject.objects.create(title='Chemistry')
+        cls.subject_2 = StudySubject.objects.create(title='History')
+
+        cls.lesson_1 = Lesson.objects.create(date=datetime(2023, 3, 1, 10), teacher=cls.teacher_1,
+                                             study_subject=cls.subject_1, student_group=cls.group_1, status=True)
+        cls.lesson_1.missing_students.set([cls.student_1])
+        cls.lesson_2 = Lesson.objects.create(date=datetime(2023, 3, 10, 10), teacher=cls.teacher_2,
+                                             study_subject=cls.subject_2, student_group=cls.group_2)
+        cls.lesson_3 = Lesson.objects.create(date=datetime(2023, 3, 20, 10), study_subject=cls.subject_1,
+                                             student_group=cls.group_3)
+
+    def get_ids(self, params: dict) -> list:
+        response = self.client.get(reverse('lesson-list'), params)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        return [item['id'] for item in response.data['results']]
+
+    def test_date_range(self):
+        self.assertEqual([self.lesson_2.id, self.lesson_3.id], self.get_ids({'date_after': '2023-03-05'}))
+        self.assertEqual([self.lesson_1.id, self.lesson_2.id], self.get_ids({'date_before': '2023-03-15'}))
+        self.assertEqual([self.lesson_2.id], self.get_ids({'date_after': '2023-03-05', 'date_before': '2023-03-15'}))
+
+    def test_in_filters(self):
+        self.assertEqual([self.lesson_1.id, self.lesson_2.id],
+                         self.get_ids({'teacher__in': f'{self.teacher_1.id},{self.teacher_2.id}'}))
+        self.assertEqual([self.lesson_2.id, self.lesson_3.id],
+                         self.get_ids({'student_group__in': f'{self.group_2.id},{self.group_3.id}'}))
+        self.assertEqual([self.lesson_1.id, self.lesson_3.id],
+                         self.get_ids({'study_subject__in': self.subject_1.id}))
+
+    def test_has_missing_students(self):
+        self.assertEqual([self.lesson_1.id], self.get_ids({'has_missing_students': 'true'}))
+        self.assertEqual([self.lesson_2.id, self.lesson_3.id], self.get_ids({'has_missing_students': 'false'}))
+
+    def test_student(self):
+        self.assertEqual([self.lesson_1.id, self.lesson_2.id], self.get_ids({'student': self.student_1.id}))
+        self.assertEqual([self.lesson_2.id], self.get_ids({'student': self.student_2.id}))
+
+    def test_filters_compile_to_single_query(self):
+        params = {
+            'date_after': '2023-03-01',
+            'teacher__in': f'{self.teacher_1.id},{self.teacher_2.id}',
+            'has_missing_students': 'false',
+            'student': self.student_1.id,
+        }
+        # Страница занятий и отсутствующие студенты
+        with self.assertNumQueries(2):
+            self.assertEqual([self.lesson_2.id], self.get_ids(params))
+
+    def test_invalid_values(self):
+        for params in ({'teacher__in': '1,first'}, {'date_after': 'yesterday'}, {'student': 'Joe'}):
+            response = self.client.get(reverse('lesson-list'), params)
+            self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code, params)
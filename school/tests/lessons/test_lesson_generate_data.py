@@ -0,0 +1,32 @@
+from datetime import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from lessons import summary
+from lessons.models import Attendance, AttendanceSummary, Lesson, StudySubject
+from people.models import Student, StudentGroup, Teacher
+
+
+class TestGenerateData(TransactionTestCase):
+    # TRUNCATE на PostgreSQL нельзя выполнить в транзакции с отложенными проверками внешних ключей
+    def test_clear(self):
+        student = Student.objects.create(full_name='Joe Doe')
+        group = StudentGroup.objects.create(title='Ivy')
+        group.students.set([student])
+        lesson = Lesson.objects.create(date=datetime(2023, 3, 6, 10), status=True, student_group=group,
+                                       study_subject=StudySubject.objects.create(title='Chemistry'))
+        lesson.missing_students.set([student])
+
+        call_command('generate_data', '--clear', students=5, groups=1, teachers=1, subjects=1, lessons=10,
+                     stdout=StringIO())
+
+        self.assertEqual(
+            (5, 1, 1, 1, 10),
+            tuple(model.objects.count() for model in (Student, StudentGroup, Teacher, StudySubject, Lesson))
+        )
+        self.assertFalse(Student.objects.filter(full_name='Joe Doe').exists())
+        self.assertFalse(Attendance.objects.exclude(lesson_id__in=Lesson.objects.values('id')).exists())
+        self.assertFalse(AttendanceSummary.objects.exclude(student_id__in=Student.objects.values('id')).exists())
+        self.assertEqual([], summary.check())
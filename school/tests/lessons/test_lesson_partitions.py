@@ -0,0 +1,165 @@
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+from datetime import datetime, time
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from lessons import partitions, summary
+from lessons.models import Attendance, AttendanceSummary, Lesson, LessonArchive, StudySubject
+from people.models import Student, StudentGroup
+from school.tests.utils import explain
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Секционирование поддерживается только на PostgreSQL')
+@override_settings(LESSON_PARTITIONING=True, API_CACHE_TIMEOUT=0)
+class TestLessonPartitions(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student_1 = Student.objects.create(full_name='Joe Doe')
+        cls.student_2 = Student.objects.create(full_name='Sadie Dunhil')
+        cls.group_1 = StudentGroup.objects.create(title='Ivy')
+        cls.group_1.students.set([cls.student_1])
+        cls.subject_1 = StudySubject.objects.create(title='Chemistry')
+
+        cls.current = partitions.month_start(timezone.now())
+        cls.old_month = partitions.add_months(cls.current, -30)
+
+    def setUp(self):
+        if not partitions.is_partitioned(connection):
+            partitions.partition(connection)
+        self.old_lesson, self.recent_lesson = (
+            Lesson.objects.create(date=date, study_subject=self.subject_1, student_group=self.group_1, status=True)
+            for date in (datetime.combine(self.old_month, time(10)), datetime.combine(self.current, time(10)))
+        )
+        self.old_lesson.missing_students.add(self.student_1, through_defaults={'reason': 'Болезнь'})
+        self.recent_lesson.missing_students.add(self.student_1)
+        # Изменение таблицы занятий невозможно при отложенных проверках внешних ключей в той же транзакции
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def count_rows(self, table: str) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {table}')
+            return cursor.fetchone()[0]
+
+    def run_command(self, *args):
+        call_command('lesson_partitions', *args, stdout=StringIO())
+
+    def test_date_filter_prunes_partitions(self):
+        plan = explain(Lesson.objects.filter(
+            date__gte=self.current, date__lt=partitions.add_months(self.current, 1)
+        ).order_by('date', 'id'))
+
+        self.assertIn(partitions.get_partition_name(self.current), plan)
+        self.assertNotIn(partitions.get_partition_name(partitions.add_months(self.current, 1)), plan)
+        self.assertNotIn(partitions.DEFAULT_PARTITION, plan)
+
+    def test_list_filters(self):
+        response = self.client.get(reverse('lesson-list'), {
+            'date_after': self.current.strftime('%Y-%m-%d'), 'has_missing_students': 'true',
+        })
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([self.recent_lesson.id], [item['id'] for item in response.data['results']])
+
+    def test_create_partition_moves_rows_from_default(self):
+        self.assertEqual(1, self.count_rows(partitions.DEFAULT_PARTITION))
+
+        self.assertTrue(partitions.create_partition(connection, self.old_month))
+        self.assertFalse(partitions.create_partition(connection, self.old_month))
+
+        self.assertEqual(0, self.count_rows(partitions.DEFAULT_PARTITION))
+        self.assertEqual(1, self.count_rows(partitions.get_partition_name(self.old_month)))
+        self.assertEqual(self.old_lesson, Lesson.objects.get(pk=self.old_lesson.pk))
+
+    def test_archive_and_restore(self):
+        partitions.create_partition(connection, self.old_month)
+        name = partitions.get_partition_name(self.old_month)
+        summary_rows = AttendanceSummary.objects.filter(period_start__lt=partitions.add_months(self.old_month, 1))
+        self.assertEqual(2, summary_rows.count())
+
+        self.run_command('archive', '--retention-months', '12', '--output-dir', self.directory)
+
+        path = os.path.join(self.directory, f'{name}.tar.gz')
+        self.assertTrue(os.path.isfile(path))
+        self.assertEqual(path, LessonArchive.objects.get(month=self.old_month).path)
+        self.assertEqual([self.recent_lesson.id], list(Lesson.objects.values_list('id', flat=True)))
+        self.assertFalse(Attendance.objects.filter(lesson_id=self.old_lesson.id).exists())
+        # Сводка за выгруженный месяц сохраняется и не пересчитывается при изменении состава группы
+        self.group_1.students.add(self.student_2)
+        self.assertEqual(2, summary_rows.count())
+        self.assertEqual([], summary.check())
+
+        self.run_command('restore', name)
+
+        self.assertFalse(LessonArchive.objects.exists())
+        self.assertEqual(self.old_lesson, Lesson.objects.get(pk=self.old_lesson.pk))
+        self.assertEqual('Болезнь', Attendance.objects.get(lesson=self.old_lesson).reason)
+        self.assertIn(name, [partition.name for partition in partitions.get_partitions(connection)])
+
+    def test_restore_archive_with_removed_column(self):
+        partitions.create_partition(connection, self.old_month)
+        name = partitions.get_partition_name(self.old_month)
+        self.run_command('archive', '--retention-months', '12', '--output-dir', self.directory)
+
+        # Архив, выгруженный до удаления столбца updated_at
+        path = os.path.join(self.directory, f'{name}.tar.gz')
+        lessons_member = partitions.ARCHIVE_MEMBERS[0]
+        with tarfile.open(path, 'r:gz') as tar:
+            members = {member.name: tar.extractfile(member).read() for member in tar.getmembers()}
+        lines = members[lessons_member].decode().splitlines()
+        members[lessons_member] = '\n'.join(
+            [f'{lines[0]},updated_at', *(f'{line},2023-01-01 00:00:00+00' for line in lines[1:])]
+        ).encode() + b'\n'
+        with tarfile.open(path, 'w:gz') as tar:
+            for member, content in members.items():
+                info = tarfile.TarInfo(member)
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+
+        self.run_command('restore', name)
+
+        self.assertEqual(self.old_lesson, Lesson.objects.get(pk=self.old_lesson.pk))
+        self.assertEqual('Болезнь', Attendance.objects.get(lesson=self.old_lesson).reason)
+
+    def test_detach_and_attach(self):
+        partitions.create_partition(connection, self.old_month)
+        name = partitions.get_partition_name(self.old_month)
+
+        self.run_command('archive', '--retention-months', '12', '--detach-only')
+
+        self.assertEqual([name], partitions.get_detached(connection))
+        self.assertEqual('', LessonArchive.objects.get(month=self.old_month).path)
+        self.assertFalse(Lesson.objects.filter(pk=self.old_lesson.pk).exists())
+
+        self.run_command('restore', name)
+
+        self.assertEqual([], partitions.get_detached(connection))
+        self.assertEqual(2, Lesson.objects.count())
+        self.assertEqual(2, Attendance.objects.count())
+
+    def test_retention_keeps_recent_partitions(self):
+        self.run_command('archive', '--output-dir', self.directory)
+
+        self.assertEqual([], os.listdir(self.directory))
+        self.assertEqual(2, Lesson.objects.count())
+
+    def test_unpartition(self):
+        partitions.unpartition(connection)
+
+        self.assertFalse(partitions.is_partitioned(connection))
+        self.assertEqual(2, Lesson.objects.count())
+        self.assertEqual(status.HTTP_200_OK, self.client.get(reverse('lesson-list')).status_code)
@@ -0,0 +1,207 @@
+import json
+from datetime import date, datetime
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from lessons import summary
+from lessons.models import AttendanceSummary, StudySubject, Lesson
+from people.models import Student, StudentGroup
+
+
+class TestLessonSummary(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student_1 = Student.objects.create(full_name='Joe Doe')
+        cls.student_2 = Student.objects.create(full_name='Sadie Dunhil')
+        cls.student_3 = Student.objects.create(full_name='Harry Dunning')
+
+        cls.group_1 = StudentGroup.objects.create(title='Ivy')
+        cls.group_1.students.set([cls.student_1, cls.student_2])
+        cls.group_2 = StudentGroup.objects.create(title='Oak')
+        cls.group_2.students.set([cls.student_3])
+
+        cls.subject_1 = StudySubject.objects.create(title='Chemistry')
+        cls.subject_2 = StudySubject.objects.create(title='History')
+
+    def create_lesson(self, **kwargs) -> Lesson:
+        return Lesson.objects.create(**{
+            'date': datetime(2023, 3, 6, 10),
+            'study_subject': self.subject_1,
+            'student_group': self.group_1,
+            'status': True,
+            **kwargs,
+        })
+
+    def get_row(self, student: Student, period: str = 'month', period_start: date = date(2023, 3, 1),
+                subject: StudySubject = None) -> tuple:
+        row = AttendanceSummary.objects.filter(
+            student=student, study_subject=subject or self.subject_1, period=period, period_start=period_start
+        ).values_list('expected', 'absences').first()
+        return row or (0, 0)
+
+    def assertConsistent(self):
+        self.assertEqual([], summary.check())
+
+    def test_lesson_changes(self):
+        lesson = self.create_lesson()
+        lesson.missing_students.set([self.student_1])
+        self.assertEqual((1, 1), self.get_row(self.student_1))
+        self.assertEqual((1, 0), self.get_row(self.student_2, 'week', date(2023, 3, 6)))
+
+        lesson.date = datetime(2023, 4, 3, 10)
+        lesson.save()
+        self.assertEqual((0, 0), self.get_row(self.student_1))
+        self.assertEqual((1, 1), self.get_row(self.student_1, period_start=date(2023, 4, 1)))
+
+        lesson.status = False
+        lesson.save()
+        self.assertFalse(AttendanceSummary.objects.exists())
+
+        lesson.status = True
+        lesson.study_subject = self.subject_2
+        lesson.save()
+        self.assertEqual((1, 1), self.get_row(self.student_1, period_start=date(2023, 4, 1), subject=self.subject_2))
+        self.assertConsistent()
+
+        lesson.delete()
+        self.assertFalse(AttendanceSummary.objects.exists())
+
+    def test_missing_students_changes(self):
+        lesson_1 = self.create_lesson()
+        lesson_2 = self.create_lesson(date=datetime(2023, 3, 7, 10))
+
+        self.student_2.lesson_set.add(lesson_1, lesson_2)
+        self.assertEqual((2, 2), self.get_row(self.student_2))
+
+        self.student_2.lesson_set.remove(lesson_1)
+        self.assertEqual((2, 1), self.get_row(self.student_2))
+
+        self.student_2.lesson_set.clear()
+        self.assertEqual((2, 0), self.get_row(self.student_2))
+        self.assertConsistent()
+
+    def test_group_changes(self):
+        lesson = self.create_lesson()
+        lesson.missing_students.set([self.student_1])
+
+        lesson.student_group = self.group_2
+        lesson.save()
+        self.assertEqual((1, 0), self.get_row(self.student_3))
+        self.assertConsistent()
+
+        self.group_2.students.add(self.student_2)
+        self.assertEqual((1, 0), self.get_row(self.student_2))
+
+        self.student_3.studentgroup_set.clear()
+        self.assertEqual((0, 0), self.get_row(self.student_3))
+        self.assertConsistent()
+
+        self.group_2.students.clear()
+        self.assertFalse(AttendanceSummary.objects.filter(expected__gt=0).exists())
+        self.assertConsistent()
+
+        self.group_2.students.set([self.student_3])
+        StudentGroup.objects.get(id=self.group_2.id).delete()
+        self.assertConsistent()
+
+    def test_changes_are_applied_as_deltas(self):
+        # Строка уже записана другой транзакцией: изменения прибавляются к ней, а не заменяют ее пересчетом
+        AttendanceSummary.objects.create(student=self.student_1, study_subject=self.subject_1, period='month',
+                                         period_start=date(2023, 3, 1), expected=5, absences=2)
+
+        lesson = self.create_lesson()
+        self.assertEqual((6, 2), self.get_row(self.student_1))
+
+        lesson.missing_students.add(self.student_1)
+        self.assertEqual((6, 3), self.get_row(self.student_1))
+
+        lesson.missing_students.remove(self.student_1, self.student_2)
+        self.assertEqual((6, 2), self.get_row(self.student_1))
+
+        lesson.delete()
+        self.assertEqual((5, 2), self.get_row(self.student_1))
+        self.assertEqual((0, 0), self.get_row(self.student_1, 'week', date(2023, 3, 6)))
+
+    def test_removed_rows(self):
+        lesson = self.create_lesson()
+        lesson.missing_students.set([self.student_1])
+        self.create_lesson(study_subject=self.subject_2)
+
+        self.student_1.delete()
+        self.assertConsistent()
+
+        self.subject_1.delete()
+        self.assertFalse(AttendanceSummary.objects.filter(study_subject_id=lesson.study_subject_id).exists())
+        self.assertConsistent()
+
+    def test_bulk_create(self):
+        lesson = {
+            'date': '06/03/2023 10:00:00',
+            'study_subject': self.subject_1.id,
+            'student_group': self.group_1.id,
+            'status': True,
+            'missing_students': [self.student_1.id],
+        }
+        response = self.client.post(reverse('lesson-bulk'), data=json.dumps([lesson] * 3),
+                                    content_type='application/json')
+
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertEqual((3, 3), self.get_row(self.student_1))
+        self.assertConsistent()
+
+        data = [{**lesson, 'id': item['id'], 'missing_students': [self.student_2.id]} for item in response.json()]
+        response = self.client.put(reverse('lesson-bulk'), data=json.dumps(data), content_type='application/json')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual((3, 0), self.get_row(self.student_1))
+        self.assertEqual((3, 3), self.get_row(self.student_2))
+        self.assertConsistent()
+
+    def test_attendance_actions(self):
+        lesson = self.create_lesson()
+        data = json.dumps({'student_ids': [self.student_1.id, self.student_2.id]})
+
+        for _ in range(2):
+            response = self.client.post(reverse('lesson-mark-absent', args=[lesson.id]), data=data,
+                                        content_type='application/json')
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            self.assertEqual((1, 1), self.get_row(self.student_2))
+        self.assertConsistent()
+
+        response = self.client.patch(reverse('lesson-detail', args=[lesson.id]), data=json.dumps({
+            'date': '03/04/2023 10:00:00', 'missing_students': [self.student_1.id],
+        }), content_type='application/json')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual((0, 0), self.get_row(self.student_1))
+        self.assertEqual((1, 1), self.get_row(self.student_1, period_start=date(2023, 4, 1)))
+        self.assertEqual((1, 0), self.get_row(self.student_2, period_start=date(2023, 4, 1)))
+        self.assertConsistent()
+
+        response = self.client.post(reverse('lesson-mark-present', args=[lesson.id]), data=data,
+                                    content_type='application/json')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual((1, 0), self.get_row(self.student_1, period_start=date(2023, 4, 1)))
+        self.assertConsistent()
+
+    def test_command(self):
+        lesson = self.create_lesson()
+        lesson.missing_students.set([self.student_1])
+        AttendanceSummary.objects.filter(student=self.student_1).update(absences=5)
+        AttendanceSummary.objects.filter(student=self.student_2).delete()
+
+        output = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('attendance_summary', 'check', stdout=output)
+        self.assertIn('по занятиям', output.getvalue())
+
+        call_command('attendance_summary', 'rebuild', stdout=StringIO())
+        self.assertEqual((1, 1), self.get_row(self.student_1))
+        output = StringIO()
+        call_command('attendance_summary', 'check', stdout=output)
+        self.assertIn('совпадает', output.getvalue())
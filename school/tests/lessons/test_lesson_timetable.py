@@ -0,0 +1,88 @@
+from datetime import datetime
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from lessons.models import StudySubject, Lesson
+from people.models import Teacher, StudentGroup
+
+
+class TestLessonTimetable(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher_1 = Teacher.objects.create(full_name='Jake Epping', degree='Bachelor')
+        cls.group_1 = StudentGroup.objects.create(title='Ivy')
+        cls.group_2 = StudentGroup.objects.create(title='Oak')
+        cls.subject_1 = StudySubject.objects.create(title='Chemistry')
+
+        cls.lesson_1 = Lesson.objects.create(date=datetime(2023, 3, 6, 10), teacher=cls.teacher_1,
+                                             study_subject=cls.subject_1, student_group=cls.group_1, status=True)
+        cls.lesson_2 = Lesson.objects.create(date=datetime(2023, 3, 6, 12, 30), study_subject=cls.subject_1,
+                                             student_group=cls.group_1)
+        cls.lesson_3 = Lesson.objects.create(date=datetime(2023, 3, 14, 9), teacher=cls.teacher_1,
+                                             study_subject=cls.subject_1, student_group=cls.group_2)
+        cls.lesson_4 = Lesson.objects.create(date=datetime(2023, 3, 20, 9), teacher=cls.teacher_1,
+                                             study_subject=cls.subject_1, student_group=cls.group_1)
+
+    def test_group_timetable(self):
+        url = reverse('timetable-list')
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'group': self.group_1.id, 'date_from': '2023-03-06',
+                                             'date_to': '2023-03-19'})
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(self.group_1.id, response.data['group'])
+        self.assertEqual([{
+            'date': '2023-03-06',
+            'lessons': [
+                {'id': self.lesson_1.id, 'time': '10:00', 'study_subject': 'Chemistry', 'teacher': 'Jake Epping',
+                 'status': True},
+                {'id': self.lesson_2.id, 'time': '12:30', 'study_subject': 'Chemistry', 'teacher': None,
+                 'status': False},
+            ],
+        }], response.data['days'])
+
+    def test_teacher_timetable(self):
+        url = reverse('timetable-list')
+        response = self.client.get(url, {'teacher': self.teacher_1.id, 'date_from': '2023-03-07',
+                                         'date_to': '2023-03-20'})
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(
+            [('2023-03-14', self.lesson_3.id, 'Oak'), ('2023-03-20', self.lesson_4.id, 'Ivy')],
+            [(day['date'], lesson['id'], lesson['student_group'])
+             for day in response.data['days'] for lesson in day['lessons']]
+        )
+
+    def test_current_week_by_default(self):
+        lesson = Lesson.objects.create(date=timezone.now(), study_subject=self.subject_1, student_group=self.group_2)
+        response = self.client.get(reverse('timetable-list'), {'group': self.group_2.id})
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([lesson.id], [item['id'] for item in response.data['days'][0]['lessons']])
+
+    def test_unknown_entity(self):
+        group = StudentGroup.objects.create(title='Elm')
+        teacher = Teacher.objects.create(full_name='Bill Turcotte')
+        params = [{'group': group.id}, {'teacher': teacher.id}]
+        group.delete()
+        teacher.delete()
+
+        for params in params:
+            response = self.client.get(reverse('timetable-list'), params)
+            self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code, params)
+
+    def test_invalid_params(self):
+        url = reverse('timetable-list')
+        for params in (
+            {},
+            {'group': self.group_1.id, 'teacher': self.teacher_1.id},
+            {'group': self.group_1.id, 'date_from': '2023-03-06', 'date_to': '2023-03-05'},
+            {'group': self.group_1.id, 'date_from': '2023-01-01', 'date_to': '2023-06-30'},
+            {'teacher': 'first'},
+        ):
+            response = self.client.get(url, params)
+            self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code, params)
@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from lessons.models import Attendance, Lesson, StudySubject
+from people.models import Student, StudentGroup
+
+
+class TestStudentAbsences(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student_1 = Student.objects.create(full_name='Joe Doe')
+        cls.student_2 = Student.objects.create(full_name='Sadie Dunhil')
+        cls.group_1 = StudentGroup.objects.create(title='Ivy')
+        cls.group_1.students.set([cls.student_1, cls.student_2])
+        cls.subject_1 = StudySubject.objects.create(title='Chemistry')
+        cls.subject_2 = StudySubject.objects.create(title='History')
+
+        now = timezone.now().replace(microsecond=0)
+        cls.lessons = [
+            Lesson.objects.create(
+                date=now - timedelta(days=days),
+                study_subject=subject,
+                student_group=cls.group_1,
+                status=True,
+            )
+            for days, subject in ((3, cls.subject_1), (2, cls.subject_2), (1, cls.subject_1))
+        ]
+        for lesson in cls.lessons:
+            lesson.missing_students.add(cls.student_1)
+        cls.lessons[0].missing_students.add(cls.student_2, through_defaults={'reason': 'Болезнь'})
+
+    def test_list(self):
+        response = self.client.get(reverse('student-absences-list', args=[self.student_2.id]))
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        absence = Attendance.objects.get(student=self.student_2)
+        self.assertEqual([{
+            'lesson': self.lessons[0].id,
+            'date': self.lessons[0].date.strftime('%d/%m/%Y %H:%M:%S'),
+            'study_subject': 'Chemistry',
+            'reason': 'Болезнь',
+            'marked_at': absence.marked_at.strftime('%d/%m/%Y %H:%M:%S'),
+        }], response.data['results'])
+
+    def test_list_order_and_filters(self):
+        url = reverse('student-absences-list', args=[self.student_1.id])
+
+        response = self.client.get(url)
+        self.assertEqual([lesson.id for lesson in reversed(self.lessons)],
+                         [item['lesson'] for item in response.data['results']])
+
+        response = self.client.get(url, {'study_subject': self.subject_1.id})
+        self.assertEqual([self.lessons[2].id, self.lessons[0].id],
+                         [item['lesson'] for item in response.data['results']])
+
+        response = self.client.get(url, {'date_before': self.lessons[1].date.strftime('%Y-%m-%d %H:%M:%S')})
+        self.assertEqual([self.lessons[1].id, self.lessons[0].id],
+                         [item['lesson'] for item in response.data['results']])
+
+    def test_queries_do_not_grow(self):
+        url = reverse('student-absences-list', args=[self.student_1.id])
+
+        query_counts = []
+        for lesson in self.lessons[:2]:
+            Attendance.objects.filter(lesson=lesson, student=self.student_1).delete()
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(url)
+            query_counts.append(len(context.captured_queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_unknown_student(self):
+        for student_pk in (0, 'abc'):
+            response = self.client.get(reverse('student-absences-list', args=[student_pk]))
+
+            self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_marked_at_is_set(self):
+        self.lessons[1].missing_students.add(self.student_2)
+
+        marked_at = Attendance.objects.get(lesson=self.lessons[1], student=self.student_2).marked_at
+        self.assertIsNotNone(marked_at)
+        self.assertLessEqual(marked_at, timezone.now())
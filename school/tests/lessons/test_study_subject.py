@@ -1,4 +1,5 @@
 import json
+from datetime import timedelta
 from django.utils import timezone
 
 from django.test import TestCase
@@ -67,6 +68,46 @@ class TestStudySubject(TestCase):
         self.assertEqual(status.HTTP_200_OK, response.status_code)
         self.assertEqual(serializer_data, response.data)
 
+    def test_retrieve_queries_do_not_grow_with_lessons(self):
+        url = reverse('subject-detail', args=[self.subject_1.id])
+        with self.assertNumQueries(3):
+            self.client.get(url)
+
+        for _ in range(5):
+            lesson = Lesson.objects.create(
+                date=timezone.now(),
+                teacher=self.teacher_1,
+                study_subject=self.subject_1,
+                student_group=self.group_1,
+                status=True,
+            )
+            lesson.missing_students.set([self.student_1, self.student_2])
+
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(6, len(response.data['lesson']))
+        self.assertEqual(6, response.data['lesson_count'])
+
+    def test_retrieve_lesson_window(self):
+        lesson_2 = Lesson.objects.create(
+            date=self.lesson_1.date + timedelta(days=1),
+            study_subject=self.subject_1,
+        )
+        Lesson.objects.create(
+            date=self.lesson_1.date + timedelta(days=2),
+            study_subject=self.subject_1,
+        )
+
+        url = reverse('subject-detail', args=[self.subject_1.id])
+        response = self.client.get(url, {'lesson_limit': 1, 'lesson_offset': 1})
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(3, response.data['lesson_count'])
+        self.assertEqual(1, len(response.data['lesson']))
+        self.assertEqual(lesson_2.date.strftime('%d/%m/%Y %H:%M:%S'), response.data['lesson'][0]['date'])
+
     def test_update(self):
         self.subject_1.refresh_from_db()
         url = reverse('subject-detail', args=[self.subject_1.id])
@@ -0,0 +1,117 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+
+from people.models import Student, Teacher, StudentGroup
+
+
+class TestImportPeople(TestCase):
+    def setUp(self):
+        self.student_1 = Student.objects.create(full_name='Jake Epping')
+        self.teacher_1 = Teacher.objects.create(full_name='Sadie Dunhil', degree='Bachelor')
+        self.group_1 = StudentGroup.objects.create(title='Ivy')
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name: str, content: str) -> str:
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def import_people(self, **files) -> str:
+        stdout = StringIO()
+        call_command('import_people', stdout=stdout, batch_size=2, **files)
+        return stdout.getvalue()
+
+    def test_import(self):
+        files = {
+            'students': self.write('students.csv', 'full_name\nJake Epping\nJoe Doe\nLily Forest\n'),
+            'teachers': self.write('teachers.csv', 'full_name,degree\nSadie Dunhil,Master\nDeke Simmons,Doctor\n'),
+            'groups': self.write('groups.csv', 'title\nIvy\nOak\n'),
+            'memberships': self.write(
+                'memberships.csv', 'group,student\nIvy,Jake Epping\nIvy,Joe Doe\nOak,Ariel Moonlight\nIvy,Joe Doe\n'
+            ),
+        }
+
+        output = self.import_people(**files)
+
+        self.assertIn('memberships: загружено 4 строк', output)
+        self.assertEqual(
+            ['Ariel Moonlight', 'Jake Epping', 'Joe Doe', 'Lily Forest'],
+            list(Student.objects.order_by('full_name').values_list('full_name', flat=True))
+        )
+        self.assertEqual(
+            {'Sadie Dunhil': 'Master', 'Deke Simmons': 'Doctor'},
+            dict(Teacher.objects.values_list('full_name', 'degree'))
+        )
+        self.assertEqual(['Ivy', 'Oak'], list(StudentGroup.objects.order_by('title').values_list('title', flat=True)))
+        self.assertEqual(
+            ['Jake Epping', 'Joe Doe'],
+            list(self.group_1.students.order_by('full_name').values_list('full_name', flat=True))
+        )
+        self.assertEqual(self.student_1, self.group_1.students.get(full_name='Jake Epping'))
+
+    def test_import_is_idempotent(self):
+        memberships = self.write('memberships.csv', 'group,student\nIvy,Jake Epping\nOak,Joe Doe\n')
+
+        self.import_people(memberships=memberships)
+        self.import_people(memberships=memberships)
+
+        self.assertEqual(2, Student.objects.count())
+        self.assertEqual(2, StudentGroup.objects.count())
+        self.assertEqual(2, StudentGroup.students.through.objects.count())
+
+    def test_import_strips_values(self):
+        students = self.write('students.csv', 'full_name\n  Jake Epping \n Joe Doe\n')
+        memberships = self.write('memberships.csv', 'group,student\n Ivy , Joe Doe \n')
+
+        self.import_people(students=students, memberships=memberships)
+
+        self.assertEqual(['Jake Epping', 'Joe Doe'], list(Student.objects.order_by('full_name').values_list(
+            'full_name', flat=True
+        )))
+        self.assertEqual(['Joe Doe'], list(self.group_1.students.values_list('full_name', flat=True)))
+
+    def test_import_empty_degree(self):
+        teachers = self.write('teachers.csv', 'full_name,degree\nSadie Dunhil,\nDeke Simmons, \n')
+
+        self.import_people(teachers=teachers)
+
+        self.assertEqual(
+            {'Sadie Dunhil': '', 'Deke Simmons': ''}, dict(Teacher.objects.values_list('full_name', 'degree'))
+        )
+
+    def test_import_skips_blank_lines(self):
+        students = self.write('students.csv', 'full_name\nJoe Doe\n\n  \n')
+        memberships = self.write('memberships.csv', 'group,student\nIvy,Joe Doe\n\n')
+
+        self.import_people(students=students, memberships=memberships)
+
+        self.assertEqual(2, Student.objects.count())
+        self.assertEqual(['Joe Doe'], list(self.group_1.students.values_list('full_name', flat=True)))
+
+    def test_import_empty_required_value(self):
+        for content in ('group,student\nIvy,Joe Doe\nOak, \n', 'group,student\nIvy,Joe Doe\n,Joe Doe\n'):
+            memberships = self.write('memberships.csv', content)
+
+            with self.assertRaisesMessage(CommandError, 'некорректная строка'):
+                self.import_people(memberships=memberships)
+            self.assertEqual(1, Student.objects.count())
+            self.assertEqual(1, StudentGroup.objects.count())
+            self.assertFalse(self.group_1.students.exists())
+
+    def test_import_invalid_header(self):
+        students = self.write('students.csv', 'name\nJoe Doe\n')
+
+        with self.assertRaises(CommandError):
+            self.import_people(students=students)
+        self.assertEqual(1, Student.objects.count())
+
+    def test_import_without_files(self):
+        with self.assertRaises(CommandError):
+            self.import_people()
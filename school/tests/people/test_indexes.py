@@ -0,0 +1,20 @@
+from django.test import TestCase
+
+from people.models import Student, Teacher
+from school.tests.utils import explain
+
+
+class TestPersonIndexes(TestCase):
+    """Планы запросов проверяются на пустых таблицах, чтобы не сдвигать последовательности идентификаторов"""
+
+    def test_student_full_name_index(self):
+        plan = explain(Student.objects.filter(full_name='Joe Doe'))
+        self.assertIn('people_student_full_name', plan)
+
+    def test_student_full_name_ordering_index(self):
+        plan = explain(Student.objects.order_by('full_name'))
+        self.assertIn('people_student_full_name', plan)
+
+    def test_teacher_full_name_index(self):
+        plan = explain(Teacher.objects.filter(full_name='Jake Epping'))
+        self.assertIn('people_teacher_full_name', plan)
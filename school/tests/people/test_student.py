@@ -38,7 +38,50 @@ class TestStudent(TestCase):
         serializer_data = StudentSerializer([self.student_1, self.student_2], many=True).data
 
         self.assertEqual(status.HTTP_200_OK, response.status_code)
-        self.assertEqual(serializer_data, response.data)
+        self.assertEqual(serializer_data, response.data['results'])
+        self.assertEqual(2, response.data['count'])
+
+    def test_get_list_page_number(self):
+        student_3 = Student.objects.create(full_name='Joe Doe')
+
+        url = reverse('student-list')
+        response = self.client.get(url, {'page': 2, 'page_size': 2})
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(3, response.data['count'])
+        self.assertEqual([student_3.id], [item['id'] for item in response.data['results']])
+        self.assertIsNone(response.data['next'])
+        self.assertIn('page=1', response.data['previous'])
+
+    def test_get_list_limit_offset(self):
+        url = reverse('student-list')
+        response = self.client.get(url, {'limit': 1, 'offset': 1})
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([self.student_2.id], [item['id'] for item in response.data['results']])
+        self.assertIsNone(response.data['next'])
+        self.assertIn('limit=1', response.data['previous'])
+
+    def test_get_list_without_count(self):
+        url = reverse('student-list')
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'limit': 1, 'count': 'false'})
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertNotIn('count', response.data)
+        self.assertEqual([self.student_1.id], [item['id'] for item in response.data['results']])
+        self.assertIn('offset=1', response.data['next'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([self.student_2.id], [item['id'] for item in response.data['results']])
+        self.assertIsNone(response.data['next'])
+
+    def test_get_list_invalid_page(self):
+        url = reverse('student-list')
+        response = self.client.get(url, {'page': 'last'})
+
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
 
     def test_retrieve(self):
         url = reverse('student-detail', args=[self.student_1.id])
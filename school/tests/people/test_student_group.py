@@ -1,6 +1,8 @@
 import json
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 
@@ -8,6 +10,7 @@ from lessons.models import Lesson
 from people.models import StudentGroup, Student
 from people.serializers import StudentGroupSerializer, StudentGroupCreateSerializer, \
     StudentGroupDetailSerializer
+from school.tests.utils import get_writes
 
 
 class TestTeacher(TestCase):
@@ -68,6 +71,24 @@ class TestTeacher(TestCase):
         new_student = Student.objects.last()
         self.assertEqual(new_student.full_name, 'Ariel Moonlight')
 
+    def test_create_queries_do_not_grow(self):
+        url = reverse('group-list')
+
+        query_counts = []
+        for size in (2, 20):
+            data = {
+                'title': f'Group of {size}',
+                'students': [{'full_name': 'Jake Epping'}] + [{'full_name': f'New {size} {n}'} for n in range(size)]
+            }
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(url, data=json.dumps(data), content_type='application/json')
+            self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+            self.assertEqual(size + 1, len(response.data['students']))
+            query_counts.append(len(context.captured_queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+        self.assertEqual(1, Student.objects.filter(full_name='Jake Epping').count())
+
     def test_get_list(self):
         url = reverse('group-list')
         response = self.client.get(url)
@@ -75,7 +96,8 @@ class TestTeacher(TestCase):
         serializer_data = StudentGroupSerializer([self.group_1, self.group_2], many=True).data
 
         self.assertEqual(status.HTTP_200_OK, response.status_code)
-        self.assertEqual(serializer_data, response.data)
+        self.assertEqual(serializer_data, response.data['results'])
+        self.assertEqual(2, response.data['count'])
 
     def test_retrieve(self):
         url = reverse('group-detail', args=[self.group_1.id])
@@ -117,6 +139,89 @@ class TestTeacher(TestCase):
         self.assertEqual(len(response.data['students']), 1)
         self.assertEqual(response.data['students'][0]['full_name'], 'Joe Doe')
 
+    def test_update_applies_membership_difference(self):
+        through = StudentGroup.students.through
+        kept_row = through.objects.get(studentgroup=self.group_1, student=self.student_1)
+
+        url = reverse('group-detail', args=[self.group_1.id])
+        data = {
+            'title': 'Ivy',
+            'students': [
+                {'full_name': 'Jake Epping'},
+                {'full_name': 'Joe Doe'},
+                {'full_name': 'Ariel Moonlight'}]
+        }
+
+        json_data = json.dumps(data)
+        response = self.client.put(url, data=json_data, content_type='application/json')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(
+            {'Jake Epping', 'Joe Doe', 'Ariel Moonlight'},
+            {item['full_name'] for item in response.data['students']}
+        )
+        self.assertTrue(through.objects.filter(id=kept_row.id).exists())
+        self.assertFalse(through.objects.filter(studentgroup=self.group_1, student=self.student_2).exists())
+
+    def test_add_students(self):
+        through = StudentGroup.students.through
+        kept_row = through.objects.get(studentgroup=self.group_1, student=self.student_1)
+
+        url = reverse('group-add-students', args=[self.group_1.id])
+        data = {
+            'student_ids': [self.student_1.id, self.student_3.id],
+            'students': [{'full_name': 'Ariel Moonlight'}]
+        }
+
+        json_data = json.dumps(data)
+        response = self.client.post(url, data=json_data, content_type='application/json')
+
+        new_student = Student.objects.get(full_name='Ariel Moonlight')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(
+            {'id': self.group_1.id, 'added': sorted([self.student_3.id, new_student.id]), 'student_count': 4},
+            response.data
+        )
+        self.assertTrue(through.objects.filter(id=kept_row.id).exists())
+        self.assertTrue(self.group_2.students.filter(id=self.student_3.id).exists())
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(url, data=json_data, content_type='application/json')
+
+        self.assertEqual({'id': self.group_1.id, 'added': [], 'student_count': 4}, response.data)
+        self.assertEqual([], get_writes(context))
+
+    def test_add_unknown_students(self):
+        url = reverse('group-add-students', args=[self.group_1.id])
+
+        for data in ({'student_ids': [self.student_3.id, 0, 999]}, {}):
+            json_data = json.dumps(data)
+            response = self.client.post(url, data=json_data, content_type='application/json')
+
+            self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertEqual(2, self.group_1.students.count())
+
+    def test_remove_students(self):
+        url = reverse('group-remove-students', args=[self.group_1.id])
+        data = {
+            'student_ids': [self.student_1.id, self.student_3.id],
+            'students': [{'full_name': 'Sadie Dunhil'}]
+        }
+
+        json_data = json.dumps(data)
+        response = self.client.post(url, data=json_data, content_type='application/json')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(
+            {'id': self.group_1.id, 'removed': [self.student_1.id, self.student_2.id], 'student_count': 0},
+            response.data
+        )
+        self.assertEqual([self.student_3], list(self.group_2.students.all()))
+
+        response = self.client.post(url, data=json_data, content_type='application/json')
+
+        self.assertEqual({'id': self.group_1.id, 'removed': [], 'student_count': 0}, response.data)
+
     def test_update_invalid(self):
         url = reverse('group-detail', args=[self.group_1.id])
 
@@ -58,7 +58,8 @@ class TestTeacher(TestCase):
         serializer_data = TeacherSerializer([self.teacher_1, self.teacher_2], many=True).data
 
         self.assertEqual(status.HTTP_200_OK, response.status_code)
-        self.assertEqual(serializer_data, response.data)
+        self.assertEqual(serializer_data, response.data['results'])
+        self.assertEqual(2, response.data['count'])
 
     def test_retrieve(self):
         self.teacher_1.refresh_from_db()
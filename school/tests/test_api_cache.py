@@ -0,0 +1,226 @@
+import os
+import runpy
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from lessons.models import StudySubject, Lesson
+from people.models import Student, Teacher, StudentGroup
+from people.views import TeacherViewSet
+from school.cache import get_cache
+from school.replica import PIN_COOKIE
+
+
+# Тесты выполняются в одном процессе, поэтому кэша в памяти процесса достаточно. Ответы, прочитанные с реплики,
+# не кэшируются, поэтому реплика отключается и включается только в тестах чтения с нее
+@override_settings(API_CACHE_TIMEOUT=300, DATABASE_REPLICA_ALIAS=None)
+class TestApiCache(TransactionTestCase):
+    # Поколения увеличиваются после фиксации транзакции, поэтому тесты выполняются без общей транзакции
+    databases = '__all__'
+
+    def setUp(self):
+        get_cache().clear()
+
+        self.teacher_1 = Teacher.objects.create(full_name='Jake Epping', degree='Bachelor')
+        self.student_1 = Student.objects.create(full_name='Joe Doe')
+        self.student_2 = Student.objects.create(full_name='Sadie Dunhil')
+        self.group_1 = StudentGroup.objects.create(title='Ivy')
+        self.group_1.students.set([self.student_1])
+        self.subject_1 = StudySubject.objects.create(title='Chemistry')
+        self.lesson_1 = Lesson.objects.create(
+            date=timezone.now(),
+            teacher=self.teacher_1,
+            study_subject=self.subject_1,
+            student_group=self.group_1,
+        )
+
+    def test_list_hit_and_invalidation(self):
+        url = reverse('teacher-list')
+
+        self.assertEqual('MISS', self.client.get(url)['X-Cache'])
+        response = self.client.get(url)
+        self.assertEqual('HIT', response['X-Cache'])
+        self.assertEqual('Jake Epping', response.data['results'][0]['full_name'])
+
+        Teacher.objects.filter(id=self.teacher_1.id).update(full_name='James Hosty')
+        self.assertEqual('Jake Epping', self.client.get(url).data['results'][0]['full_name'])
+
+        self.teacher_1.refresh_from_db()
+        self.teacher_1.save()
+        response = self.client.get(url)
+        self.assertEqual('MISS', response['X-Cache'])
+        self.assertEqual('James Hosty', response.data['results'][0]['full_name'])
+
+    def test_query_string_is_part_of_key(self):
+        url = reverse('teacher-list')
+
+        self.client.get(url)
+        self.assertEqual('MISS', self.client.get(url, {'limit': 1})['X-Cache'])
+
+    def test_group_membership_invalidates_group(self):
+        url = reverse('group-detail', args=[self.group_1.id])
+        self.client.get(url)
+
+        self.group_1.students.add(self.student_2)
+
+        response = self.client.get(url)
+        self.assertEqual('MISS', response['X-Cache'])
+        self.assertEqual(2, len(response.data['students']))
+
+    def test_student_delete_invalidates_group_list(self):
+        url = reverse('group-list')
+        self.group_1.students.add(self.student_2)
+        self.client.get(url)
+        self.assertEqual('HIT', self.client.get(url)['X-Cache'])
+
+        self.student_2.delete()
+
+        response = self.client.get(url)
+        self.assertEqual('MISS', response['X-Cache'])
+        self.assertEqual([self.student_1.id], response.data['results'][0]['students'])
+
+    def test_related_models_invalidate_subject_detail(self):
+        url = reverse('subject-detail', args=[self.subject_1.id])
+        list_url = reverse('subject-list')
+        self.client.get(url)
+        self.client.get(list_url)
+
+        self.student_1.full_name = 'Lily Forest'
+        self.student_1.save()
+
+        self.assertEqual('MISS', self.client.get(url)['X-Cache'])
+        self.assertEqual('HIT', self.client.get(list_url)['X-Cache'])
+
+        self.lesson_1.status = True
+        self.lesson_1.save()
+        self.lesson_1.missing_students.set([self.student_1])
+
+        response = self.client.get(url)
+        self.assertEqual('MISS', response['X-Cache'])
+        self.assertEqual('Lily Forest', response.data['lesson'][0]['missing_students'][0]['full_name'])
+
+    def test_bulk_lessons_invalidate_subject_detail(self):
+        url = reverse('subject-detail', args=[self.subject_1.id])
+        self.client.get(url)
+
+        response = self.client.post(reverse('lesson-bulk'), data=[{
+            'date': '01/02/2023 10:00:00',
+            'study_subject': self.subject_1.id,
+            'status': False,
+        }], content_type='application/json')
+        self.assertEqual(201, response.status_code)
+
+        response = self.client.get(url)
+        self.assertEqual('MISS', response['X-Cache'])
+        self.assertEqual(2, response.data['lesson_count'])
+
+    def test_timetable_weeks(self):
+        url = reverse('timetable-list')
+        params = {'group': self.group_1.id, 'date_from': '2023-03-06', 'date_to': '2023-03-12'}
+        self.client.get(url, params)
+
+        # Закэшированная неделя не запрашивается повторно, недостающая выбирается одним запросом;
+        # для пустого расписания еще проверяется существование группы
+        with self.assertNumQueries(2):
+            self.client.get(url, {**params, 'date_to': '2023-03-19'})
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {**params, 'date_from': '2023-03-13', 'date_to': '2023-03-19'})
+        self.assertEqual([], response.data['days'])
+
+        Lesson.objects.create(date=datetime(2023, 3, 14, 10), study_subject=self.subject_1, student_group=self.group_1)
+        response = self.client.get(url, {**params, 'date_to': '2023-03-19'})
+        self.assertEqual(['2023-03-14'], [day['date'] for day in response.data['days']])
+
+    def test_timetable_invalidation_scope(self):
+        url = reverse('timetable-list')
+        params = {'group': self.group_1.id, 'date_from': '2023-03-06', 'date_to': '2023-03-12'}
+        lesson = Lesson.objects.create(date=datetime(2023, 3, 7, 10), teacher=self.teacher_1,
+                                       study_subject=self.subject_1, student_group=self.group_1)
+        self.client.get(url, params)
+
+        # Занятия другой недели и другой группы не сбрасывают закэшированную неделю
+        group_2 = StudentGroup.objects.create(title='Oak')
+        Lesson.objects.create(date=datetime(2023, 3, 14, 10), study_subject=self.subject_1, student_group=self.group_1)
+        Lesson.objects.create(date=datetime(2023, 3, 7, 12), study_subject=self.subject_1, student_group=group_2)
+        with self.assertNumQueries(0):
+            self.client.get(url, params)
+
+        # Имя преподавателя выводится в расписании группы
+        self.teacher_1.full_name = 'Bill Turcotte'
+        self.teacher_1.save()
+        response = self.client.get(url, params)
+        self.assertEqual(
+            ['Bill Turcotte'], [item['teacher'] for day in response.data['days'] for item in day['lessons']]
+        )
+
+        # Перенос занятия сбрасывает и прежнюю неделю
+        lesson.date = datetime(2023, 3, 15, 10)
+        lesson.save()
+        self.assertEqual([], self.client.get(url, params).data['days'])
+
+    def test_warm_api_cache(self):
+        stdout = StringIO()
+        call_command('warm_api_cache', '--details', '--host', 'testserver', stdout=stdout)
+
+        self.assertIn('Запрошено 6 адресов, добавлено в кэш 6', stdout.getvalue())
+        self.assertEqual('HIT', self.client.get(reverse('group-detail', args=[self.group_1.id]))['X-Cache'])
+        self.assertEqual('HIT', self.client.get(reverse('subject-list'))['X-Cache'])
+
+    # Реплику изображает основная база: маршрутизатор отмечает чтение с нее так же, как с настоящей реплики
+
+    @override_settings(DATABASE_REPLICA_ALIAS=DEFAULT_DB_ALIAS)
+    def test_replica_reads_are_not_cached(self):
+        url = reverse('teacher-list')
+
+        self.assertEqual('MISS', self.client.get(url)['X-Cache'])
+        response = self.client.get(url)
+        self.assertEqual('MISS', response['X-Cache'])
+        self.assertNotIn('ETag', response)
+
+        call_command('warm_api_cache', '--host', 'testserver', stdout=StringIO())
+        response = self.client.get(url)
+        self.assertEqual('HIT', response['X-Cache'])
+        self.assertIn('ETag', response)
+
+    @override_settings(DATABASE_REPLICA_ALIAS=DEFAULT_DB_ALIAS)
+    def test_pinned_read_after_write(self):
+        url = reverse('teacher-detail', args=[self.teacher_1.id])
+        response = self.client.patch(url, {'full_name': 'James Hosty'}, content_type='application/json')
+        self.assertEqual(200, response.status_code)
+        self.assertIn(PIN_COOKIE, self.client.cookies)
+
+        # Ответ отстающей реплики, сохраненный под ключом нового поколения
+        view = TeacherViewSet(basename='teacher', action='retrieve')
+        key = view.get_cache_key(RequestFactory().get(url))
+        get_cache().set(key, {**response.data, 'full_name': 'Jake Epping'}, settings.API_CACHE_TIMEOUT)
+
+        response = self.client.get(url)
+        self.assertNotIn('X-Cache', response)
+        self.assertEqual('James Hosty', response.data['full_name'])
+
+        # Без закрепления клиент читает из кэша
+        del self.client.cookies[PIN_COOKIE]
+        self.assertEqual('HIT', self.client.get(url)['X-Cache'])
+
+
+class TestApiCacheSettings(SimpleTestCase):
+    def load_settings(self, **variables) -> dict:
+        environ = {key: value for key, value in os.environ.items() if key not in ('CACHE_URL', 'API_CACHE_TIMEOUT')}
+        with mock.patch.dict(os.environ, {**environ, **variables}, clear=True):
+            return runpy.run_module('school.settings')
+
+    def test_process_local_cache(self):
+        self.assertEqual(0, self.load_settings(CACHE_URL='locmemcache://')['API_CACHE_TIMEOUT'])
+        with self.assertRaises(ImproperlyConfigured):
+            self.load_settings(CACHE_URL='locmemcache://', API_CACHE_TIMEOUT='300')
+
+    def test_shared_cache(self):
+        self.assertEqual(300, self.load_settings(CACHE_URL='filecache:///tmp/school-api-cache')['API_CACHE_TIMEOUT'])
@@ -0,0 +1,119 @@
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from lessons.models import StudySubject, Lesson
+from people.models import Student, Teacher, StudentGroup
+from school.cache import get_cache
+
+
+# Условные запросы работают при включенном кэше ответов; тестам достаточно кэша в памяти процесса.
+# Ответы, прочитанные с реплики, отдаются без ETag, поэтому реплика отключается
+@override_settings(API_CACHE_TIMEOUT=300, DATABASE_REPLICA_ALIAS=None)
+class TestConditionalGet(TransactionTestCase):
+    # Поколения моделей увеличиваются после фиксации транзакции, поэтому тесты выполняются без общей транзакции
+    databases = '__all__'
+
+    def setUp(self):
+        get_cache().clear()
+
+        self.teacher_1 = Teacher.objects.create(full_name='Jake Epping', degree='Bachelor')
+        self.student_1 = Student.objects.create(full_name='Joe Doe')
+        self.student_2 = Student.objects.create(full_name='Sadie Dunhil')
+        self.group_1 = StudentGroup.objects.create(title='Ivy')
+        self.group_1.students.set([self.student_1, self.student_2])
+        self.subject_1 = StudySubject.objects.create(title='Chemistry')
+        self.lesson_1 = Lesson.objects.create(
+            date=timezone.now(),
+            teacher=self.teacher_1,
+            study_subject=self.subject_1,
+            student_group=self.group_1,
+            status=True,
+        )
+
+    def assertNotModified(self, url: str, etag: str):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+        self.assertEqual(etag, response['ETag'])
+
+    def assertModified(self, url: str, etag: str) -> str:
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertNotEqual(etag, response['ETag'])
+        return response['ETag']
+
+    def test_detail_not_modified(self):
+        url = reverse('lesson-detail', args=[self.lesson_1.id])
+        response = self.client.get(url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertIn('Last-Modified', response)
+
+        # Версия берется из поколений моделей, запрос к базе проверяет только существование записи
+        with self.assertNumQueries(1):
+            self.assertNotModified(url, response['ETag'])
+
+        lesson = Lesson.objects.get(id=self.lesson_1.id)
+        lesson.status = False
+        lesson.save()
+        self.assertModified(url, response['ETag'])
+
+    def test_if_modified_since(self):
+        url = reverse('teacher-detail', args=[self.teacher_1.id])
+        last_modified = self.client.get(url)['Last-Modified']
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+
+    def test_list_follows_missing_students(self):
+        url = reverse('lesson-list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertNotModified(url, etag)
+
+        Lesson.objects.get(id=self.lesson_1.id).missing_students.add(self.student_1)
+        etag = self.assertModified(url, etag)
+
+        self.student_1.lesson_set.clear()
+        self.assertModified(url, etag)
+
+    def test_list_follows_filters_and_deletion(self):
+        lesson_2 = Lesson.objects.create(date=timezone.now(), study_subject=self.subject_1)
+        url = reverse('lesson-list')
+        filtered = self.client.get(url, {'teacher': self.teacher_1.id})['ETag']
+        etag = self.client.get(url)['ETag']
+        self.assertNotEqual(filtered, etag)
+
+        lesson_2.delete()
+        self.assertModified(url, etag)
+        # Версия общая для всех записей модели, поэтому меняется и у выборки без удаленного занятия
+        response = self.client.get(url, {'teacher': self.teacher_1.id}, HTTP_IF_NONE_MATCH=filtered)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+    def test_related_changes(self):
+        group_url = reverse('group-detail', args=[self.group_1.id])
+        subject_url = reverse('subject-detail', args=[self.subject_1.id])
+        lessons_url = reverse('lesson-list')
+        group_etag = self.client.get(group_url)['ETag']
+        subject_etag = self.client.get(subject_url)['ETag']
+        lessons_etag = self.client.get(lessons_url)['ETag']
+
+        student = Student.objects.get(id=self.student_2.id)
+        student.full_name = 'Sadie Dunhill'
+        student.save()
+        self.assertModified(group_url, group_etag)
+
+        Teacher.objects.get(id=self.teacher_1.id).delete()
+        self.assertModified(subject_url, subject_etag)
+        self.assertModified(lessons_url, lessons_etag)
+
+    def test_group_membership(self):
+        url = reverse('group-list')
+        etag = self.client.get(url)['ETag']
+
+        self.student_2.studentgroup_set.remove(self.group_1)
+        self.assertModified(url, etag)
+
+    def test_missing_record(self):
+        response = self.client.get(reverse('lesson-detail', args=[0]), HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from lessons.models import StudySubject, Lesson
+from people.models import Student, Teacher, StudentGroup
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class TestFastList(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher_1 = Teacher.objects.create(full_name='Jake Epping', degree='Bachelor')
+        cls.students = [Student.objects.create(full_name=f'Student {index}') for index in range(4)]
+        cls.group_1 = StudentGroup.objects.create(title='Ivy')
+        cls.group_1.students.set(cls.students[::-1])
+        cls.group_2 = StudentGroup.objects.create(title='Empty')
+        cls.subject_1 = StudySubject.objects.create(title='Chemistry')
+
+        start = timezone.now().replace(microsecond=0)
+        cls.lessons = []
+        for index in range(7):
+            lesson = Lesson.objects.create(
+                date=start + timedelta(days=index % 3, hours=index),
+                teacher=cls.teacher_1 if index % 2 else None,
+                study_subject=cls.subject_1,
+                student_group=cls.group_1 if index % 3 else None,
+                status=bool(index % 2),
+            )
+            lesson.missing_students.set(cls.students[index % 4::-1])
+            cls.lessons.append(lesson)
+
+    def get_both(self, url: str, params: dict = None) -> tuple:
+        with override_settings(API_FAST_LIST=False):
+            regular = self.client.get(url, params)
+        fast = self.client.get(url, params)
+        self.assertEqual(status.HTTP_200_OK, regular.status_code)
+        self.assertEqual(status.HTTP_200_OK, fast.status_code)
+        return regular, fast
+
+    def assertSameContent(self, url: str, params: dict = None):
+        regular, fast = self.get_both(url, params)
+        self.assertEqual(regular.content, fast.content)
+        return fast
+
+    def test_lesson_list(self):
+        response = self.assertSameContent(reverse('lesson-list'))
+        self.assertEqual(7, len(response.data['results']))
+
+    def test_lesson_list_pages(self):
+        url = reverse('lesson-list')
+        params = {'page_size': 3, 'ordering': '-date'}
+        while url:
+            response = self.assertSameContent(url, params)
+            url, params = response.data['next'], None
+
+    def test_lesson_list_previous_page(self):
+        first = self.client.get(reverse('lesson-list'), {'page_size': 2})
+        second = self.assertSameContent(first.data['next'])
+        self.assertSameContent(second.data['previous'])
+
+    def test_lesson_list_sparse_fields(self):
+        self.assertSameContent(reverse('lesson-list'), {'fields': 'date,missing_students'})
+        self.assertSameContent(reverse('lesson-list'), {'omit': 'missing_students,teacher'})
+
+    def test_lesson_list_filters(self):
+        params = {'has_missing_students': 'true', 'study_subject': self.subject_1.id}
+        self.assertSameContent(reverse('lesson-list'), params)
+
+    def test_people_lists(self):
+        for name in ('student-list', 'teacher-list', 'group-list', 'subject-list'):
+            with self.subTest(name=name):
+                self.assertSameContent(reverse(name))
+        self.assertSameContent(reverse('student-list'), {'page': 2, 'page_size': 3, 'count': 'false'})
+
+    def test_lesson_list_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('lesson-list'))
+        queries = [query['sql'] for query in context.captured_queries]
+        # Страница занятий и отсутствующие студенты всех занятий страницы
+        self.assertEqual(2, len(queries))
+        self.assertIn('"people_teacher"."full_name"', queries[0])
+        self.assertIn('lessons_lesson_missing_students', queries[1])
+
+    def test_disabled(self):
+        with CaptureQueriesContext(connection) as context:
+            with override_settings(API_FAST_LIST=False):
+                self.client.get(reverse('lesson-list'))
+        # Обычный путь подгружает отсутствующих студентов через prefetch_related
+        self.assertIn('_prefetch_related_val_lesson_id', context.captured_queries[-1]['sql'])
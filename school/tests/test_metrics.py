@@ -0,0 +1,62 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from lessons.models import StudySubject, Lesson
+from people.models import Student, Teacher, StudentGroup
+from school.metrics import QUERY_COUNT_HEADER, registry
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class TestMetrics(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher_1 = Teacher.objects.create(full_name='Jake Epping', degree='Bachelor')
+        cls.student_1 = Student.objects.create(full_name='Joe Doe')
+        cls.group_1 = StudentGroup.objects.create(title='Ivy')
+        cls.group_1.students.set([cls.student_1])
+        cls.subject_1 = StudySubject.objects.create(title='Chemistry')
+        cls.lesson_1 = Lesson.objects.create(
+            date=timezone.now(),
+            teacher=cls.teacher_1,
+            study_subject=cls.subject_1,
+            student_group=cls.group_1,
+        )
+
+    def test_request_is_recorded(self):
+        labels = ('lesson-list', 'GET')
+        requests = registry.request_duration.get_count(labels)
+        queries = registry.request_queries.series.get(labels, (None, 0))[1]
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('lesson-list'))
+
+        self.assertEqual(requests + 1, registry.request_duration.get_count(labels))
+        self.assertEqual(queries + len(context), registry.request_queries.series[labels][1])
+        self.assertGreater(registry.query_duration.get_count(labels), 0)
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('subject-detail', args=[self.subject_1.id]))
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        content = response.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', content)
+        self.assertIn('http_request_duration_seconds_bucket{view="subject-detail",method="GET",le="+Inf"}', content)
+        self.assertIn('http_request_db_queries_count{view="subject-detail",method="GET"}', content)
+        self.assertIn('http_request_db_duration_seconds_total{view="subject-detail",method="GET"}', content)
+
+    def test_query_count_header_in_debug(self):
+        self.assertNotIn(QUERY_COUNT_HEADER, self.client.get(reverse('group-list')))
+
+        with override_settings(DEBUG=True), CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('group-list'))
+        self.assertEqual(str(len(context)), response[QUERY_COUNT_HEADER])
+
+    def test_unresolved_path(self):
+        self.client.get('/missing/')
+
+        self.assertGreater(registry.request_duration.get_count(('unresolved', 'GET')), 0)
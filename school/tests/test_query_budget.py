@@ -0,0 +1,248 @@
+"""
+Бюджет SQL-запросов маршрутов API.
+
+Каждое действие выполняется на двух объемах данных, созданных генератором lessons.generator: число запросов
+должно совпадать с бюджетом на обоих, поэтому запросы, растущие с числом записей (N+1), не проходят. Считается
+каждый выполненный запрос; массовые действия получают все завершенные занятия группы, так что размер пачки растет
+вместе с объемом данных. Объемы подобраны так, что на обеих СУБД пачки bulk_create и изменения сводки помещаются
+в один запрос (на SQLite Django ограничивает запрос 999 параметрами): рост числа запросов означает запросы на каждую
+запись, а не деление на пачки.
+Время сериализации на большом объеме записывается в отчет, если задана переменная окружения `PERF_REPORT`.
+"""
+import json
+import os
+import time
+from types import SimpleNamespace
+
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from lessons import generator, serializers as lesson_serializers
+from lessons.models import Lesson, StudySubject
+from people import serializers as people_serializers
+from people.models import Student, StudentGroup, Teacher
+from school.fast import Plan
+
+SIZES = (
+    {'students': 10, 'groups': 2, 'teachers': 2, 'subjects': 2, 'lessons': 20},
+    {'students': 20, 'groups': 2, 'teachers': 4, 'subjects': 4, 'lessons': 40},
+)
+LARGE_SIZE = {'students': 500, 'groups': 20, 'teachers': 20, 'subjects': 10, 'lessons': 2000, 'absence_rate': 0.2}
+DATE_FORMAT = '%d/%m/%Y %H:%M:%S'
+
+# Бюджет запросов по маршрутам и действиям
+BUDGETS = {
+    ('student-list', 'list'): 2,
+    ('student-detail', 'retrieve'): 1,
+    ('student-list', 'create'): 1,
+    ('student-detail', 'update'): 2,
+    ('student-detail', 'partial_update'): 2,
+    ('student-detail', 'destroy'): 7,
+    ('teacher-list', 'list'): 2,
+    ('teacher-detail', 'retrieve'): 1,
+    ('teacher-list', 'create'): 1,
+    ('teacher-detail', 'update'): 3,
+    ('teacher-detail', 'partial_update'): 3,
+    ('teacher-detail', 'destroy'): 5,
+    ('group-list', 'list'): 3,
+    ('group-detail', 'retrieve'): 2,
+    ('group-list', 'create'): 8,
+    ('group-detail', 'update'): 15,
+    ('group-detail', 'partial_update'): 7,
+    ('group-detail', 'destroy'): 13,
+    ('group-add-students', 'add_students'): 11,
+    ('group-remove-students', 'remove_students'): 11,
+    ('subject-list', 'list'): 1,
+    ('subject-detail', 'retrieve'): 3,
+    ('subject-list', 'create'): 1,
+    ('subject-detail', 'update'): 3,
+    ('subject-detail', 'destroy'): 9,
+    ('lesson-list', 'list'): 2,
+    ('lesson-detail', 'retrieve'): 2,
+    ('lesson-list', 'create'): 13,
+    ('lesson-detail', 'update'): 13,
+    ('lesson-detail', 'partial_update'): 10,
+    ('lesson-detail', 'destroy'): 9,
+    ('lesson-mark-absent', 'mark_absent'): 8,
+    ('lesson-mark-present', 'mark_present'): 10,
+    # SQLite не возвращает идентификаторы вставленных занятий, они читаются отдельным запросом
+    ('lesson-bulk', 'bulk_create'): 15 if connection.vendor == 'sqlite' else 14,
+    ('lesson-bulk', 'bulk_update'): 21,
+    ('lesson-export', 'export'): 2,
+    ('analytics-students', 'students'): 1,
+    ('analytics-groups', 'groups'): 3,
+    ('analytics-subjects', 'subjects'): 4,
+    ('analytics-teachers', 'teachers'): 3,
+    ('timetable-list', 'list'): 1,
+    ('student-absences-list', 'list'): 3,
+}
+
+
+def get_fixture() -> SimpleNamespace:
+    """Выбирает записи, к которым обращаются запросы: занятие с группой и отсутствующими, студентов группы и вне ее"""
+    lesson = Lesson.objects.filter(status=True, student_group__isnull=False, missing_students__isnull=False).order_by(
+        'id'
+    ).first()
+    group = lesson.student_group
+    members = list(group.students.order_by('id'))
+    return SimpleNamespace(
+        lesson=lesson,
+        lessons=list(Lesson.objects.filter(student_group=group, status=True).order_by('id')),
+        group=group,
+        members=members,
+        student=Student.objects.filter(lesson__isnull=False).order_by('id').first(),
+        outsider=Student.objects.exclude(group=group).order_by('id').first(),
+        absentee=lesson.missing_students.order_by('id').first(),
+        teacher=lesson.teacher,
+        subject=lesson.study_subject,
+    )
+
+
+def lesson_payload(fixture, lesson=None) -> dict:
+    lesson = lesson or fixture.lesson
+    return {
+        'date': lesson.date.strftime(DATE_FORMAT),
+        'teacher': fixture.teacher.id,
+        'study_subject': fixture.subject.id,
+        'student_group': fixture.group.id,
+        'status': True,
+        'missing_students': [student.id for student in fixture.members],
+    }
+
+
+def group_payload(fixture) -> dict:
+    return {'title': 'Budget', 'students': [{'full_name': student.full_name} for student in fixture.members]}
+
+
+# Маршрут, действие, метод и функция, возвращающая (аргументы маршрута, параметры или тело запроса)
+CASES = (
+    ('student-list', 'list', 'get', lambda f: ((), {})),
+    ('student-detail', 'retrieve', 'get', lambda f: ((f.student.id,), {})),
+    ('student-list', 'create', 'post', lambda f: ((), {'full_name': 'Budget'})),
+    ('student-detail', 'update', 'put', lambda f: ((f.student.id,), {'full_name': 'Budget'})),
+    ('student-detail', 'partial_update', 'patch', lambda f: ((f.student.id,), {'full_name': 'Budget'})),
+    ('student-detail', 'destroy', 'delete', lambda f: ((f.student.id,), None)),
+    ('teacher-list', 'list', 'get', lambda f: ((), {})),
+    ('teacher-detail', 'retrieve', 'get', lambda f: ((f.teacher.id,), {})),
+    ('teacher-list', 'create', 'post', lambda f: ((), {'full_name': 'Budget', 'degree': 'Бакалавр'})),
+    ('teacher-detail', 'update', 'put', lambda f: ((f.teacher.id,), {'full_name': 'Budget', 'degree': 'Магистр'})),
+    ('teacher-detail', 'partial_update', 'patch', lambda f: ((f.teacher.id,), {'degree': 'Магистр'})),
+    ('teacher-detail', 'destroy', 'delete', lambda f: ((f.teacher.id,), None)),
+    ('group-list', 'list', 'get', lambda f: ((), {})),
+    ('group-detail', 'retrieve', 'get', lambda f: ((f.group.id,), {})),
+    ('group-list', 'create', 'post', lambda f: ((), group_payload(f))),
+    ('group-detail', 'update', 'put', lambda f: ((f.group.id,), {**group_payload(f), 'students': group_payload(
+        f
+    )['students'][::2]})),
+    ('group-detail', 'partial_update', 'patch', lambda f: ((f.group.id,), {'title': 'Budget'})),
+    ('group-detail', 'destroy', 'delete', lambda f: ((f.group.id,), None)),
+    ('group-add-students', 'add_students', 'post', lambda f: ((f.group.id,), {
+        'student_ids': [f.outsider.id], 'students': [{'full_name': f.members[0].full_name}],
+    })),
+    ('group-remove-students', 'remove_students', 'post', lambda f: ((f.group.id,), {
+        'student_ids': [student.id for student in f.members[::2]],
+    })),
+    ('subject-list', 'list', 'get', lambda f: ((), {})),
+    ('subject-detail', 'retrieve', 'get', lambda f: ((f.subject.id,), {})),
+    ('subject-list', 'create', 'post', lambda f: ((), {'title': 'Budget'})),
+    ('subject-detail', 'update', 'put', lambda f: ((f.subject.id,), {'title': 'Budget'})),
+    ('subject-detail', 'destroy', 'delete', lambda f: ((f.subject.id,), None)),
+    ('lesson-list', 'list', 'get', lambda f: ((), {})),
+    ('lesson-detail', 'retrieve', 'get', lambda f: ((f.lesson.id,), {})),
+    ('lesson-list', 'create', 'post', lambda f: ((), lesson_payload(f))),
+    ('lesson-detail', 'update', 'put', lambda f: ((f.lesson.id,), lesson_payload(f))),
+    ('lesson-detail', 'partial_update', 'patch', lambda f: ((f.lesson.id,), {
+        'missing_students': [student.id for student in f.members],
+    })),
+    ('lesson-detail', 'destroy', 'delete', lambda f: ((f.lesson.id,), None)),
+    ('lesson-mark-absent', 'mark_absent', 'post', lambda f: ((f.lesson.id,), {
+        'student_ids': [student.id for student in f.members] + [f.outsider.id],
+    })),
+    ('lesson-mark-present', 'mark_present', 'post', lambda f: ((f.lesson.id,), {
+        'student_ids': [student.id for student in f.members],
+    })),
+    ('lesson-bulk', 'bulk_create', 'post', lambda f: ((), [lesson_payload(f, lesson) for lesson in f.lessons])),
+    ('lesson-bulk', 'bulk_update', 'put', lambda f: ((), [
+        {**lesson_payload(f, lesson), 'id': lesson.id} for lesson in f.lessons
+    ])),
+    ('lesson-export', 'export', 'get', lambda f: ((), {'export_format': 'ndjson'})),
+    ('analytics-students', 'students', 'get', lambda f: ((), {})),
+    ('analytics-groups', 'groups', 'get', lambda f: ((), {})),
+    ('analytics-subjects', 'subjects', 'get', lambda f: ((), {'teacher': f.teacher.id})),
+    ('analytics-teachers', 'teachers', 'get', lambda f: ((), {})),
+    ('timetable-list', 'list', 'get', lambda f: ((), {'group': f.group.id, 'date_from': f.lesson.date.date()})),
+    ('student-absences-list', 'list', 'get', lambda f: ((f.absentee.id,), {})),
+)
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class TestQueryBudget(TestCase):
+    def measure(self, name: str, method: str, build) -> list:
+        """Выполняет запрос на каждом объеме данных и возвращает число SQL-запросов на каждом"""
+        counts = []
+        for size in SIZES:
+            with transaction.atomic():
+                generator.generate(**size, absence_rate=0.3)
+                args, data = build(get_fixture())
+                request = getattr(self.client, method)
+                kwargs = {'data': json.dumps(data), 'content_type': 'application/json'} if method != 'get' else {
+                    'data': data
+                }
+                with CaptureQueriesContext(connection) as context:
+                    response = request(reverse(name, args=args), **kwargs)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                self.assertLess(response.status_code, 300, getattr(response, 'data', None))
+                transaction.set_rollback(True)
+            counts.append(len(context.captured_queries))
+        return counts
+
+    def test_every_route_is_covered(self):
+        self.assertEqual(set(BUDGETS), {(name, action) for name, action, _, _ in CASES})
+
+    def test_query_budgets(self):
+        for name, action, method, build in CASES:
+            with self.subTest(route=name, action=action):
+                self.assertEqual([BUDGETS[name, action]] * len(SIZES), self.measure(name, method, build))
+
+
+class TestSerializationTime(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generator.generate(**LARGE_SIZE)
+
+    def test_serialization_time(self):
+        """Записывает время сериализации больших выборок; проверяет только, что все записи выведены"""
+        lessons = Lesson.objects.select_related('study_subject', 'teacher', 'student_group').prefetch_related(
+            'missing_students'
+        ).order_by('date', 'id')
+        cases = {
+            'lessons': lambda: lesson_serializers.LessonSerializer(lessons, many=True).data,
+            'lessons_values': lambda: Plan(lesson_serializers.LessonSerializer(many=True)).to_representation(
+                Plan(lesson_serializers.LessonSerializer(many=True)).get_queryset(lessons)
+            ),
+            'groups': lambda: people_serializers.StudentGroupSerializer(
+                StudentGroup.objects.prefetch_related('students'), many=True
+            ).data,
+            'subject_detail': lambda: lesson_serializers.StudySubjectDetailSerializer(
+                StudySubject.objects.prefetch_related('lesson__missing_students').first()
+            ).data,
+            'teachers': lambda: people_serializers.TeacherSerializer(Teacher.objects.all(), many=True).data,
+        }
+
+        report = {}
+        for name, serialize in cases.items():
+            started = time.perf_counter()
+            data = serialize()
+            seconds = round(time.perf_counter() - started, 4)
+            report[name] = {'rows': len(data) if isinstance(data, list) else 1, 'seconds': seconds}
+            self.assertTrue(data)
+
+        self.assertEqual(LARGE_SIZE['lessons'], report['lessons']['rows'])
+        self.assertEqual(report['lessons']['rows'], report['lessons_values']['rows'])
+        if os.environ.get('PERF_REPORT'):
+            with open(os.environ['PERF_REPORT'], 'w', encoding='utf-8') as file:
+                json.dump({'database': connection.vendor, 'sizes': LARGE_SIZE, 'serialization': report}, file,
+                          indent=2)
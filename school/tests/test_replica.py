@@ -0,0 +1,69 @@
+import time
+
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from lessons.models import Lesson
+from school.replica import PIN_COOKIE, ReplicaRoutingMiddleware, read_from_replica
+
+
+@override_settings(DATABASE_REPLICA_ALIAS='replica', DATABASE_REPLICA_PIN_SECONDS=5)
+class TestReplicaRouting(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.read_aliases = []
+
+        def view(request):
+            self.used_replica = read_from_replica()
+            self.read_aliases.append(router.db_for_read(Lesson))
+            self.used_replica = (self.used_replica, read_from_replica())
+            self.write_alias = router.db_for_write(Lesson)
+            return HttpResponse()
+
+        self.middleware = ReplicaRoutingMiddleware(view)
+
+    def test_safe_request_reads_replica(self):
+        response = self.middleware(self.factory.get('/api/lesson/'))
+
+        self.assertEqual(['replica'], self.read_aliases)
+        self.assertEqual('default', self.write_alias)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertEqual((False, True), self.used_replica)
+        self.assertFalse(read_from_replica())
+
+    def test_write_reads_primary_and_pins_client(self):
+        response = self.middleware(self.factory.post('/api/lesson/'))
+
+        self.assertEqual(['default'], self.read_aliases)
+        self.assertEqual('default', self.write_alias)
+        self.assertEqual(5, response.cookies[PIN_COOKIE]['max-age'])
+
+    def test_pinned_client_reads_primary(self):
+        request = self.factory.get('/api/lesson/')
+        request.COOKIES[PIN_COOKIE] = str(time.time() + 5)
+        self.middleware(request)
+
+        self.assertEqual(['default'], self.read_aliases)
+        self.assertEqual((False, False), self.used_replica)
+
+    def test_expired_pin_reads_replica(self):
+        for value in (str(time.time() - 1), 'invalid'):
+            request = self.factory.get('/api/lesson/')
+            request.COOKIES[PIN_COOKIE] = value
+            self.middleware(request)
+
+        self.assertEqual(['replica', 'replica'], self.read_aliases)
+
+    def test_outside_request_reads_primary(self):
+        self.middleware(self.factory.get('/api/lesson/'))
+
+        self.assertEqual('default', router.db_for_read(Lesson))
+
+    @override_settings(DATABASE_REPLICA_ALIAS=None)
+    def test_without_replica(self):
+        response = self.middleware(self.factory.post('/api/lesson/'))
+        self.middleware(self.factory.get('/api/lesson/'))
+
+        self.assertEqual(['default', 'default'], self.read_aliases)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
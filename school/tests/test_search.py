@@ -0,0 +1,98 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from lessons.models import StudySubject
+from people.models import Student, Teacher
+from school.search import has_trigram, rank
+from school.tests.utils import explain
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class TestSearch(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student_1 = Student.objects.create(full_name='Doerty Longlastname')
+        cls.student_2 = Student.objects.create(full_name='Joe Doe')
+        cls.student_3 = Student.objects.create(full_name='Jane Smith')
+        cls.student_4 = Student.objects.create(full_name='Doe')
+        cls.teacher_1 = Teacher.objects.create(full_name='Jake Epping', degree='Bachelor')
+        cls.teacher_2 = Teacher.objects.create(full_name='Sadie Dunhill', degree='Master')
+        cls.subject_1 = StudySubject.objects.create(title='Chemistry')
+        cls.subject_2 = StudySubject.objects.create(title='Biochemistry')
+        cls.subject_3 = StudySubject.objects.create(title='History')
+
+    def search(self, name: str, term: str, **params) -> list:
+        response = self.client.get(reverse(name), {'search': term, **params})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        return [item['id'] for item in results]
+
+    def test_student_search(self):
+        ids = self.search('student-list', 'doe')
+
+        self.assertEqual(self.student_4.id, ids[0])
+        self.assertEqual({self.student_1.id, self.student_2.id, self.student_4.id}, set(ids))
+
+    def test_teacher_and_subject_search(self):
+        self.assertEqual([self.teacher_2.id], self.search('teacher-list', 'DUNHILL'))
+        self.assertEqual(
+            [self.subject_1.id, self.subject_2.id], self.search('subject-list', 'chemistry', fields='id,title')
+        )
+
+    def test_result_limit(self):
+        with override_settings(API_SEARCH_LIMIT=2):
+            response = self.client.get(reverse('student-list'), {'search': 'doe'})
+
+        self.assertEqual(2, response.data['count'])
+        self.assertEqual(self.student_4.id, response.data['results'][0]['id'])
+
+    def test_search_is_ignored_outside_list(self):
+        response = self.client.get(reverse('student-detail', args=[self.student_3.id]), {'search': 'doe'})
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+    def test_short_term(self):
+        self.assertEqual([self.student_4.id, self.student_1.id], self.search('student-list', 'do'))
+        self.assertEqual([self.student_3.id], self.search('student-list', 'ja'))
+
+    def test_invalid_term(self):
+        response = self.client.get(reverse('student-list'), {'search': 'd' * 101})
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertIn('search', response.data)
+        self.assertEqual(4, len(self.search('student-list', '  ')))
+
+    def test_trigram_similarity(self):
+        if not has_trigram(connection):
+            self.skipTest('Требуется PostgreSQL с расширением pg_trgm')
+        self.assertEqual([self.teacher_1.id], self.search('teacher-list', 'Jake Eping'))
+
+    def test_trigram_sql(self):
+        if connection.vendor != 'postgresql':
+            self.skipTest('Требуется PostgreSQL')
+        # SQL строится без обращения к pg_trgm, поэтому проверяется и без установленного расширения
+        with mock.patch.object(connection, 'has_trigram', True, create=True):
+            for term in ('doe', 'do'):
+                sql, params = rank(Student.objects.all(), 'full_name', term).query.sql_with_params()
+
+                self.assertIn('"people_student"."full_name" ILIKE %s', sql)
+                self.assertNotIn('UPPER(', sql)
+
+        self.assertEqual(
+            {self.student_1.id, self.student_2.id, self.student_4.id},
+            set(Student.objects.filter(full_name__ilike_contains='DOE').values_list('pk', flat=True))
+        )
+        self.assertEqual(
+            [self.student_1.id],
+            list(Student.objects.filter(full_name__ilike_startswith='DOER').values_list('pk', flat=True))
+        )
+
+    def test_trigram_index(self):
+        if not has_trigram(connection):
+            self.skipTest('Требуется PostgreSQL с расширением pg_trgm')
+        for term in ('doe', 'do'):
+            self.assertIn('student_full_name_trgm_idx', explain(rank(Student.objects.all(), 'full_name', term)))
@@ -0,0 +1,76 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from lessons.models import StudySubject, Lesson
+from people.models import Student, Teacher, StudentGroup
+
+
+class TestSparseFields(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher_1 = Teacher.objects.create(full_name='Jake Epping', degree='Bachelor')
+        cls.student_1 = Student.objects.create(full_name='Joe Doe')
+        cls.group_1 = StudentGroup.objects.create(title='Ivy')
+        cls.group_1.students.set([cls.student_1])
+        cls.subject_1 = StudySubject.objects.create(title='Chemistry')
+        cls.lesson_1 = Lesson.objects.create(
+            date=timezone.now(),
+            teacher=cls.teacher_1,
+            study_subject=cls.subject_1,
+            student_group=cls.group_1,
+            status=True,
+        )
+        cls.lesson_1.missing_students.set([cls.student_1])
+
+    def get(self, url: str, params: dict):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        return response, [query['sql'] for query in context.captured_queries]
+
+    def test_lesson_list_fields(self):
+        response, queries = self.get(reverse('lesson-list'), {'fields': 'id,date,study_subject'})
+
+        self.assertEqual([{
+            'id': self.lesson_1.id,
+            'date': response.data['results'][0]['date'],
+            'study_subject': 'Chemistry',
+        }], response.data['results'])
+        # Страница занятий без подгрузки отсутствующих
+        self.assertEqual(1, len(queries))
+        self.assertIn('"lessons_studysubject"."title"', queries[0])
+        self.assertNotIn('people_teacher', queries[0])
+        self.assertNotIn('"lessons_lesson"."status"', queries[0])
+
+    def test_lesson_detail_omit(self):
+        url = reverse('lesson-detail', args=[self.lesson_1.id])
+        response, queries = self.get(url, {'omit': 'missing_students,teacher'})
+
+        self.assertNotIn('missing_students', response.data)
+        self.assertNotIn('teacher', response.data)
+        self.assertEqual('Ivy', response.data['student_group'])
+        self.assertEqual(1, len(queries))
+
+    def test_group_list_fields(self):
+        response, queries = self.get(reverse('group-list'), {'fields': 'title'})
+
+        self.assertEqual([{'title': 'Ivy'}], response.data['results'])
+        self.assertFalse([query for query in queries if 'people_studentgroup_students' in query])
+
+    def test_subject_detail_omit_lessons(self):
+        url = reverse('subject-detail', args=[self.subject_1.id])
+        response, queries = self.get(url, {'omit': 'lesson'})
+
+        self.assertEqual({'id', 'title', 'lesson_count'}, set(response.data))
+        self.assertEqual(1, response.data['lesson_count'])
+        self.assertEqual(1, len(queries))
+
+    def test_unknown_fields(self):
+        for params in ({'fields': 'id,color'}, {'omit': 'color'}):
+            response = self.client.get(reverse('student-list'), params)
+            self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+            self.assertIn('color', str(response.data))
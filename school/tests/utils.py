@@ -0,0 +1,17 @@
+from django.db import connection
+
+
+def explain(queryset) -> str:
+    """Возвращает план запроса, запрещая последовательное чтение на PostgreSQL, где таблицы тестов слишком малы"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+    return queryset.explain()
+
+
+def get_writes(context) -> list:
+    """Возвращает изменяющие данные запросы из CaptureQueriesContext"""
+    return [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE', 'WITH'))
+    ]
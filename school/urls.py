@@ -1,10 +1,13 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from school.metrics import metrics_view
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('people.urls')),
     path('api/', include('lessons.urls')),
+    path('metrics', metrics_view, name='metrics'),
 
 ]